@@ -0,0 +1,11 @@
+"""
+ASGI 請求使用的 URL 設定（由 calendar_api.middleware.AsyncRoutingMiddleware 切換）
+先比對 calendar_api 的非同步端點，其餘與 calendarTW.urls 相同
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("api/", include("calendar_api.async_urls")),
+] + sync_urlpatterns
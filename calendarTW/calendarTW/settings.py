@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
@@ -61,6 +65,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "calendar_api.middleware.AsyncRoutingMiddleware",
+    "calendar_api.middleware.ServerTimingMiddleware",
 ]
 
 ROOT_URLCONF = "calendarTW.urls"
@@ -175,3 +181,72 @@ CORS_ALLOW_CREDENTIALS = True
 
 # 開發環境允許所有來源（生產環境請移除）
 CORS_ALLOW_ALL_ORIGINS = True
+
+# 日曆記憶體索引設定
+# 查詢端點 (today / is-holiday / by-date) 直接從行程內索引回應，不查詢資料庫
+CALENDAR_INDEX_ENABLED = os.getenv("CALENDAR_INDEX_ENABLED", "True") == "True"
+# 索引最長存活秒數；一般情況下索引會在資料集版本改變時重建，此設定只是保險機制
+CALENDAR_INDEX_MAX_AGE = int(os.getenv("CALENDAR_INDEX_MAX_AGE", "3600"))
+
+# 批次查詢端點單次最多可查詢的日期數
+CALENDAR_BATCH_MAX_DATES = int(os.getenv("CALENDAR_BATCH_MAX_DATES", "100000"))
+# 批次寫入端點 (POST .../batch/) 單次最多可寫入的資料筆數
+CALENDAR_BATCH_MAX_WRITES = int(os.getenv("CALENDAR_BATCH_MAX_WRITES", "10000"))
+
+# 例外日儲存模式：CalendarDay 只儲存假日、補班日與有名稱或說明的日期，
+# 其餘一般日由星期推算（週末為假日），查詢端點即時補上；可查詢資料範圍以外的任意日期
+CALENDAR_EXCEPTION_STORAGE = os.getenv("CALENDAR_EXCEPTION_STORAGE", "False") == "True"
+
+# 月份 / 年度統計端點是否讀取 MonthSummary 摘要表（摘要表一律由寫入路徑維護，此設定只影響讀取）
+CALENDAR_MONTH_SUMMARY_TABLE = os.getenv("CALENDAR_MONTH_SUMMARY_TABLE", "True") == "True"
+
+# 資料集版本在行程內快取的秒數（ETag 與記憶體索引以此判斷資料是否異動）
+CALENDAR_DATASET_VERSION_TTL = float(os.getenv("CALENDAR_DATASET_VERSION_TTL", "2"))
+
+# 預先序列化回應快取的大小上限（位元組），設為 0 停用
+CALENDAR_BLOB_CACHE_BYTES = int(os.getenv("CALENDAR_BLOB_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# ASGI 請求使用的 URL 設定，熱門唯讀端點改由非同步版本處理；設為空字串停用
+CALENDAR_ASYNC_URLCONF = os.getenv("CALENDAR_ASYNC_URLCONF", "calendarTW.asgi_urls")
+
+# calendar_api 端點是否輸出 Server-Timing 回應標頭（SQL / view / 序列化耗時）
+CALENDAR_SERVER_TIMING = os.getenv("CALENDAR_SERVER_TIMING", "True") == "True"
+# 慢請求門檻（毫秒），超過時記錄該請求執行過的 SQL
+CALENDAR_SLOW_REQUEST_MS = float(os.getenv("CALENDAR_SLOW_REQUEST_MS", "500"))
+# 個別端點的慢請求門檻，格式為「端點名稱=毫秒」並以逗號分隔，例如 "calendar-range=200,calendarday-list=300"
+CALENDAR_SLOW_REQUEST_THRESHOLDS = {
+    name.strip(): float(value)
+    for name, value in (
+        item.split("=", 1) for item in os.getenv("CALENDAR_SLOW_REQUEST_THRESHOLDS", "").split(",") if "=" in item
+    )
+}
+
+# /metrics（Prometheus 格式）是否累計請求指標
+CALENDAR_METRICS_ENABLED = os.getenv("CALENDAR_METRICS_ENABLED", "True") == "True"
+# 各行程寫入指標快照的目錄，/metrics 合併目錄中所有行程的快照；預設為空字串，只輸出目前行程
+# 多個 worker 的部署需明確設定，每個部署使用各自的目錄並在啟動前清空（共用目錄會合併到其他部署或測試的數值）
+CALENDAR_METRICS_DIR = os.getenv("CALENDAR_METRICS_DIR", "")
+# manage.py test 使用每次執行各自的暫存目錄，結束時移除
+if sys.argv[1:2] == ["test"]:
+    CALENDAR_METRICS_DIR = tempfile.mkdtemp(prefix="calendarTW-metrics-test-")
+    atexit.register(shutil.rmtree, CALENDAR_METRICS_DIR, ignore_errors=True)
+# 行程寫入指標快照的最短間隔（秒）
+CALENDAR_METRICS_FLUSH_INTERVAL = float(os.getenv("CALENDAR_METRICS_FLUSH_INTERVAL", "5"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "calendar_api": {
+            "handlers": ["console"],
+            "level": os.getenv("CALENDAR_LOG_LEVEL", "INFO"),
+        },
+        # 每個請求一行 JSON 記錄（INFO）與慢請求的 SQL（WARNING）；預設只輸出慢請求，設為 INFO 才逐筆記錄
+        "calendar_api.timing": {
+            "level": os.getenv("CALENDAR_TIMING_LOG_LEVEL", "WARNING"),
+        },
+    },
+}
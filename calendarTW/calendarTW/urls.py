@@ -20,6 +20,8 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from calendar_api.views import metrics_view
+
 urlpatterns = [
     # 首頁自動導向 API 文件
     path("", RedirectView.as_view(url="/api/docs/", permanent=False), name="home"),
@@ -33,4 +35,7 @@ urlpatterns = [
     
     # Calendar API
     path("api/", include("calendar_api.urls")),
+
+    # Prometheus 指標
+    path("metrics", metrics_view, name="metrics"),
 ]
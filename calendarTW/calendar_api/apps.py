@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CalendarApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calendar_api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        # 註冊資料異動訊號
+        from . import signals  # noqa: F401
+        from .middleware import install_query_recorder
+
+        # ServerTimingMiddleware 以每個資料庫連線的 execute wrapper 記錄 SQL
+        connection_created.connect(install_query_recorder, dispatch_uid='calendar_api.install_query_recorder')
@@ -0,0 +1,13 @@
+from django.urls import path, re_path
+
+from . import async_views
+
+# ASGI 請求優先比對的非同步端點，路徑與名稱都與 urls.py 中的同步端點相同（reverse 結果不變）
+urlpatterns = [
+    path('calendar/range/', async_views.calendar_range, name='calendar-range'),
+    path('calendar/today/', async_views.today, name='calendar-today'),
+    path('calendar/is-holiday/', async_views.is_holiday, name='is-holiday'),
+    path('calendar/month-summary/', async_views.month_summary, name='month-summary'),
+    re_path(r'^calendar-days/by-date/(?P<date>[0-9-]+)/$', async_views.by_date, name='calendar-day-by-date'),
+    re_path(r'^calendar-days/month/(?P<year>[0-9]+)/(?P<month>[0-9]+)/$', async_views.by_month, name='calendar-day-by-month'),
+]
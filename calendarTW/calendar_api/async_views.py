@@ -0,0 +1,240 @@
+"""
+熱門唯讀端點的非同步版本（ASGI）
+以 AsyncRoutingMiddleware 在 ASGI 請求時取代同名的同步端點，回應內容、ETag 與錯誤訊息都與同步版本相同
+- 資料來源為記憶體索引、blob_cache 或 Django 非同步 ORM (afirst / aiterator)，不佔用執行緒
+- 非 JSON 的請求（可瀏覽 API、?format=、?compact= 等）與 ?lunar= 交回同步的 DRF 端點處理
+- 不經過 APIView.initial：只有在同步端點的 DRF 驗證、權限與限流設定必然允許時才直接處理（見 _policies_allow），
+  帶有憑證的請求或設定了權限 / 限流時交回同步端點，由 DRF 照常套用
+"""
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication, TokenAuthentication
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+
+from .blob_cache import aget_month_days, json_response, months_between
+from .default_days import aget_or_default, exception_storage_enabled
+from .index import aget_calendar_index, calendar_index_enabled
+from .models import CalendarDay
+from .serializers import CalendarDaySerializer
+from .summaries import aget_month_summary, summary_to_dict
+from .versioning import aget_dataset_version, compute_etag, is_not_modified
+from .views import (
+    CalendarDayViewSet,
+    CalendarRangeAPIView,
+    IsHolidayAPIView,
+    MonthSummaryAPIView,
+    TodayAPIView,
+    _cacheable_month,
+    _parse_date,
+)
+
+JSON_MEDIA_TYPE = 'application/json'
+
+_renderer = JSONRenderer()
+
+# 只依 Authorization 標頭或 session cookie 驗證的 DRF 內建驗證類別
+_CREDENTIAL_AUTHENTICATORS = (BasicAuthentication, SessionAuthentication, TokenAuthentication)
+
+_sync_today = sync_to_async(TodayAPIView.as_view())
+_sync_is_holiday = sync_to_async(IsHolidayAPIView.as_view())
+_sync_range = sync_to_async(CalendarRangeAPIView.as_view())
+_sync_month_summary = sync_to_async(MonthSummaryAPIView.as_view())
+_sync_by_date = sync_to_async(CalendarDayViewSet.as_view({'get': 'by_date'}))
+_sync_by_month = sync_to_async(CalendarDayViewSet.as_view({'get': 'by_month'}))
+
+
+def _policies_allow(request, view_class):
+    """
+    同步端點 view_class 的 DRF 驗證、權限與限流設定是否必然允許這個請求
+    權限全部為 AllowAny、沒有限流，且驗證類別只看 Authorization 標頭或 session cookie 而請求沒有帶這些憑證時，
+    DRF 的結果必為匿名使用者並允許存取；其他情況（包括驗證失敗的可能）交回同步端點處理
+    """
+    view = view_class()
+    if view.get_throttles():
+        return False
+    if not all(isinstance(permission, AllowAny) for permission in view.get_permissions()):
+        return False
+    if not all(isinstance(authenticator, _CREDENTIAL_AUTHENTICATORS) for authenticator in view.get_authenticators()):
+        return False
+    return 'HTTP_AUTHORIZATION' not in request.META and settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def _handles(request, view_class, *unsupported_params):
+    """
+    只處理一般的 JSON GET 請求，其餘交回同步端點 view_class
+    與 DRF 內容協商的結果一致：Accept 含 text/html（可瀏覽 API）或指定縮排時不處理
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if not _policies_allow(request, view_class):
+        return False
+    if request.GET.get('format', 'json') != 'json':
+        return False
+    if any(param in request.GET for param in unsupported_params):
+        return False
+    accept = request.headers.get('Accept', '')
+    media_types = [value.split(';')[0].strip() for value in accept.split(',') if value.strip()]
+    if 'text/html' in media_types or 'indent=' in accept:
+        return False
+    return not media_types or any(
+        media_type in ('*/*', 'application/*', JSON_MEDIA_TYPE) for media_type in media_types
+    )
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type=JSON_MEDIA_TYPE)
+
+
+def _error(message, status):
+    return _json({'error': message}, status=status)
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+async def _validators(request, extra=''):
+    """回傳 (etag, last_modified, not_modified)，與 ConditionalGetMixin 的計算方式相同"""
+    version, updated_at = await aget_dataset_version()
+    etag = compute_etag(version, extra, JSON_MEDIA_TYPE, request.get_full_path())
+    return etag, updated_at, is_not_modified(request.META, etag, updated_at)
+
+
+def _not_modified(etag, last_modified):
+    return _with_validators(HttpResponse(status=304), etag, last_modified)
+
+
+async def _get_calendar_day(day):
+    if calendar_index_enabled():
+        return (await aget_calendar_index()).get(day)
+    if exception_storage_enabled():
+        return await aget_or_default(day)
+    return await CalendarDay.objects.filter(date=day).afirst()
+
+
+async def today(request):
+    """非同步版本的 /api/calendar/today/"""
+    if not _handles(request, TodayAPIView, 'lunar'):
+        return await _sync_today(request)
+
+    today_date = datetime.now().date()
+    version, updated_at = await aget_dataset_version()
+    midnight = timezone.make_aware(datetime.combine(today_date, time.min))
+    last_modified = midnight if updated_at is None else max(updated_at, midnight)
+    etag = compute_etag(version, today_date.isoformat(), JSON_MEDIA_TYPE, request.get_full_path())
+    if is_not_modified(request.META, etag, last_modified):
+        return _not_modified(etag, last_modified)
+
+    calendar_day = await _get_calendar_day(today_date)
+    if calendar_day is None:
+        return _error('今天的日期資料尚未建立', 404)
+    return _with_validators(_json(CalendarDaySerializer(calendar_day).data), etag, last_modified)
+
+
+async def is_holiday(request):
+    """非同步版本的 /api/calendar/is-holiday/"""
+    day = _parse_date(request.GET.get('date'))
+    if not _handles(request, IsHolidayAPIView) or day is None:
+        return await _sync_is_holiday(request)
+
+    etag, last_modified, not_modified = await _validators(request)
+    if not_modified:
+        return _not_modified(etag, last_modified)
+
+    calendar_day = await _get_calendar_day(day)
+    if calendar_day is None:
+        return _error('找不到該日期的資料', 404)
+    return _with_validators(_json({
+        'date': calendar_day.date,
+        'is_holiday': calendar_day.is_holiday,
+        'is_workday': calendar_day.is_workday,
+        'is_weekend': calendar_day.is_weekend,
+        'holiday_name': calendar_day.holiday_name,
+    }), etag, last_modified)
+
+
+async def by_date(request, date):
+    """非同步版本的 /api/calendar-days/by-date/{date}/"""
+    day = _parse_date(date)
+    if not _handles(request, CalendarDayViewSet, 'lunar') or day is None:
+        return await _sync_by_date(request, date=date)
+
+    etag, last_modified, not_modified = await _validators(request)
+    if not_modified:
+        return _not_modified(etag, last_modified)
+
+    calendar_day = await _get_calendar_day(day)
+    if calendar_day is None:
+        return _error('找不到該日期的資料', 404)
+    return _with_validators(_json(CalendarDaySerializer(calendar_day).data), etag, last_modified)
+
+
+async def by_month(request, year, month):
+    """非同步版本的 /api/calendar-days/month/{year}/{month}/"""
+    handled = _handles(request, CalendarDayViewSet, 'compact', 'lunar')
+    if not handled or not _cacheable_month(int(year), int(month)):
+        return await _sync_by_month(request, year=year, month=month)
+
+    etag, last_modified, not_modified = await _validators(request)
+    if not_modified:
+        return _not_modified(etag, last_modified)
+
+    key = (int(year), int(month))
+    items = (await aget_month_days([key]))[key]
+    return _with_validators(json_response([item[3] for item in items]), etag, last_modified)
+
+
+async def calendar_range(request):
+    """非同步版本的 /api/calendar/range/"""
+    start = _parse_date(request.GET.get('start_date'))
+    end = _parse_date(request.GET.get('end_date'))
+    if not _handles(request, CalendarRangeAPIView, 'compact', 'lunar') or not start or not end:
+        return await _sync_range(request)
+
+    etag, last_modified, not_modified = await _validators(request)
+    if not_modified:
+        return _not_modified(etag, last_modified)
+
+    if start > end:
+        return _with_validators(json_response([]), etag, last_modified)
+    max_dates = getattr(settings, 'CALENDAR_BATCH_MAX_DATES', 100000)
+    if exception_storage_enabled() and (end - start).days + 1 > max_dates:
+        return _error(f'單次最多查詢 {max_dates} 個日期', 400)
+
+    months = months_between(start, end)
+    by_month_items = await aget_month_days(months)
+    items = [
+        item[3]
+        for key in months
+        for item in by_month_items[key]
+        if start <= item[0] <= end
+    ]
+    return _with_validators(json_response(items), etag, last_modified)
+
+
+async def month_summary(request):
+    """非同步版本的 /api/calendar/month-summary/"""
+    try:
+        year = int(request.GET['year'])
+        month = int(request.GET['month'])
+    except (KeyError, ValueError):
+        return await _sync_month_summary(request)
+    # 月份超出範圍時由同步端點回應相同的 400 錯誤
+    if not _handles(request, MonthSummaryAPIView) or not 1 <= month <= 12:
+        return await _sync_month_summary(request)
+
+    etag, last_modified, not_modified = await _validators(request)
+    if not_modified:
+        return _not_modified(etag, last_modified)
+
+    summary = await aget_month_summary(year, month)
+    return _with_validators(_json(summary_to_dict(summary)), etag, last_modified)
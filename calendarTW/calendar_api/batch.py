@@ -0,0 +1,206 @@
+"""
+批次寫入端點
+以一次請求新增 / 更新 / 刪除數千筆 CalendarDay、Holiday 或 WorkdayAdjustment：
+- 以既有的序列化器驗證整批資料（不逐筆查詢資料庫）
+- 每個模型以 bulk_upsert / bulk_delete 整批寫入，全部包在同一個交易中
+- 回應逐筆的處理結果；atomic 為 True（預設）時任何一筆驗證失敗即整批不寫入
+
+CalendarDay 與 WorkdayAdjustment 以日期為 key；Holiday 同一天可以有多筆，upsert 以 (日期, 名稱) 為 key，
+與匯入指令相同，刪除則移除該日期的所有假日
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+from .maintenance import sync_calendar_days
+from .models import CalendarDay, Holiday
+from .upsert import DEFAULT_BATCH_SIZE, HOLIDAY_KEY, _chunks, bulk_delete, bulk_upsert, key_fields, save_calendar_days
+
+DUPLICATE_DATE_ERROR = '同一批次中日期重複'
+DUPLICATE_HOLIDAY_ERROR = '同一批次中日期與名稱重複'
+
+
+def _upsert_key(model):
+    """upsert 的 key：Holiday 同一天可以有多筆，以 (日期, 名稱) 識別"""
+    return HOLIDAY_KEY if model is Holiday else 'date'
+
+
+def _key_value(model, obj):
+    return tuple(getattr(obj, name) for name in HOLIDAY_KEY) if model is Holiday else obj.date
+
+
+def _update_fields(model):
+    """整筆寫入時更新的欄位（主鍵與 key 以外的所有欄位）"""
+    key = key_fields(_upsert_key(model))
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in key
+    ]
+
+
+def _build(model, data):
+    """由驗證後的資料建立物件，並填好 bulk 寫入不會自動計算的衍生欄位"""
+    if model is CalendarDay:
+        fields = dict(data)
+        return CalendarDay.from_date(fields.pop('date'), **fields)
+    if model is Holiday:
+        return Holiday(year=data['date'].year, **data)
+    return model(**data)
+
+
+def _existing_keys(model, dates):
+    """指定日期既有資料的 (日期集合, upsert key 集合)"""
+    fields = key_fields(_upsert_key(model))
+    dates_found = set()
+    keys = set()
+    for chunk in _chunks(list(dates), DEFAULT_BATCH_SIZE):
+        for values in model.objects.filter(date__in=chunk).values_list(*fields):
+            dates_found.add(values[0])
+            keys.add(values if len(fields) > 1 else values[0])
+    return dates_found, keys
+
+
+def _validate_upserts(serializer_class, items, context):
+    """
+    以同一個序列化器實例逐筆驗證整批資料（與 many=True 的 ListSerializer 相同），回傳每筆的 (驗證後資料, 錯誤)
+    ListSerializer 只要有一筆錯誤就不保留任何驗證結果，非 atomic 模式需要其餘有效的資料，因此逐筆收集；
+    日期的唯一性驗證會逐筆查詢資料庫，而且批次寫入本來就是 upsert，因此移除
+    """
+    serializer = serializer_class(context=context)
+    date_field = serializer.fields['date']
+    date_field.validators = [
+        validator for validator in date_field.validators if not isinstance(validator, UniqueValidator)
+    ]
+    validated = []
+    for item in items:
+        try:
+            validated.append((serializer.run_validation(item), None))
+        except ValidationError as exc:
+            validated.append((None, exc.detail))
+    return validated
+
+
+class BatchWriteMixin:
+    """
+    為 ViewSet 加上 POST {prefix}/batch/ 批次寫入端點
+    Body: {"upsert": [{...}, ...], "delete": ["2026-01-01", ...], "atomic": true}
+    """
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': '請求內容必須為 JSON 物件'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        upserts = request.data.get('upsert', [])
+        deletes = request.data.get('delete', [])
+        atomic = request.data.get('atomic', True)
+
+        if not isinstance(upserts, list) or not isinstance(deletes, list):
+            return Response(
+                {'error': 'upsert 和 delete 必須為陣列'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(atomic, bool):
+            return Response(
+                {'error': 'atomic 必須為 true 或 false'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not upserts and not deletes:
+            return Response(
+                {'error': '請提供 upsert 或 delete 參數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_writes = getattr(settings, 'CALENDAR_BATCH_MAX_WRITES', 10000)
+        if len(upserts) + len(deletes) > max_writes:
+            return Response(
+                {'error': f'單次最多寫入 {max_writes} 筆資料'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.get_queryset().model
+        results = []
+        # seen 為 upsert 的 key，dates 為 upsert 與 delete 涉及的日期；刪除的日期不能同時出現在 upsert 中
+        seen = set()
+        dates = set()
+
+        to_upsert = []
+        validated = _validate_upserts(self.get_serializer_class(), upserts, self.get_serializer_context())
+        for index, (data, errors) in enumerate(validated):
+            result = {'op': 'upsert', 'index': index}
+            obj = _build(model, data) if errors is None else None
+            if obj is not None and _key_value(model, obj) in seen:
+                errors = {'date': [DUPLICATE_HOLIDAY_ERROR if model is Holiday else DUPLICATE_DATE_ERROR]}
+            if errors is not None:
+                result.update(status='error', errors=errors)
+            else:
+                seen.add(_key_value(model, obj))
+                dates.add(obj.date)
+                result['date'] = obj.date.isoformat()
+                to_upsert.append((result, obj))
+            results.append(result)
+
+        to_delete = []
+        for index, value in enumerate(deletes):
+            result = {'op': 'delete', 'index': index}
+            try:
+                day = parse_date(value) if isinstance(value, str) else None
+            except ValueError:
+                day = None
+            if day is None:
+                result.update(status='error', errors={'date': [f'日期格式錯誤: {value}']})
+            elif day in dates:
+                result.update(status='error', errors={'date': [DUPLICATE_DATE_ERROR]})
+            else:
+                dates.add(day)
+                result['date'] = day.isoformat()
+                to_delete.append((result, day))
+            results.append(result)
+
+        failed = len(upserts) + len(deletes) - len(to_upsert) - len(to_delete)
+        if failed and atomic:
+            for result in results:
+                result.setdefault('status', 'skipped')
+            return Response(
+                {'atomic': atomic, 'written': 0, 'errors': failed, 'results': results},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if to_upsert or to_delete:
+            self.perform_batch(model, to_upsert, to_delete)
+
+        return Response({
+            'atomic': atomic,
+            'written': len(to_upsert) + len(to_delete),
+            'errors': failed,
+            'results': results,
+        })
+
+    def perform_batch(self, model, to_upsert, to_delete):
+        """在同一個交易中整批刪除與寫入，並填入每筆的處理結果"""
+        dates = [day for _, day in to_delete] + [obj.date for _, obj in to_upsert]
+        with transaction.atomic():
+            existing_dates, existing_keys = _existing_keys(model, dates)
+            if to_delete:
+                bulk_delete(model, [day for _, day in to_delete])
+            if to_upsert:
+                objects = [obj for _, obj in to_upsert]
+                if model is CalendarDay:
+                    save_calendar_days(objects, _update_fields(model))
+                else:
+                    bulk_upsert(model, objects, _update_fields(model), key=_upsert_key(model))
+            if model is not CalendarDay:
+                # 假日與補班日異動後重新推導受影響日期的 CalendarDay 旗標
+                sync_calendar_days(dates)
+
+        for result, day in to_delete:
+            result['status'] = 'deleted' if day in existing_dates else 'not_found'
+        for result, obj in to_upsert:
+            result['status'] = 'updated' if _key_value(model, obj) in existing_keys else 'created'
@@ -0,0 +1,65 @@
+"""
+效能測試指令（bench_import、bench_api、bench_lookup、bench_async）共用的工具
+- 合成資料 CSV 與暫時的測試資料庫
+- 以 Django 測試用戶端送出請求時的環境（主機名稱、logger、/metrics）
+"""
+import logging
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from .synthetic import generate_gov_rows, write_gov_csv
+
+
+def write_synthetic_gov_csv(path, start_year, years, seed=0):
+    """
+    產生政府行政機關辦公日曆表格式的 CSV（calendar_api.synthetic 的合成資料）
+    回傳寫入的資料列數
+    """
+    return write_gov_csv(path, generate_gov_rows(start_year, years, seed))
+
+
+@contextmanager
+def quiet_loggers(*names, level=logging.ERROR):
+    """測試期間調高指定 logger 的等級（例如逐筆請求的記錄），結束後還原"""
+    loggers = [logging.getLogger(name) for name in names]
+    previous = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(level)
+    try:
+        yield
+    finally:
+        for logger, value in zip(loggers, previous):
+            logger.setLevel(value)
+
+
+@contextmanager
+def temporary_database(path):
+    """建立暫時的測試資料庫，結束後刪除，避免影響正式資料"""
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    original_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        # 使用實體檔案而非記憶體資料庫，才能反映真實的寫入成本
+        test_settings['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        # 測試資料的匯入與請求不列入 /metrics
+        with override_settings(CALENDAR_METRICS_ENABLED=False):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = original_name
+
+
+@contextmanager
+def benchmark_requests(*logger_names):
+    """
+    以測試用戶端（Client / AsyncClient，主機名稱 testserver）送出效能測試請求的環境
+    暫時只允許 testserver，不依賴部署環境的 ALLOWED_HOSTS；
+    不輸出逐筆請求記錄與 logger_names 的記錄，請求也不列入 /metrics
+    """
+    with quiet_loggers('calendar_api.timing', *logger_names), override_settings(
+        ALLOWED_HOSTS=['testserver'], CALENDAR_METRICS_ENABLED=False
+    ):
+        yield
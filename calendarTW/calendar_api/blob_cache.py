@@ -0,0 +1,255 @@
+"""
+預先序列化的回應快取
+以 (端點, 年, 月, 資料集版本) 為鍵，快取已轉成 JSON bytes 的資料，熱門的日曆查詢可略過 ORM 與 DRF 序列化
+- 日曆日期以「月」為單位快取每一天的 JSON，月份、範圍、假日列表都由月份快取組合而成
+- 依位元組大小做 LRU 淘汰；資料集版本改變後舊的項目不會再被命中，最後被淘汰
+- 同一行程內的異動由 maintenance 只移除受影響的月份 / 年份，其餘項目沿用到新版本
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .default_days import exception_storage_enabled, fill_default_days, fill_default_rows
+from .models import CalendarDay, Holiday
+from .serializers import CalendarDaySerializer, HolidaySerializer
+from .streaming import (
+    CALENDAR_DAY_FIELDS,
+    append_fields,
+    render_calendar_day_row,
+    render_lunar_fields_range,
+)
+from .versioning import aget_dataset_version, get_dataset_version
+
+
+class BlobCache:
+    """以總位元組數為上限的 LRU 快取"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def discard(self, predicate):
+        """移除所有 predicate(key) 為 True 的項目"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.size -= self._entries.pop(key)[1]
+
+    def advance(self, previous, version, stale):
+        """
+        資料集版本由 previous 遞增為 version 後，將未受影響的項目沿用到新版本
+        鍵的最後一個元素為資料集版本；stale(key) 為 True 的項目（受異動影響）直接移除，其他舊版本的項目不處理
+        """
+        with self._lock:
+            entries = OrderedDict()
+            for key, entry in self._entries.items():
+                current = key[:-1] + (version,)
+                if key[-1] != previous:
+                    entries[key] = entry
+                elif stale(key) or current in self._entries:
+                    # 新版本已有項目（遞增後才快取的內容）時保留新的
+                    self.size -= entry[1]
+                else:
+                    entries[current] = entry
+            self._entries = entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+blob_cache = BlobCache(getattr(settings, 'CALENDAR_BLOB_CACHE_BYTES', 64 * 1024 * 1024))
+
+_renderer = JSONRenderer()
+
+
+def blob_cache_applies(request):
+    """
+    只有 JSON 回應（且未要求縮排）可以直接輸出快取的 bytes
+    可瀏覽 API 等其他格式仍走一般的序列化流程
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+        blob_cache.max_bytes > 0
+        and renderer is not None
+        and renderer.format == 'json'
+        and 'indent' not in request.accepted_media_type
+    )
+
+
+def json_response(items):
+    """將已序列化的 JSON 物件組成 JSON 陣列回應"""
+    return HttpResponse(b'[' + b','.join(items) + b']', content_type='application/json')
+
+
+def with_lunar_fields(items):
+    """
+    在已序列化的日曆資料（依日期排序）最後加上農曆欄位，回傳 JSON bytes 列表
+    整段範圍一次換算；快取的內容不含農曆欄位，不因 ?lunar= 參數而重複快取
+    """
+    if not items:
+        return []
+    start = items[0][0]
+    fragments = render_lunar_fields_range(start, items[-1][0])
+    return [append_fields(item[3], fragments[(item[0] - start).days]) for item in items]
+
+
+def _month_span(year, month):
+    start = date(year, month, 1)
+    if month == 12:
+        return start, date(year, 12, 31)
+    return start, date(year, month + 1, 1) - timedelta(days=1)
+
+
+def _render_days(calendar_days):
+    """回傳 [(date, is_holiday, is_workday, json_bytes), ...]"""
+    data = CalendarDaySerializer(calendar_days, many=True).data
+    return [
+        (calendar_day.date, calendar_day.is_holiday, calendar_day.is_workday, _renderer.render(row))
+        for calendar_day, row in zip(calendar_days, data)
+    ]
+
+
+def get_month_days(months):
+    """
+    取得多個月份每一天的已序列化資料，回傳 {(year, month): [(date, is_holiday, is_workday, json_bytes), ...]}
+    未命中快取的月份以一次範圍查詢取回；例外日儲存模式下補上未儲存的一般日後再快取
+    """
+    version = get_dataset_version()[0]
+    result = {}
+    missing = []
+    for year, month in months:
+        items = blob_cache.get(('calendar-days', year, month, version))
+        if items is None:
+            missing.append((year, month))
+        else:
+            result[(year, month)] = items
+
+    if missing:
+        start = _month_span(*missing[0])[0]
+        end = _month_span(*missing[-1])[1]
+        fetched = {key: [] for key in missing}
+        queryset = CalendarDay.objects.filter(date__gte=start, date__lte=end)
+        for calendar_day in queryset.iterator(chunk_size=2000):
+            key = (calendar_day.year, calendar_day.month)
+            if key in fetched:
+                fetched[key].append(calendar_day)
+        for key, calendar_days in fetched.items():
+            if exception_storage_enabled():
+                calendar_days = list(fill_default_days(calendar_days, *_month_span(*key)))
+            items = _render_days(calendar_days)
+            blob_cache.set(
+                ('calendar-days', key[0], key[1], version),
+                items,
+                sum(len(item[3]) for item in items) + 64,
+            )
+            result[key] = items
+    return result
+
+
+async def aget_month_days(months):
+    """get_month_days 的非同步版本，快取未命中的月份以 aiterator 取回"""
+    version = (await aget_dataset_version())[0]
+    result = {}
+    missing = []
+    for year, month in months:
+        items = blob_cache.get(('calendar-days', year, month, version))
+        if items is None:
+            missing.append((year, month))
+        else:
+            result[(year, month)] = items
+
+    if missing:
+        start = _month_span(*missing[0])[0]
+        end = _month_span(*missing[-1])[1]
+        fetched = {key: [] for key in missing}
+        queryset = CalendarDay.objects.filter(
+            date__gte=start,
+            date__lte=end,
+        ).order_by('date').values(*CALENDAR_DAY_FIELDS)
+        async for row in queryset.aiterator(chunk_size=2000):
+            key = (row['year'], row['month'])
+            if key in fetched:
+                fetched[key].append(row)
+        for key, rows in fetched.items():
+            if exception_storage_enabled():
+                rows = fill_default_rows(rows, *_month_span(*key))
+            items = [
+                (row['date'], row['is_holiday'], row['is_workday'], render_calendar_day_row(row))
+                for row in rows
+            ]
+            blob_cache.set(
+                ('calendar-days', key[0], key[1], version),
+                items,
+                sum(len(item[3]) for item in items) + 64,
+            )
+            result[key] = items
+    return result
+
+
+def months_between(start_date, end_date):
+    """列出 start_date 到 end_date 之間的所有 (year, month)"""
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def calendar_range_items(start_date, end_date):
+    """日期範圍內每一天的已序列化資料（依日期排序）"""
+    months = months_between(start_date, end_date)
+    by_month = get_month_days(months)
+    return [
+        item
+        for key in months
+        for item in by_month[key]
+        if start_date <= item[0] <= end_date
+    ]
+
+
+def holidays_by_year_blob(year):
+    """HolidayViewSet.by_year 的完整 JSON 回應內容"""
+    version = get_dataset_version()[0]
+    key = ('holidays', year, None, version)
+    blob = blob_cache.get(key)
+    if blob is None:
+        holidays = Holiday.objects.filter(year=year)
+        blob = _renderer.render(HolidaySerializer(holidays, many=True).data)
+        blob_cache.set(key, blob, len(blob))
+    return blob
@@ -0,0 +1,147 @@
+"""
+日期範圍的精簡表示法
+第 n 個位元對應 start_date + n 天，再加上稀疏的假日名稱對照表：
+- 週末（is_weekend）一律是星期六、日，由日期推算，不另外傳送
+- holiday_diff 標示 is_holiday 與週末不同的日期（平日放假、週末不放假），一年只有十幾天
+- workday 標示補班日
+一整年不含假日名稱時 rle 約 190 bytes、bitmask 約 260 bytes；假日名稱是中文字串，另外約 450～600 bytes
+
+位元排列：第 n 天位於第 n // 8 個 byte 的第 n % 8 個位元（低位元在前）
+- bitmask：遮罩以 base64 字串表示
+- rle：遮罩以連續長度陣列表示，由 false 開始交替，例如 [3, 2, 1] 代表 000110
+"""
+import base64
+from datetime import date, timedelta
+
+from .default_days import exception_storage_enabled, with_default_flags
+from .index import calendar_index_enabled, get_calendar_index
+from .models import CalendarDay
+
+COMPACT_ENCODINGS = ('bitmask', 'rle')
+COMPACT_FLAGS = ('holiday_diff', 'workday')
+
+
+def encode_bits(bits):
+    """布林序列轉為 base64 位元遮罩"""
+    packed = bytearray((len(bits) + 7) // 8)
+    for position, bit in enumerate(bits):
+        if bit:
+            packed[position >> 3] |= 1 << (position & 7)
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def decode_bits(value, length):
+    """base64 位元遮罩轉回長度為 length 的布林列表"""
+    packed = base64.b64decode(value)
+    return [bool(packed[position >> 3] >> (position & 7) & 1) for position in range(length)]
+
+
+def encode_runs(bits):
+    """布林序列轉為連續長度陣列（由 false 開始交替）"""
+    runs = []
+    current = False
+    length = 0
+    for bit in bits:
+        if bool(bit) == current:
+            length += 1
+        else:
+            runs.append(length)
+            current = not current
+            length = 1
+    if length:
+        runs.append(length)
+    return runs
+
+
+def decode_runs(runs, length=None):
+    """連續長度陣列轉回布林列表"""
+    bits = []
+    current = False
+    for run in runs:
+        bits.extend([current] * run)
+        current = not current
+    return bits if length is None else bits[:length]
+
+
+def _classifier(start_date, end_date):
+    """回傳 classify(day) -> (is_holiday, is_workday, is_weekend, holiday_name) 或 None"""
+    if calendar_index_enabled():
+        return get_calendar_index().classify
+    rows = CalendarDay.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+    ).values_list('date', 'is_holiday', 'is_workday', 'is_weekend', 'holiday_name')
+    classified = {row[0]: row[1:] for row in rows}
+    if exception_storage_enabled():
+        return with_default_flags(classified.get)
+    return classified.get
+
+
+def compact_range(start_date, end_date, encoding='bitmask'):
+    """
+    產生日期範圍（含頭尾）的精簡表示
+    範圍內有沒有資料的日期時，會多一條 missing 遮罩標示這些日期
+    """
+    classify = _classifier(start_date, end_date)
+    length = (end_date - start_date).days + 1
+
+    columns = {flag: [] for flag in COMPACT_FLAGS}
+    missing = []
+    holiday_names = {}
+    for offset in range(length):
+        # 逐次由 start_date 推算，範圍結束於 9999-12-31 時不會溢位
+        day = start_date + timedelta(days=offset)
+        classification = classify(day)
+        if classification is None:
+            missing.append(True)
+            columns['holiday_diff'].append(False)
+            columns['workday'].append(False)
+            continue
+        missing.append(False)
+        columns['holiday_diff'].append(classification[0] != (day.weekday() >= 5))
+        columns['workday'].append(classification[1])
+        if classification[3] is not None:
+            holiday_names[str(offset)] = classification[3]
+
+    encode = encode_bits if encoding == 'bitmask' else encode_runs
+    payload = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'days': length,
+        'encoding': encoding,
+    }
+    for flag in COMPACT_FLAGS:
+        payload[flag] = encode(columns[flag])
+    if any(missing):
+        payload['missing'] = encode(missing)
+    payload['holiday_names'] = holiday_names
+    return payload
+
+
+def decode_compact(payload):
+    """
+    將精簡表示還原成逐日資料（用戶端可參考此實作）
+    回傳 [{'date', 'is_holiday', 'is_workday', 'is_weekend', 'holiday_name'}, ...]，
+    欄位值與 CalendarDaySerializer 的輸出相同；沒有資料的日期不會出現
+    """
+    start_date = date.fromisoformat(payload['start_date'])
+    length = payload['days']
+    decode = decode_bits if payload['encoding'] == 'bitmask' else decode_runs
+    columns = {flag: decode(payload[flag], length) for flag in COMPACT_FLAGS}
+    missing = decode(payload['missing'], length) if 'missing' in payload else [False] * length
+    names = payload.get('holiday_names', {})
+
+    days = []
+    for offset in range(length):
+        if missing[offset]:
+            continue
+        day = start_date + timedelta(days=offset)
+        is_weekend = day.weekday() >= 5
+        days.append({
+            'date': day.isoformat(),
+            'is_holiday': columns['holiday_diff'][offset] != is_weekend,
+            'is_workday': columns['workday'][offset],
+            'is_weekend': is_weekend,
+            'holiday_name': names.get(str(offset)),
+        })
+    return days
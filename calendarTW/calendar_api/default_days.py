@@ -0,0 +1,117 @@
+"""
+例外日儲存模式 (CALENDAR_EXCEPTION_STORAGE)
+CalendarDay 只儲存「例外日」：假日、補班日與有名稱或說明的日期；
+其餘一般日完全由星期推算（與政府日曆相同，週末的 is_holiday 為 True），查詢時即時補上，
+回應內容與逐日儲存相同，只有補上的日期 id 為 null
+"""
+from datetime import date
+
+from django.conf import settings
+
+from .models import CalendarDay
+
+
+def exception_storage_enabled():
+    """是否只儲存例外日"""
+    return getattr(settings, 'CALENDAR_EXCEPTION_STORAGE', False)
+
+
+def is_default(day, is_holiday, is_workday=False, holiday_name=None, description=None):
+    """日期的各欄位是否與由星期推算的一般日相同（不需要儲存）"""
+    return (
+        not is_workday
+        and is_holiday == (day.weekday() >= 5)
+        and not holiday_name
+        and not description
+    )
+
+
+def is_default_day(calendar_day):
+    return is_default(
+        calendar_day.date,
+        calendar_day.is_holiday,
+        calendar_day.is_workday,
+        calendar_day.holiday_name,
+        calendar_day.description,
+    )
+
+
+def default_flags(day):
+    """一般日的分類資訊，格式與 CalendarIndex.classify 相同：(is_holiday, is_workday, is_weekend, holiday_name)"""
+    weekend = day.weekday() >= 5
+    return (weekend, False, weekend, None)
+
+
+def default_day(day):
+    """一般日的 CalendarDay 物件（未儲存，id 為 None）"""
+    return CalendarDay.from_date(
+        day,
+        is_holiday=day.weekday() >= 5,
+        is_workday=False,
+        holiday_name=None,
+        description=None,
+    )
+
+
+def default_row(day):
+    """一般日的 .values(*CALENDAR_DAY_FIELDS) 資料"""
+    weekday = day.weekday()
+    return {
+        'id': None,
+        'date': day,
+        'year': day.year,
+        'month': day.month,
+        'day': day.day,
+        'weekday': weekday,
+        'is_weekend': weekday >= 5,
+        'is_holiday': weekday >= 5,
+        'is_workday': False,
+        'holiday_name': None,
+        'description': None,
+    }
+
+
+def _fill(items, start, end, date_of, factory):
+    # 以序數逐日前進，範圍到 9999-12-31 也不會溢位
+    current = start.toordinal()
+    for item in items:
+        ordinal = date_of(item).toordinal()
+        while current < ordinal:
+            yield factory(date.fromordinal(current))
+            current += 1
+        yield item
+        current = ordinal + 1
+    last = end.toordinal()
+    while current <= last:
+        yield factory(date.fromordinal(current))
+        current += 1
+
+
+def fill_default_days(calendar_days, start, end):
+    """
+    在依日期排序的 CalendarDay 之間補上 start～end（含）缺少的一般日，逐一產生
+    calendar_days 可以是查詢集或迭代器，不會一次載入
+    """
+    return _fill(calendar_days, start, end, lambda calendar_day: calendar_day.date, default_day)
+
+
+def fill_default_rows(rows, start, end):
+    """fill_default_days 的 .values() 版本"""
+    return _fill(rows, start, end, lambda row: row['date'], default_row)
+
+
+def with_default_flags(classify):
+    """包裝 classify(day)，沒有資料的日期改回傳一般日的分類"""
+    return lambda day: classify(day) or default_flags(day)
+
+
+def get_or_default(day):
+    """取得指定日期的 CalendarDay，沒有資料時回傳一般日（僅用於例外日儲存模式）"""
+    calendar_day = CalendarDay.objects.filter(date=day).first()
+    return calendar_day if calendar_day is not None else default_day(day)
+
+
+async def aget_or_default(day):
+    """get_or_default 的非同步版本"""
+    calendar_day = await CalendarDay.objects.filter(date=day).afirst()
+    return calendar_day if calendar_day is not None else default_day(day)
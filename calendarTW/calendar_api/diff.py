@@ -0,0 +1,131 @@
+"""
+匯入資料的差異比對
+以 key（日期）比對資料庫現有的資料與匯入檔案解析出的資料，匯入指令只寫入新增、變更與移除的資料列；
+重新匯入沒有變動的檔案時不寫入任何資料，資料集版本與快取也維持不變
+
+匯入指令逐批比對（每批只查詢該批日期範圍內的既有資料），再以 DiffTotals 累計各批的結果，
+記憶體用量不隨檔案大小增加
+"""
+# 差異明細輸出到終端機時，每個模型最多列出的筆數（JSON 輸出不受限制）
+DETAIL_LIMIT = 20
+
+
+def load_existing(queryset, fields, key='date'):
+    """以一次查詢取回 {key: 欄位值 tuple}"""
+    return {row[0]: row[1:] for row in queryset.values_list(key, *fields).iterator()}
+
+
+def date_span(dates):
+    """日期集合的 (最早, 最晚)；沒有日期時回傳 None"""
+    return (min(dates), max(dates)) if dates else None
+
+
+class KeyedDiff:
+    """
+    一個模型的差異：inserted / removed 為 {key: 欄位值 tuple}，changed 為 {key: (原本的值, 新的值)}
+    """
+
+    def __init__(self, fields, existing, incoming):
+        self.fields = tuple(fields)
+        self.inserted = {}
+        self.changed = {}
+        self.unchanged = 0
+        for key, values in incoming.items():
+            current = existing.get(key)
+            if current is None:
+                self.inserted[key] = values
+            elif current != values:
+                self.changed[key] = (current, values)
+            else:
+                self.unchanged += 1
+        self.removed = {key: values for key, values in existing.items() if key not in incoming}
+
+    def __bool__(self):
+        return bool(self.inserted or self.changed or self.removed)
+
+    def written(self):
+        """需要寫入（新增或變更）的 {key: 新的值}"""
+        values = dict(self.inserted)
+        values.update((key, new) for key, (_, new) in self.changed.items())
+        return values
+
+    def counts(self):
+        return {
+            'inserted': len(self.inserted),
+            'changed': len(self.changed),
+            'removed': len(self.removed),
+            'unchanged': self.unchanged,
+        }
+
+    def _record(self, key, values):
+        return {'date': key, **dict(zip(self.fields, values))}
+
+    def to_dict(self):
+        """可序列化為 JSON 的差異內容（日期需以 DjangoJSONEncoder 輸出）"""
+        return {
+            **self.counts(),
+            'inserted_rows': [self._record(key, self.inserted[key]) for key in sorted(self.inserted)],
+            'changed_rows': [
+                {
+                    'date': key,
+                    'before': dict(zip(self.fields, before)),
+                    'after': dict(zip(self.fields, after)),
+                }
+                for key, (before, after) in sorted(self.changed.items())
+            ],
+            'removed_rows': [self._record(key, self.removed[key]) for key in sorted(self.removed)],
+        }
+
+    def lines(self, limit=DETAIL_LIMIT):
+        """差異明細（+ 新增、~ 變更、- 移除），依日期排序，最多 limit 行"""
+        entries = [(key, '+', values) for key, values in self.inserted.items()]
+        entries += [(key, '~', values) for key, values in self.changed.items()]
+        entries += [(key, '-', values) for key, values in self.removed.items()]
+        entries.sort(key=lambda entry: entry[0])
+
+        lines = []
+        for key, mark, values in entries[:limit]:
+            if mark == '~':
+                before, after = values
+                detail = ', '.join(
+                    f'{name}: {old!r} → {new!r}'
+                    for name, old, new in zip(self.fields, before, after) if old != new
+                )
+            else:
+                detail = ', '.join(f'{name}={value!r}' for name, value in zip(self.fields, values))
+            lines.append(f'{mark} {key} {detail}')
+        if len(entries) > limit:
+            lines.append(f'... 另有 {len(entries) - limit} 筆')
+        return lines
+
+
+class DiffTotals:
+    """
+    累計逐批比對的 KeyedDiff，提供與 KeyedDiff 相同的 counts() / lines() / to_dict()
+    keep_rows 為 False 時只累計筆數，不保留差異明細（直接寫入時不需要明細）
+    """
+
+    def __init__(self, fields, keep_rows=True):
+        self.keep_rows = keep_rows
+        self.rows = KeyedDiff(fields, {}, {})
+        self.totals = {'inserted': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+
+    def add(self, diff):
+        for name, count in diff.counts().items():
+            self.totals[name] += count
+        if self.keep_rows:
+            self.rows.inserted.update(diff.inserted)
+            self.rows.changed.update(diff.changed)
+            self.rows.removed.update(diff.removed)
+
+    def __bool__(self):
+        return bool(self.totals['inserted'] or self.totals['changed'] or self.totals['removed'])
+
+    def counts(self):
+        return dict(self.totals)
+
+    def lines(self, limit=DETAIL_LIMIT):
+        return self.rows.lines(limit)
+
+    def to_dict(self):
+        return {**self.rows.to_dict(), **self.counts()}
@@ -0,0 +1,166 @@
+"""
+國定假日規則引擎
+依「紀念日及節日實施條例」推算任意年份（農曆表範圍內）的放假日，取代逐年手寫的假日資料：
+- 固定日期的紀念日及節日，每條規則可限定適用年份（條例歷次修正增減的假日）
+- 農曆節日：以 lunar 模組的精簡農曆表換算成西元日期
+- 民族掃墓節：放在清明節氣當天（lunar.solar_terms）
+- 兒童節與民族掃墓節同一日時，於前一日放假；但逢星期四時，於後一日放假
+- 補假：逢星期六於前一個上班日補假，逢星期日於次一個上班日補假；
+  農曆除夕及春節（含除夕前一日）逢例假日，均於次一個上班日補假
+
+行政院人事行政總處每年公告的調整放假日與補行上班日沒有固定規則，不在此產生，
+需要時仍以 import_gov_calendar 匯入政府日曆覆蓋；補假規則以現行條例為準，
+2001 年週休二日以前的年份只求假日名稱與日期正確
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from . import lunar
+
+# 固定日期的紀念日及節日；since / until 為適用的起訖年份（含），None 表示不限
+FixedHoliday = namedtuple('FixedHoliday', 'month day name since until')
+# 農曆節日；十二月的節日屬於前一個農曆年，day 以負數表示距離正月初一的天數（-1 為除夕）
+LunarHoliday = namedtuple('LunarHoliday', 'month day name since until new_year')
+# 推算結果，欄位對應 Holiday 模型
+HolidayOccurrence = namedtuple('HolidayOccurrence', 'date name holiday_type is_lunar description')
+# 一天的日曆旗標，欄位對應 CalendarDay 模型
+DayFlags = namedtuple('DayFlags', 'date is_holiday holiday_name description')
+
+FIXED_HOLIDAYS = [
+    FixedHoliday(1, 1, '中華民國開國紀念日', None, None),
+    FixedHoliday(2, 28, '和平紀念日', 1997, None),
+    FixedHoliday(3, 29, '青年節', None, 2000),
+    FixedHoliday(4, 4, '兒童節', None, 1997),
+    FixedHoliday(4, 4, '兒童節', 2011, None),
+    FixedHoliday(5, 1, '勞動節', 2025, None),
+    FixedHoliday(9, 28, '孔子誕辰紀念日', None, 2000),
+    FixedHoliday(9, 28, '孔子誕辰紀念日', 2025, None),
+    FixedHoliday(10, 10, '國慶日', None, None),
+    FixedHoliday(10, 25, '臺灣光復節', None, 2000),
+    FixedHoliday(10, 25, '臺灣光復暨金門古寧頭大捷紀念日', 2025, None),
+    FixedHoliday(10, 31, '蔣公誕辰紀念日', None, 2000),
+    FixedHoliday(11, 12, '國父誕辰紀念日', None, 2000),
+    FixedHoliday(12, 25, '行憲紀念日', None, 2000),
+    FixedHoliday(12, 25, '行憲紀念日', 2025, None),
+]
+
+LUNAR_HOLIDAYS = [
+    LunarHoliday(12, -2, '農曆除夕前一日', 2026, None, True),
+    LunarHoliday(12, -1, '農曆除夕', None, None, True),
+    LunarHoliday(1, 1, '春節', None, None, True),
+    LunarHoliday(1, 2, '春節', None, None, True),
+    LunarHoliday(1, 3, '春節', None, None, True),
+    LunarHoliday(5, 5, '端午節', None, None, False),
+    LunarHoliday(8, 15, '中秋節', None, None, False),
+]
+
+TOMB_SWEEPING_DAY = '民族掃墓節'
+CHILDRENS_DAY = '兒童節'
+
+MIN_YEAR = lunar.MIN_YEAR
+MAX_YEAR = lunar.MAX_YEAR
+
+
+def _applies(rule, year):
+    return (rule.since is None or year >= rule.since) and (rule.until is None or year <= rule.until)
+
+
+def qingming(year):
+    """清明節氣的日期（4 月 4 日或 5 日）"""
+    return lunar.solar_term_date(year, '清明')
+
+
+def _lunar_date(year, rule):
+    """農曆節日在西元 year 年的日期"""
+    if rule.month == 12:
+        # 由正月初一往前推，前一個農曆年有閏十二月時也能正確取得除夕
+        return lunar.lunar_new_year(year) + timedelta(days=rule.day)
+    return lunar.to_solar(year, rule.month, rule.day)
+
+
+def base_holidays(year):
+    """
+    西元 year 年的紀念日及節日（不含補假），回傳 {date: (名稱, 是否農曆, 是否屬於春節連假)}
+    """
+    holidays = {}
+    tomb_sweeping = qingming(year)
+    for rule in FIXED_HOLIDAYS:
+        if not _applies(rule, year):
+            continue
+        value = date(year, rule.month, rule.day)
+        if rule.name == CHILDRENS_DAY and value == tomb_sweeping:
+            value += timedelta(days=1 if value.weekday() == 3 else -1)
+        holidays[value] = (rule.name, False, False)
+    holidays[tomb_sweeping] = (TOMB_SWEEPING_DAY, False, False)
+
+    for rule in LUNAR_HOLIDAYS:
+        if _applies(rule, year):
+            holidays.setdefault(_lunar_date(year, rule), (rule.name, True, rule.new_year))
+    return holidays
+
+
+def _is_off(day, off):
+    return day.weekday() >= 5 or day in off
+
+
+def _check_range(start_year, end_year):
+    if start_year > end_year:
+        raise ValueError(f'起始年份 {start_year} 大於結束年份 {end_year}')
+    if start_year < MIN_YEAR or end_year > MAX_YEAR:
+        raise lunar.LunarDateError(f'年份需介於 {MIN_YEAR} 與 {MAX_YEAR} 之間: {start_year}～{end_year}')
+
+
+def generate_holidays(start_year, end_year):
+    """
+    推算 start_year～end_year 年（含）所有放假日，依日期排序回傳 HolidayOccurrence 列表
+    補假可能跨年（例如 1/1 逢週六於前一年 12/31 補假），因此前後各多算一年再篩選
+    """
+    _check_range(start_year, end_year)
+    base = {}
+    for year in range(max(start_year - 1, MIN_YEAR), min(end_year + 1, MAX_YEAR) + 1):
+        base.update(base_holidays(year))
+
+    off = set(base)
+    occurrences = []
+    for value in sorted(base):
+        name, is_lunar, new_year = base[value]
+        occurrences.append(HolidayOccurrence(value, name, 'national', is_lunar, ''))
+        if value.weekday() < 5:
+            continue
+
+        backward = value.weekday() == 5 and not new_year
+        step = timedelta(days=-1 if backward else 1)
+        substitute = value + step
+        while _is_off(substitute, off):
+            substitute += step
+        off.add(substitute)
+        weekday = '星期六' if value.weekday() == 5 else '星期日'
+        occurrences.append(HolidayOccurrence(
+            substitute, f'{name}補假', 'flexible', is_lunar, f'{name}逢{weekday}補假'
+        ))
+
+    start, end = date(start_year, 1, 1), date(end_year, 12, 31)
+    return sorted(
+        (occurrence for occurrence in occurrences if start <= occurrence.date <= end),
+        key=lambda occurrence: occurrence.date,
+    )
+
+
+def generate_day_flags(start_year, end_year, holidays=None):
+    """
+    依序產生 start_year～end_year 年每一天的 DayFlags
+    與政府日曆相同，週末與放假日的 is_holiday 皆為 True
+    """
+    if holidays is None:
+        holidays = generate_holidays(start_year, end_year)
+    by_date = {holiday.date: holiday for holiday in holidays}
+    current = date(start_year, 1, 1)
+    end = date(end_year, 12, 31)
+    one_day = timedelta(days=1)
+    while current <= end:
+        holiday = by_date.get(current)
+        if holiday is not None:
+            yield DayFlags(current, True, holiday.name, holiday.description or None)
+        else:
+            yield DayFlags(current, current.weekday() >= 5, None, None)
+        current += one_day
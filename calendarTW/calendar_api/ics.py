@@ -0,0 +1,167 @@
+"""
+iCalendar (RFC 5545) 訂閱來源
+將 Holiday 與 WorkdayAdjustment 轉成全天事件，以串流方式輸出，並依資料集版本快取產生好的內容
+"""
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from rest_framework.renderers import BaseRenderer
+
+from .blob_cache import blob_cache
+from .models import Holiday, WorkdayAdjustment
+from .versioning import get_dataset_version
+
+WORKDAY_TYPE = 'workday'
+FEED_TYPES = [choice[0] for choice in Holiday.HOLIDAY_TYPE_CHOICES] + [WORKDAY_TYPE]
+
+HOLIDAY_TYPE_LABELS = dict(Holiday.HOLIDAY_TYPE_CHOICES)
+
+CALENDAR_HEADER = '\r\n'.join([
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    'PRODID:-//calendarTW//Taiwan Calendar API//ZH',
+    'CALSCALE:GREGORIAN',
+    'METHOD:PUBLISH',
+    'X-WR-CALNAME:台灣行事曆',
+    'X-WR-TIMEZONE:Asia/Taipei',
+    'REFRESH-INTERVAL;VALUE=DURATION:P1D',
+    'X-PUBLISHED-TTL:P1D',
+]).encode('utf-8') + b'\r\n'
+
+CALENDAR_FOOTER = b'END:VCALENDAR\r\n'
+
+
+class ICalendarRenderer(BaseRenderer):
+    """text/calendar 回應；內容由 stream_feed 產生，這裡只負責內容協商"""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+def escape_text(value):
+    """依 RFC 5545 跳脫 TEXT 值"""
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """將一行以 75 octets 為上限折行（不切斷 UTF-8 多位元組字元）"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return encoded + b'\r\n'
+
+    parts = []
+    current = b''
+    limit = 75
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current)
+            current = b''
+            limit = 74  # 續行開頭的空白佔 1 octet
+        current += char_bytes
+    parts.append(current)
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def _event(uid, day, summary, description, category, dtstamp):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART;VALUE=DATE:{day:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{escape_text(summary)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    lines += [
+        f'CATEGORIES:{escape_text(category)}',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+    return b''.join(fold_line(line) for line in lines)
+
+
+def _holiday_events(start_year, end_year, holiday_types, dtstamp):
+    holidays = Holiday.objects.filter(
+        year__gte=start_year,
+        year__lte=end_year,
+        holiday_type__in=holiday_types,
+    ).order_by('date', 'id').values_list('id', 'date', 'name', 'holiday_type', 'description')
+
+    for holiday_id, day, name, holiday_type, description in holidays.iterator(chunk_size=2000):
+        yield day, _event(
+            f'holiday-{holiday_id}@calendartw',
+            day,
+            name,
+            description,
+            HOLIDAY_TYPE_LABELS.get(holiday_type, holiday_type),
+            dtstamp,
+        )
+
+
+def _workday_events(start_year, end_year, dtstamp):
+    workdays = WorkdayAdjustment.objects.filter(
+        date__year__gte=start_year,
+        date__year__lte=end_year,
+    ).order_by('date').values_list('id', 'date', 'compensate_for', 'description')
+
+    for workday_id, day, compensate_for, description in workdays.iterator(chunk_size=2000):
+        detail = f'補 {compensate_for.isoformat()} 的假'
+        yield day, _event(
+            f'workday-{workday_id}@calendartw',
+            day,
+            '補行上班',
+            f'{description}\n{detail}' if description else detail,
+            '補行上班日',
+            dtstamp,
+        )
+
+
+def _cache_key(start_year, end_year, types):
+    return ('ics', (start_year, end_year, tuple(sorted(types))), None, get_dataset_version()[0])
+
+
+def cached_feed(start_year, end_year, types):
+    """已快取的完整 ICS 內容，未命中時回傳 None"""
+    return blob_cache.get(_cache_key(start_year, end_year, types))
+
+
+def stream_feed(start_year, end_year, types):
+    """
+    一邊查詢一邊產生 ICS 內容的 bytes 片段
+    完整輸出後將結果以資料集版本為鍵寫入 blob_cache（用戶端中途斷線則不快取）
+    """
+    key = _cache_key(start_year, end_year, types)
+    updated_at = get_dataset_version()[1]
+
+    # DTSTAMP 使用資料集更新時間，相同版本的輸出內容完全相同
+    stamp_time = updated_at or datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    dtstamp = stamp_time.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+    sources = []
+    holiday_types = [holiday_type for holiday_type in types if holiday_type != WORKDAY_TYPE]
+    if holiday_types:
+        sources.append(_holiday_events(start_year, end_year, holiday_types, dtstamp))
+    if WORKDAY_TYPE in types:
+        sources.append(_workday_events(start_year, end_year, dtstamp))
+
+    chunks = [CALENDAR_HEADER]
+    yield CALENDAR_HEADER
+    for _, event in heapq.merge(*sources, key=lambda item: item[0]):
+        chunks.append(event)
+        yield event
+    chunks.append(CALENDAR_FOOTER)
+    yield CALENDAR_FOOTER
+
+    blob = b''.join(chunks)
+    blob_cache.set(key, blob, len(blob))
@@ -0,0 +1,319 @@
+"""
+記憶體內日曆索引
+將 CalendarDay 壓縮成每日旗標陣列與字串表，讓查詢端點以 O(1) 取得資料而不需查詢資料庫
+"""
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .default_days import default_day, default_flags, exception_storage_enabled
+from .models import CalendarDay
+from .versioning import aget_dataset_version, get_dataset_version
+
+# 每日旗標位元
+FLAG_EXISTS = 1
+FLAG_WEEKEND = 2
+FLAG_HOLIDAY = 4
+FLAG_WORKDAY = 8
+
+INDEX_FIELDS = ('id', 'date', 'is_weekend', 'is_holiday', 'is_workday', 'holiday_name', 'description')
+
+# 一次異動超過此日期數時直接讓索引失效，下一次查詢時重建
+INDEX_PATCH_LIMIT = 1000
+
+
+class CalendarIndex:
+    """
+    唯讀的日曆索引
+    以第一筆資料的日期為基準，第 n 個位置對應 start + n 天
+    - flags: 每日一個 byte 的旗標 (是否有資料/週末/假日/補班)
+    - ids: CalendarDay 主鍵
+    - name_ids / description_ids: 指向字串表的索引，0 代表 None
+    - defaults: 例外日儲存模式，沒有資料的日期（包含資料範圍以外）視為由星期推算的一般日
+    """
+
+    def __init__(self, start, flags, ids, name_ids, description_ids, strings, version=0, defaults=False):
+        self.start = start
+        self.flags = flags
+        self.ids = ids
+        self.name_ids = name_ids
+        self.description_ids = description_ids
+        self.strings = strings
+        self.version = version
+        self.defaults = defaults
+        self.built_at = time.monotonic()
+        self._workday_counts = None
+
+    @classmethod
+    def build(cls):
+        """從資料庫一次載入所有 CalendarDay 建立索引"""
+        # 先取得版本再載入資料，載入期間若有異動，下一次查詢會再重建
+        version = get_dataset_version()[0]
+        defaults = exception_storage_enabled()
+        rows = list(CalendarDay.objects.order_by('date').values_list(*INDEX_FIELDS))
+        if not rows:
+            return cls(None, array('B'), array('q'), array('I'), array('I'), [None], version, defaults)
+
+        start = rows[0][1]
+        size = (rows[-1][1] - start).days + 1
+        index = cls(
+            start,
+            array('B', bytes(size)),
+            array('q', bytes(8 * size)),
+            array('I', bytes(4 * size)),
+            array('I', bytes(4 * size)),
+            [None],
+            version,
+            defaults,
+        )
+        index._store(rows)
+        return index
+
+    def _store(self, rows):
+        """寫入 values_list(*INDEX_FIELDS) 的資料，日期需位於陣列範圍內"""
+        # 字串表：相同的假日名稱與說明只存一次
+        strings = self.strings
+        string_ids = {value: position for position, value in enumerate(strings)}
+
+        def intern(value):
+            if value not in string_ids:
+                string_ids[value] = len(strings)
+                strings.append(value)
+            return string_ids[value]
+
+        start = self.start
+        for pk, day, is_weekend, is_holiday, is_workday, name, description in rows:
+            offset = (day - start).days
+            self.flags[offset] = (
+                FLAG_EXISTS
+                | (FLAG_WEEKEND if is_weekend else 0)
+                | (FLAG_HOLIDAY if is_holiday else 0)
+                | (FLAG_WORKDAY if is_workday else 0)
+            )
+            self.ids[offset] = pk
+            self.name_ids[offset] = intern(name)
+            self.description_ids[offset] = intern(description)
+
+    def patched(self, dates, rows):
+        """
+        回傳更新 dates 後的新索引（寫入時複製，正在使用舊索引的請求不受影響）
+        rows 為這些日期目前的資料 (values_list(*INDEX_FIELDS))，沒有出現在 rows 中的日期視為已刪除；
+        新日期超出範圍時陣列往前或往後延伸
+        """
+        end = self.start + timedelta(days=len(self) - 1)
+        first = min([self.start] + [row[1] for row in rows])
+        last = max([end] + [row[1] for row in rows])
+        before = (self.start - first).days
+        after = (last - end).days
+
+        def extend(values, itemsize):
+            typecode = values.typecode
+            return array(typecode, bytes(itemsize * before)) + values + array(typecode, bytes(itemsize * after))
+
+        index = CalendarIndex(
+            first,
+            extend(self.flags, 1),
+            extend(self.ids, 8),
+            extend(self.name_ids, 4),
+            extend(self.description_ids, 4),
+            list(self.strings),
+            self.version,
+            self.defaults,
+        )
+        # 沿用原本的建立時間，CALENDAR_INDEX_MAX_AGE 的定期重建不因就地更新而延後
+        index.built_at = self.built_at
+        for day in dates:
+            offset = (day - first).days
+            if 0 <= offset < len(index.flags):
+                index.flags[offset] = 0
+                index.ids[offset] = 0
+                index.name_ids[offset] = 0
+                index.description_ids[offset] = 0
+        index._store(rows)
+        return index
+
+    def __len__(self):
+        return len(self.flags)
+
+    def offset(self, day):
+        """回傳日期在陣列中的位置，沒有資料時回傳 None"""
+        if self.start is None:
+            return None
+        offset = (day - self.start).days
+        if offset < 0 or offset >= len(self.flags) or not self.flags[offset] & FLAG_EXISTS:
+            return None
+        return offset
+
+    def __contains__(self, day):
+        return self.offset(day) is not None
+
+    def classify(self, day):
+        """
+        取得日期的分類資訊
+        回傳 (is_holiday, is_workday, is_weekend, holiday_name)，沒有資料時回傳 None（例外日儲存模式下回傳一般日）
+        """
+        offset = self.offset(day)
+        if offset is None:
+            return default_flags(day) if self.defaults else None
+        flag = self.flags[offset]
+        return (
+            bool(flag & FLAG_HOLIDAY),
+            bool(flag & FLAG_WORKDAY),
+            bool(flag & FLAG_WEEKEND),
+            self.strings[self.name_ids[offset]],
+        )
+
+    def get(self, day):
+        """
+        取得日期對應的 CalendarDay 物件（不查詢資料庫）
+        可直接交給 CalendarDaySerializer 序列化，沒有資料時回傳 None（例外日儲存模式下回傳一般日）
+        """
+        offset = self.offset(day)
+        if offset is None:
+            return default_day(day) if self.defaults else None
+        flag = self.flags[offset]
+        return CalendarDay(
+            id=self.ids[offset],
+            date=day,
+            year=day.year,
+            month=day.month,
+            day=day.day,
+            weekday=day.weekday(),
+            is_weekend=bool(flag & FLAG_WEEKEND),
+            is_holiday=bool(flag & FLAG_HOLIDAY),
+            is_workday=bool(flag & FLAG_WORKDAY),
+            holiday_name=self.strings[self.name_ids[offset]],
+            description=self.strings[self.description_ids[offset]],
+        )
+
+    def is_working_day(self, offset):
+        """
+        判斷陣列位置是否為需上班的日子
+        補班日一定上班；否則非週末且非假日才上班。沒有資料的日期只依星期判斷
+        """
+        flag = self.flags[offset]
+        if flag & FLAG_WORKDAY:
+            return True
+        if not flag & FLAG_EXISTS:
+            return (self.start + timedelta(days=offset)).weekday() < 5
+        return not flag & (FLAG_WEEKEND | FLAG_HOLIDAY)
+
+    @property
+    def workday_counts(self):
+        """
+        上班日累計陣列 (prefix sum)
+        workday_counts[n] 為位置 0 到 n-1 之間的上班日數量，長度為 len(self) + 1
+        """
+        if self._workday_counts is None:
+            counts = array('I', bytes(4 * (len(self.flags) + 1)))
+            total = 0
+            for offset in range(len(self.flags)):
+                if self.is_working_day(offset):
+                    total += 1
+                counts[offset + 1] = total
+            self._workday_counts = counts
+        return self._workday_counts
+
+    def dates(self):
+        """依序產生索引中所有有資料的日期"""
+        if self.start is None:
+            return
+        for offset, flag in enumerate(self.flags):
+            if flag & FLAG_EXISTS:
+                yield self.start + timedelta(days=offset)
+
+
+_index = None
+_lock = threading.Lock()
+_builds = 0
+
+
+def get_calendar_index():
+    """
+    取得行程內共用的日曆索引
+    第一次呼叫、資料集版本改變（包含其他行程的匯入）或超過 CALENDAR_INDEX_MAX_AGE 秒後會重新建立
+    """
+    global _index, _builds
+    index = _index
+    if index is not None and not _is_stale(index):
+        return index
+
+    with _lock:
+        # 其他執行緒可能已經重建完成
+        index = _index
+        if index is None or _is_stale(index):
+            index = CalendarIndex.build()
+            _index = index
+            _builds += 1
+    return index
+
+
+async def aget_calendar_index():
+    """
+    get_calendar_index 的非同步版本
+    索引仍有效時直接回傳，不佔用執行緒；需要重建時才交給執行緒執行
+    """
+    index = _index
+    if index is not None and not _is_stale(index, (await aget_dataset_version())[0]):
+        return index
+    return await sync_to_async(get_calendar_index)()
+
+
+def _is_stale(index, version=None):
+    max_age = getattr(settings, 'CALENDAR_INDEX_MAX_AGE', 300)
+    if time.monotonic() - index.built_at >= max_age:
+        return True
+    if version is None:
+        version = get_dataset_version()[0]
+    return index.version != version
+
+
+def index_builds():
+    """目前行程重建索引的次數（/metrics 使用）"""
+    return _builds
+
+
+def invalidate_calendar_index():
+    """清除索引，下一次查詢時重新建立"""
+    global _index
+    _index = None
+
+
+def update_calendar_index(dates):
+    """
+    只重新載入指定日期，更新行程內的索引（寫入時複製）
+    索引尚未建立時不做事；索引為空或異動的日期太多時讓索引失效，下一次查詢時重建
+    """
+    global _index
+    dates = set(dates)
+    if not dates:
+        return
+    with _lock:
+        index = _index
+        if index is None:
+            return
+        if index.start is None or len(dates) > INDEX_PATCH_LIMIT:
+            _index = None
+            return
+        rows = list(CalendarDay.objects.filter(date__in=dates).values_list(*INDEX_FIELDS))
+        _index = index.patched(dates, rows)
+
+
+def advance_calendar_index(version):
+    """
+    資料集版本遞增為 version 後呼叫
+    索引的版本為前一版時，表示之後的異動都已由 update_calendar_index 更新，直接沿用到新版本而不重建；
+    其他行程的異動會讓版本跳號，索引照常在下一次查詢時重建
+    """
+    index = _index
+    if index is not None and index.version == version - 1:
+        index.version = version
+
+
+def calendar_index_enabled():
+    """是否使用記憶體索引回應查詢端點"""
+    return getattr(settings, 'CALENDAR_INDEX_ENABLED', True)
@@ -0,0 +1,88 @@
+"""
+CSV 串流讀取工具
+只讀取檔案開頭的少量位元組判斷編碼，再以產生器逐行讀取，整個檔案只讀一次、不整批載入記憶體
+"""
+import codecs
+import io
+from contextlib import contextmanager
+from itertools import islice
+
+# 判斷編碼時讀取的位元組數
+SAMPLE_SIZE = 64 * 1024
+
+# 非 UTF-8 檔案依序嘗試的編碼（政府資料常用 Big5）
+FALLBACK_ENCODINGS = ['big5', 'cp950']
+
+
+class EncodingDetectionError(ValueError):
+    """無法判斷檔案編碼"""
+
+
+def _decodes(sample, encoding):
+    """判斷位元組樣本能否以指定編碼解碼（容許樣本尾端被截斷的多位元組字元）"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(sample):
+    """
+    從檔案開頭的位元組判斷編碼
+    依序判斷 BOM、UTF-8、Big5 / cp950，都不符合時回傳 None
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if _decodes(sample, 'utf-8'):
+        return 'utf-8'
+    for encoding in FALLBACK_ENCODINGS:
+        if _decodes(sample, encoding):
+            return encoding
+    return None
+
+
+@contextmanager
+def open_csv(path, encoding=None, sample_size=SAMPLE_SIZE, profiler=None):
+    """
+    開啟 CSV 檔案並回傳 (文字串流, 使用的編碼)
+    未指定 encoding 時自動偵測；指定 utf-8 但檔案有 BOM 時改用 utf-8-sig
+    傳入啟用中的 ImportProfiler 時，讀檔與解碼的時間分別計入 read / decode 階段，
+    此時回傳的是逐行產生文字的 iterator（csv.reader / DictReader 都可直接使用）
+
+    用法：
+        with open_csv(path) as (f, encoding):
+            for row in csv.DictReader(f):
+                ...
+    """
+    raw = open(path, 'rb', buffering=sample_size)
+    try:
+        # peek 只會填滿緩衝區，後續讀取直接使用同一份資料，不會重讀檔案
+        if profiler is not None:
+            with profiler.phase('read'):
+                sample = raw.peek(sample_size)[:sample_size]
+        else:
+            sample = raw.peek(sample_size)[:sample_size]
+        if encoding is None:
+            encoding = detect_encoding(sample)
+            if encoding is None:
+                raise EncodingDetectionError(f'無法判斷檔案編碼: {path}')
+        elif codecs.lookup(encoding).name == 'utf-8' and sample.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+        if profiler is not None:
+            text = io.TextIOWrapper(profiler.wrap_buffer(raw), encoding=encoding, newline='')
+            yield profiler.iterate('decode', text), encoding
+        else:
+            yield io.TextIOWrapper(raw, encoding=encoding, newline=''), encoding
+    finally:
+        raw.close()
+
+
+def chunked(iterable, size):
+    """將產生器切成每批 size 筆的 list，最後一批可能不足 size 筆"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,309 @@
+"""
+農曆（陰陽曆）日期換算與二十四節氣
+以 1900～2100 年的精簡農曆表計算，每年以一個整數表示：
+- 第 0～3 位元：閏月月份（0 表示該年沒有閏月）
+- 第 4～15 位元：一月～十二月是否為大月（30 天），一月在第 15 位元
+- 第 16 位元：閏月是否為大月
+農曆 1900 年正月初一為西元 1900-01-31
+
+載入時由農曆表展開每個農曆月第一天的日序，西元轉農曆只需查表（每年最多 13 個月），
+整段範圍則逐日遞增換算；節氣以太陽視黃經推算（台灣時間），每年計算一次後快取
+"""
+import math
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+
+LUNAR_INFO = (
+    0x04bd8, 0x04ae0, 0x0a570, 0x054d5, 0x0d260, 0x0d950, 0x16554, 0x056a0, 0x09ad0, 0x055d2,  # 1900-1909
+    0x04ae0, 0x0a5b6, 0x0a4d0, 0x0d250, 0x1d255, 0x0b540, 0x0d6a0, 0x0ada2, 0x095b0, 0x14977,  # 1910-1919
+    0x04970, 0x0a4b0, 0x0b4b5, 0x06a50, 0x06d40, 0x1ab54, 0x02b60, 0x09570, 0x052f2, 0x04970,  # 1920-1929
+    0x06566, 0x0d4a0, 0x0ea50, 0x16a95, 0x05ad0, 0x02b60, 0x186e3, 0x092e0, 0x1c8d7, 0x0c950,  # 1930-1939
+    0x0d4a0, 0x1d8a6, 0x0b550, 0x056a0, 0x1a5b4, 0x025d0, 0x092d0, 0x0d2b2, 0x0a950, 0x0b557,  # 1940-1949
+    0x06ca0, 0x0b550, 0x15355, 0x04da0, 0x0a5b0, 0x14573, 0x052b0, 0x0a9a8, 0x0e950, 0x06aa0,  # 1950-1959
+    0x0aea6, 0x0ab50, 0x04b60, 0x0aae4, 0x0a570, 0x05260, 0x0f263, 0x0d950, 0x05b57, 0x056a0,  # 1960-1969
+    0x096d0, 0x04dd5, 0x04ad0, 0x0a4d0, 0x0d4d4, 0x0d250, 0x0d558, 0x0b540, 0x0b6a0, 0x195a6,  # 1970-1979
+    0x095b0, 0x049b0, 0x0a974, 0x0a4b0, 0x0b27a, 0x06a50, 0x06d40, 0x0af46, 0x0ab60, 0x09570,  # 1980-1989
+    0x04af5, 0x04970, 0x064b0, 0x074a3, 0x0ea50, 0x06b58, 0x05ac0, 0x0ab60, 0x096d5, 0x092e0,  # 1990-1999
+    0x0c960, 0x0d954, 0x0d4a0, 0x0da50, 0x07552, 0x056a0, 0x0abb7, 0x025d0, 0x092d0, 0x0cab5,  # 2000-2009
+    0x0a950, 0x0b4a0, 0x0baa4, 0x0ad50, 0x055d9, 0x04ba0, 0x0a5b0, 0x15176, 0x052b0, 0x0a930,  # 2010-2019
+    0x07954, 0x06aa0, 0x0ad50, 0x05b52, 0x04b60, 0x0a6e6, 0x0a4e0, 0x0d260, 0x0ea65, 0x0d530,  # 2020-2029
+    0x05aa0, 0x076a3, 0x096d0, 0x04afb, 0x04ad0, 0x0a4d0, 0x1d0b6, 0x0d250, 0x0d520, 0x0dd45,  # 2030-2039
+    0x0b5a0, 0x056d0, 0x055b2, 0x049b0, 0x0a577, 0x0a4b0, 0x0aa50, 0x1b255, 0x06d20, 0x0ada0,  # 2040-2049
+    0x14b63, 0x09370, 0x049f8, 0x04970, 0x064b0, 0x168a6, 0x0ea50, 0x06b20, 0x1a6c4, 0x0aae0,  # 2050-2059
+    0x092e0, 0x0d2e3, 0x0c960, 0x0d557, 0x0d4a0, 0x0da50, 0x05d55, 0x056a0, 0x0a6d0, 0x055d4,  # 2060-2069
+    0x052d0, 0x0a9b8, 0x0a950, 0x0b4a0, 0x0b6a6, 0x0ad50, 0x055a0, 0x0aba4, 0x0a5b0, 0x052b0,  # 2070-2079
+    0x0b273, 0x06930, 0x07337, 0x06aa0, 0x0ad50, 0x14b55, 0x04b60, 0x0a570, 0x054e4, 0x0d160,  # 2080-2089
+    0x0e968, 0x0d520, 0x0daa0, 0x16aa6, 0x056d0, 0x04ae0, 0x0a9d4, 0x0a2d0, 0x0d150, 0x0f252,  # 2090-2099
+    0x0d520,  # 2100
+)
+
+MIN_YEAR = 1900
+MAX_YEAR = MIN_YEAR + len(LUNAR_INFO) - 1
+LUNAR_EPOCH = date(1900, 1, 31)
+
+
+# 二十四節氣，依太陽視黃經 285° 起每 15° 一個（小寒為 1 月的第一個節氣）
+SOLAR_TERMS = [
+    '小寒', '大寒', '立春', '雨水', '驚蟄', '春分', '清明', '穀雨',
+    '立夏', '小滿', '芒種', '夏至', '小暑', '大暑', '立秋', '處暑',
+    '白露', '秋分', '寒露', '霜降', '立冬', '小雪', '大雪', '冬至',
+]
+
+LunarDate = namedtuple('LunarDate', 'year month day is_leap')
+
+# CalendarDaySerializer 的選用農曆欄位
+LUNAR_FIELDS = ('lunar_year', 'lunar_month', 'lunar_day', 'lunar_leap', 'solar_term')
+
+
+class LunarDateError(ValueError):
+    """農曆日期超出農曆表範圍或不存在"""
+
+
+def _info(year):
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise LunarDateError(f'農曆年份需介於 {MIN_YEAR} 與 {MAX_YEAR} 之間: {year}')
+    return LUNAR_INFO[year - MIN_YEAR]
+
+
+def leap_month(year):
+    """閏月的月份，沒有閏月時回傳 0"""
+    return _info(year) & 0xf
+
+
+def month_days(year, month, leap=False):
+    """農曆 year 年 month 月（leap=True 為閏月）的天數"""
+    info = _info(year)
+    if leap:
+        if leap_month(year) != month:
+            raise LunarDateError(f'農曆 {year} 年沒有閏 {month} 月')
+        return 30 if info & 0x10000 else 29
+    if not 1 <= month <= 12:
+        raise LunarDateError(f'農曆月份需介於 1 與 12 之間: {month}')
+    return 30 if info & (0x10000 >> month) else 29
+
+
+def months(year):
+    """依序回傳農曆 year 年的 (月份, 是否閏月, 天數)"""
+    leap = leap_month(year)
+    result = []
+    for month in range(1, 13):
+        result.append((month, False, month_days(year, month)))
+        if month == leap:
+            result.append((month, True, month_days(year, month, leap=True)))
+    return result
+
+
+def year_days(year):
+    """農曆 year 年的總天數"""
+    return sum(days for _, _, days in months(year))
+
+
+def _build_offsets():
+    """每個農曆年正月初一距離 LUNAR_EPOCH 的天數（多一個元素作為 MAX_YEAR 的結尾）"""
+    offsets = [0]
+    for year in range(MIN_YEAR, MAX_YEAR + 1):
+        offsets.append(offsets[-1] + year_days(year))
+    return offsets
+
+
+def _build_month_starts():
+    """每個農曆年各月第一天距離 LUNAR_EPOCH 的天數，與對應的 (月份, 是否閏月)"""
+    starts = []
+    for year in range(MIN_YEAR, MAX_YEAR + 1):
+        offset = _YEAR_OFFSETS[year - MIN_YEAR]
+        year_starts = []
+        year_months = []
+        for month, is_leap, days in months(year):
+            year_starts.append(offset)
+            year_months.append((month, is_leap))
+            offset += days
+        starts.append((year_starts, year_months))
+    return starts
+
+
+_YEAR_OFFSETS = _build_offsets()
+_MONTH_STARTS = _build_month_starts()
+
+# 可換算的西元日期範圍
+MIN_DATE = LUNAR_EPOCH
+MAX_DATE = LUNAR_EPOCH + timedelta(days=_YEAR_OFFSETS[-1] - 1)
+
+
+def lunar_new_year(year):
+    """農曆 year 年正月初一的西元日期"""
+    _info(year)
+    return LUNAR_EPOCH + timedelta(days=_YEAR_OFFSETS[year - MIN_YEAR])
+
+
+def to_solar(year, month, day, leap=False):
+    """農曆日期轉西元日期"""
+    _info(year)
+    offset = _YEAR_OFFSETS[year - MIN_YEAR]
+    for current_month, is_leap, days in months(year):
+        if current_month == month and is_leap == leap:
+            if not 1 <= day <= days:
+                raise LunarDateError(f'農曆 {year} 年{"閏" if leap else ""}{month} 月沒有 {day} 日')
+            return LUNAR_EPOCH + timedelta(days=offset + day - 1)
+        offset += days
+    raise LunarDateError(f'農曆 {year} 年沒有閏 {month} 月')
+
+
+def lunar_new_years_eve(year):
+    """農曆 year 年的除夕（十二月最後一天）的西元日期"""
+    _info(year)
+    return LUNAR_EPOCH + timedelta(days=_YEAR_OFFSETS[year - MIN_YEAR + 1] - 1)
+
+
+def _locate(offset, year):
+    """offset 天所在的農曆年，以及該日在 _MONTH_STARTS 中的月份位置"""
+    # 農曆年與西元年最多差一年：正月初一之前屬於前一個農曆年
+    if offset < _YEAR_OFFSETS[year - MIN_YEAR]:
+        year -= 1
+    year_starts = _MONTH_STARTS[year - MIN_YEAR][0]
+    return year, bisect_right(year_starts, offset) - 1
+
+
+def from_solar(day):
+    """西元日期轉農曆，回傳 LunarDate；超出農曆表範圍時拋出 LunarDateError"""
+    if not MIN_DATE <= day <= MAX_DATE:
+        raise LunarDateError(f'日期需介於 {MIN_DATE} 與 {MAX_DATE} 之間: {day}')
+    offset = (day - LUNAR_EPOCH).days
+    year, position = _locate(offset, min(day.year, MAX_YEAR))
+    year_starts, year_months = _MONTH_STARTS[year - MIN_YEAR]
+    month, is_leap = year_months[position]
+    return LunarDate(year, month, offset - year_starts[position] + 1, is_leap)
+
+
+def from_solar_range(start, end):
+    """
+    換算 start～end（含）每一天的農曆日期，依序回傳 LunarDate 列表
+    只有第一個有效日期查表，之後逐月展開；超出農曆表範圍的日期為 None
+    """
+    total = (end - start).days + 1
+    first = max(start, MIN_DATE)
+    last = min(end, MAX_DATE)
+    if total <= 0 or first > last:
+        return [None] * max(total, 0)
+
+    result = [None] * (first - start).days
+    offset = (first - LUNAR_EPOCH).days
+    last_offset = (last - LUNAR_EPOCH).days
+    year, position = _locate(offset, first.year)
+    while offset <= last_offset:
+        year_starts, year_months = _MONTH_STARTS[year - MIN_YEAR]
+        lunar_year = year
+        month, is_leap = year_months[position]
+        month_start = year_starts[position]
+        if position + 1 < len(year_starts):
+            next_start = year_starts[position + 1]
+            position += 1
+        else:
+            next_start = _YEAR_OFFSETS[year - MIN_YEAR + 1]
+            year, position = year + 1, 0
+        stop = min(next_start, last_offset + 1)
+        result.extend(
+            LunarDate(lunar_year, month, day, is_leap)
+            for day in range(offset - month_start + 1, stop - month_start + 1)
+        )
+        offset = stop
+
+    result.extend([None] * (total - len(result)))
+    return result
+
+
+def _sun_longitude(jd):
+    """太陽視黃經（度），Meeus《Astronomical Algorithms》第 25 章的低精度公式，誤差約 0.01°"""
+    t = (jd - 2451545.0) / 36525
+    mean_longitude = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+    anomaly = math.radians(357.52911 + 35999.05029 * t - 0.0001537 * t * t)
+    center = (
+        (1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(anomaly)
+        + (0.019993 - 0.000101 * t) * math.sin(2 * anomaly)
+        + 0.000289 * math.sin(3 * anomaly)
+    )
+    omega = math.radians(125.04 - 1934.136 * t)
+    return (mean_longitude + center - 0.00569 - 0.00478 * math.sin(omega)) % 360
+
+
+# 儒略日 0 的西元日期序數換算與台灣時間（UTC+8）
+_JD_ORDINAL_OFFSET = 1721424.5
+_TAIWAN_OFFSET = 8 / 24
+# 力學時與世界時的差（約 1 分鐘），相較公式誤差可忽略，取固定值
+_DELTA_T = 64 / 86400
+
+
+@lru_cache(maxsize=256)
+def solar_terms(year):
+    """
+    西元 year 年的二十四節氣，回傳 {date: 節氣名稱}
+    以牛頓法求太陽視黃經到達 285° + 15° × n 的時刻；公式誤差約十餘分鐘，
+    節氣時刻非常接近午夜時日期可能差一天
+    """
+    terms = {}
+    for index, name in enumerate(SOLAR_TERMS):
+        target = (285 + 15 * index) % 360
+        # 小寒約在 1/6，之後每個節氣約 15.2 天
+        jd = date(year, 1, 6).toordinal() + _JD_ORDINAL_OFFSET + index * 15.2184
+        for _ in range(10):
+            delta = (target - _sun_longitude(jd) + 180) % 360 - 180
+            jd += delta * 365.2422 / 360
+            if abs(delta) < 1e-6:
+                break
+        local = jd - _DELTA_T + _TAIWAN_OFFSET - _JD_ORDINAL_OFFSET
+        terms[date.fromordinal(int(math.floor(local)))] = name
+    return terms
+
+
+def solar_term(day):
+    """day 當天的節氣名稱，不是節氣時回傳 None"""
+    return solar_terms(day.year).get(day)
+
+
+def solar_term_date(year, name):
+    """西元 year 年指定節氣的日期"""
+    for day, term in solar_terms(year).items():
+        if term == name:
+            return day
+    raise LunarDateError(f'沒有這個節氣: {name}')
+
+
+def _fields(lunar_date, term):
+    if lunar_date is None:
+        return {'lunar_year': None, 'lunar_month': None, 'lunar_day': None, 'lunar_leap': None, 'solar_term': term}
+    return {
+        'lunar_year': lunar_date.year,
+        'lunar_month': lunar_date.month,
+        'lunar_day': lunar_date.day,
+        'lunar_leap': lunar_date.is_leap,
+        'solar_term': term,
+    }
+
+
+def lunar_fields(day):
+    """單一日期的農曆欄位（LUNAR_FIELDS），超出農曆表範圍時農曆日期為 None"""
+    try:
+        lunar_date = from_solar(day)
+    except LunarDateError:
+        lunar_date = None
+    return _fields(lunar_date, solar_term(day))
+
+
+def solar_terms_between(start, end):
+    """start～end（含）之間的節氣，回傳 {距離 start 的天數: 節氣名稱}"""
+    terms = {}
+    for year in range(start.year, end.year + 1):
+        for day, name in solar_terms(year).items():
+            if start <= day <= end:
+                terms[(day - start).days] = name
+    return terms
+
+
+def lunar_fields_range(start, end):
+    """start～end（含）每一天的農曆欄位列表，整段範圍一次換算"""
+    terms = solar_terms_between(start, end)
+    return [
+        _fields(lunar_date, terms.get(offset))
+        for offset, lunar_date in enumerate(from_solar_range(start, end))
+    ]
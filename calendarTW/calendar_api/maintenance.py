@@ -0,0 +1,186 @@
+"""
+日曆資料的增量維護
+CalendarDay 的假日 / 補班旗標是由 Holiday 與 WorkdayAdjustment 反正規化而來。
+匯入指令以 bulk 寫入 CalendarDay 作為權威資料；透過 ViewSet、Admin 或程式逐筆修改 Holiday / WorkdayAdjustment 時，
+由 post_save / post_delete 只重新推導受影響日期的 CalendarDay，並只更新這些日期相關的衍生資料：
+
+- 記憶體索引：以寫入時複製的方式更新受影響的日期 (index.update_calendar_index)
+- 月份摘要：重新彙總受影響的月份
+- blob_cache：移除受影響的月份 / 年份，資料集版本遞增時其餘項目沿用到新版本
+- 資料集版本：每個交易只遞增一次，ETag 隨之改變
+
+bulk_upsert / bulk_delete 以 bulk_written 訊號回報異動的日期；同一個交易內的異動累積在 _TransactionChanges，
+交易提交後才一次更新行程內的索引與快取並遞增資料集版本，寫入端不需要自行遞增版本
+"""
+import threading
+
+from django.db import transaction
+
+from .blob_cache import blob_cache
+from .default_days import is_default
+from .index import advance_calendar_index, update_calendar_index
+from .models import CalendarDay, Holiday, WorkdayAdjustment
+from .summaries import refresh_month_summaries
+from .upsert import CALENDAR_DAY_UPDATE_FIELDS, save_calendar_days
+from .versioning import bump_dataset_version
+
+# 上次資料集版本遞增後異動過的月份與年份；版本遞增時這些 blob_cache 項目不沿用到新版本
+_pending_months = set()
+_pending_years = set()
+_pending_lock = threading.Lock()
+
+
+def derive_fields(day, holiday=None, workday=None, current=None):
+    """
+    由 Holiday / WorkdayAdjustment 推導 CalendarDay 的旗標欄位
+    補班日優先於假日；兩者皆無時恢復為由星期推算的一般日，原本單純的說明註記（非假日、非補班）會保留
+    """
+    if workday is not None:
+        return {
+            'is_holiday': False,
+            'is_workday': True,
+            'holiday_name': None,
+            'description': workday.description or None,
+        }
+    if holiday is not None:
+        return {
+            'is_holiday': True,
+            'is_workday': False,
+            'holiday_name': holiday.name,
+            'description': holiday.description or None,
+        }
+    annotated = current is not None and not current.holiday_name and not current.is_workday
+    return {
+        'is_holiday': day.weekday() >= 5,
+        'is_workday': False,
+        'holiday_name': None,
+        'description': current.description if annotated else None,
+    }
+
+
+def sync_calendar_days(dates):
+    """
+    重新推導指定日期的 CalendarDay，只寫入有變動的日期，回傳寫入的 CalendarDay 列表
+    同一天有多筆 Holiday 時以最早建立的一筆為準；沒有資料且推導結果為一般日的日期不新增資料列
+    """
+    dates = set(dates)
+    if not dates:
+        return []
+
+    holidays = {}
+    for holiday in Holiday.objects.filter(date__in=dates).order_by('date', 'id'):
+        holidays.setdefault(holiday.date, holiday)
+    workdays = {workday.date: workday for workday in WorkdayAdjustment.objects.filter(date__in=dates)}
+    current = {calendar_day.date: calendar_day for calendar_day in CalendarDay.objects.filter(date__in=dates)}
+
+    changed = []
+    for day in sorted(dates):
+        existing = current.get(day)
+        fields = derive_fields(day, holidays.get(day), workdays.get(day), existing)
+        if existing is None:
+            if is_default(day, **fields):
+                continue
+        elif all(getattr(existing, name) == value for name, value in fields.items()):
+            continue
+        changed.append(CalendarDay.from_date(day, **fields))
+
+    if changed:
+        save_calendar_days(changed, CALENDAR_DAY_UPDATE_FIELDS)
+    return changed
+
+
+def _stale_key(months, years):
+    def stale(key):
+        kind = key[0]
+        if kind == 'calendar-days':
+            return (key[1], key[2]) in months
+        if kind == 'holidays':
+            return key[1] in years
+        # 其他項目（例如 iCalendar 訂閱）內容含資料集的更新時間，一律不沿用
+        return True
+    return stale
+
+
+def _mark(months=(), years=()):
+    """記錄異動的月份 / 年份，並立即移除 blob_cache 中這些月份 / 年份的項目"""
+    months = set(months)
+    years = set(years)
+    with _pending_lock:
+        _pending_months.update(months)
+        _pending_years.update(years)
+    stale = _stale_key(months, years)
+    blob_cache.discard(lambda key: key[0] in ('calendar-days', 'holidays') and stale(key))
+
+
+class _TransactionChanges:
+    """同一個交易內累積的異動；交易提交後更新索引與快取，並只遞增一次資料集版本"""
+
+    def __init__(self):
+        self.dates = set()
+        self.years = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        update_calendar_index(self.dates)
+        _mark(months={(day.year, day.month) for day in self.dates}, years=self.years)
+        # 版本遞增後 advance_to_version 才把未受影響的索引與快取沿用到新版本，需在更新索引與快取之後
+        bump_dataset_version()
+
+
+def _record(dates=(), years=()):
+    """
+    將異動記錄到目前交易的 _TransactionChanges，第一次異動時以 on_commit 註冊
+    交易或 savepoint 回復時 Django 會一併移除註冊的函式，之後的異動會重新註冊；不在交易中時立即執行
+    """
+    connection = transaction.get_connection()
+    changes = None
+    if connection.in_atomic_block:
+        changes = next(
+            (
+                func for _, func, _ in connection.run_on_commit
+                if isinstance(func, _TransactionChanges) and not func.done
+            ),
+            None,
+        )
+    if changes is not None:
+        changes.dates.update(dates)
+        changes.years.update(years)
+        return
+    changes = _TransactionChanges()
+    changes.dates.update(dates)
+    changes.years.update(years)
+    transaction.on_commit(changes)
+
+
+def calendar_days_changed(dates):
+    """CalendarDay 異動：重新彙總受影響月份的摘要，交易提交後更新索引與快取"""
+    dates = set(dates)
+    if not dates:
+        return
+    refresh_month_summaries({(day.year, day.month) for day in dates})
+    _record(dates=dates)
+
+
+def holidays_changed(dates):
+    """Holiday 異動：交易提交後移除受影響年份的假日列表快取"""
+    years = {day.year for day in dates}
+    if years:
+        _record(years=years)
+
+
+def workdays_changed(dates):
+    """WorkdayAdjustment 異動：補班日列表沒有快取，交易提交後只遞增資料集版本"""
+    if dates:
+        _record()
+
+
+def advance_to_version(version):
+    """資料集版本遞增後，索引與未受影響的 blob_cache 項目沿用到新版本"""
+    with _pending_lock:
+        months = set(_pending_months)
+        years = set(_pending_years)
+        _pending_months.clear()
+        _pending_years.clear()
+    advance_calendar_index(version)
+    blob_cache.advance(version - 1, version, _stale_key(months, years))
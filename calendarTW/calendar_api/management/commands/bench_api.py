@@ -0,0 +1,390 @@
+"""
+API 端點效能測試
+在暫時的測試資料庫建立多年份的合成資料，以 Django 測試用戶端對 calendar_api/urls.py 的每個端點送出請求，
+輸出每個端點的延遲百分位數、吞吐量、每次請求的 SQL 查詢數與回應大小（JSON 格式，方便比較不同版本）
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import count
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from calendar_api.benchmarking import benchmark_requests, temporary_database, write_synthetic_gov_csv
+from calendar_api.models import CalendarDay, Holiday, WorkdayAdjustment
+
+
+def positive_int(value):
+    """argparse 型別：至少為 1 的整數"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'必須至少為 1: {value}')
+    return number
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法 (nearest-rank) 百分位數"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = '以合成資料測試每個 API 端點的延遲、吞吐量、SQL 查詢數與回應大小，輸出 JSON 報告'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=positive_int,
+            default=100,
+            help='合成資料的年份數（預設: 100）'
+        )
+        parser.add_argument(
+            '--start-year',
+            type=int,
+            default=1950,
+            help='合成資料的起始年份（預設: 1950）'
+        )
+        parser.add_argument(
+            '--requests',
+            type=positive_int,
+            default=200,
+            help='每個端點送出的請求數（預設: 200）'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=positive_int,
+            default=1,
+            help='同時送出請求的執行緒數（預設: 1）'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            default=[],
+            help='只測試指定的端點（可重複指定）'
+        )
+        parser.add_argument(
+            '--include-writes',
+            action='store_true',
+            help='一併測試新增 / 修改 / 刪除端點'
+        )
+        parser.add_argument(
+            '--existing',
+            action='store_true',
+            help='直接使用目前的資料庫，不建立合成資料（不會執行寫入測試）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='隨機日期的種子（預設: 0）'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='JSON 報告的輸出檔案（預設輸出到標準輸出）'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['existing']:
+            options['include_writes'] = False
+            report = self.run_benchmark(dataset={'source': 'existing'})
+        else:
+            with tempfile.TemporaryDirectory() as workdir:
+                csv_path = os.path.join(workdir, 'gov_calendar.csv')
+                rows = write_synthetic_gov_csv(
+                    csv_path, options['start_year'], options['years'], options['seed']
+                )
+                with temporary_database(os.path.join(workdir, 'bench.sqlite3')):
+                    call_command('import_gov_calendar', csv_path, stdout=io.StringIO())
+                    report = self.run_benchmark(dataset={
+                        'source': 'synthetic',
+                        'start_year': options['start_year'],
+                        'years': options['years'],
+                        'rows': rows,
+                    })
+
+        content = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(content + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✅ 報告已寫入 {options["output"]}'))
+        else:
+            self.stdout.write(content)
+
+    def run_benchmark(self, dataset):
+        days = list(CalendarDay.objects.order_by('date').values_list('date', flat=True))
+        if not days:
+            self.stderr.write(self.style.ERROR('❌ 資料庫沒有日曆資料，請先執行匯入指令'))
+            return {'dataset': dataset, 'endpoints': {}}
+
+        dataset.update({
+            'calendar_days': len(days),
+            'holidays': Holiday.objects.count(),
+            'workday_adjustments': WorkdayAdjustment.objects.count(),
+        })
+        endpoints = self.build_endpoints(days)
+        if self.options['endpoint']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in self.options['endpoint']]
+
+        results = {}
+
+        # 4xx 回應已統計在報告中，測試期間不輸出 django.request 的警告
+        with benchmark_requests('django.request'):
+            self.measure_endpoints(endpoints, results)
+
+        return {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'settings': {
+                'requests': self.options['requests'],
+                'concurrency': self.options['concurrency'],
+                'seed': self.options['seed'],
+            },
+            'dataset': dataset,
+            'endpoints': results,
+        }
+
+    def measure_endpoints(self, endpoints, results):
+        """依序測試每個端點，結果寫入 results"""
+        for name, method, make_request, writes in endpoints:
+            if writes and not self.options['include_writes']:
+                continue
+            concurrency = 1 if writes else self.options['concurrency']
+            results[name] = self.measure(method, make_request, concurrency)
+            self.stderr.write(
+                f'  {name:<28}{results[name]["throughput_rps"]:>10.0f} req/s'
+                f'{results[name]["latency_ms"]["p95"]:>10.2f} ms p95'
+            )
+
+    def build_endpoints(self, days):
+        """
+        每個端點的 (名稱, HTTP 方法, 產生請求的函式, 是否為寫入)
+        產生請求的函式接收亂數產生器，回傳 (路徑, 請求內容)
+        """
+        first = days[0]
+        holiday_ids = list(Holiday.objects.values_list('id', flat=True)[:1000])
+        workday_ids = list(WorkdayAdjustment.objects.values_list('id', flat=True)[:1000])
+        day_ids = list(CalendarDay.objects.values_list('id', flat=True)[:1000])
+        years = sorted({day.year for day in days})
+
+        # 加減工作天數時避開資料範圍的頭尾，避免超出範圍而回傳 404
+        inner_days = days[366:-366] or days
+
+        def day(rng):
+            return rng.choice(days)
+
+        def get(path_factory):
+            return lambda rng: (path_factory(rng), None)
+
+        def range_path(rng, span, extra=''):
+            start = rng.randrange(max(len(days) - span, 1))
+            end = min(start + span - 1, len(days) - 1)
+            return f'/api/calendar/range/?start_date={days[start]}&end_date={days[end]}{extra}'
+
+        # 新增端點建立的 id，依列表路徑記錄，刪除端點優先刪除這些資料
+        created = {'/api/holidays/': [], '/api/calendar-days/': [], '/api/workday-adjustments/': []}
+        self.created = created
+        # 新增日曆日期與補班日使用資料範圍之後的日期，避免與既有資料的唯一日期衝突
+        new_days = {path: (days[-1] + timedelta(days=offset) for offset in count(1)) for path in created}
+
+        def delete(path, ids):
+            def make_request(rng):
+                if created[path]:
+                    return f'{path}{created[path].pop()}/', None
+                return f'{path}{rng.choice(ids)}/', None
+            return make_request
+
+        def create_holiday(rng):
+            value = day(rng)
+            return '/api/holidays/', {
+                'name': '效能測試假日',
+                'date': value.isoformat(),
+                'year': value.year,
+                'holiday_type': 'flexible',
+            }
+
+        def update_holiday(rng):
+            return f'/api/holidays/{rng.choice(holiday_ids)}/', {'description': f'效能測試 {rng.random()}'}
+
+        def create_calendar_day(rng):
+            return '/api/calendar-days/', {
+                'date': next(new_days['/api/calendar-days/']).isoformat(),
+                'description': '效能測試',
+            }
+
+        def update_calendar_day(rng):
+            return f'/api/calendar-days/{rng.choice(day_ids)}/', {'description': f'效能測試 {rng.random()}'}
+
+        def create_workday(rng):
+            return '/api/workday-adjustments/', {
+                'date': next(new_days['/api/workday-adjustments/']).isoformat(),
+                'compensate_for': day(rng).isoformat(),
+                'description': '效能測試',
+            }
+
+        def update_workday(rng):
+            return f'/api/workday-adjustments/{rng.choice(workday_ids)}/', {'description': f'效能測試 {rng.random()}'}
+
+        # 批次端點每次 upsert 100 個不重複的日期（同一批次不能有重複的日期）
+        def batch(path, make_item):
+            return lambda rng: (f'{path}batch/', {
+                'upsert': [make_item(rng, value) for value in rng.sample(days, min(100, len(days)))],
+            })
+
+        def calendar_day_item(rng, value):
+            return {'date': value.isoformat(), 'description': f'效能測試 {rng.random()}'}
+
+        def holiday_item(rng, value):
+            return {
+                'date': value.isoformat(),
+                'name': '效能測試假日',
+                'holiday_type': 'flexible',
+                'description': f'效能測試 {rng.random()}',
+            }
+
+        def workday_item(rng, value):
+            return {
+                'date': value.isoformat(),
+                'compensate_for': (value - timedelta(days=1)).isoformat(),
+                'description': f'效能測試 {rng.random()}',
+            }
+
+        endpoints = [
+            ('calendar-days-list', 'get', get(lambda rng: f'/api/calendar-days/?page={rng.randint(1, 20)}'), False),
+            ('calendar-days-cursor', 'get', get(lambda rng: '/api/calendar-days/?pagination=cursor&page_size=500'), False),
+            ('calendar-days-detail', 'get', get(lambda rng: f'/api/calendar-days/{rng.choice(day_ids)}/'), False),
+            ('calendar-days-by-date', 'get', get(lambda rng: f'/api/calendar-days/by-date/{day(rng)}/'), False),
+            ('calendar-days-by-month', 'get', get(lambda rng: (
+                lambda value: f'/api/calendar-days/month/{value.year}/{value.month}/'
+            )(day(rng))), False),
+            ('calendar-days-holidays', 'get', get(lambda rng: f'/api/calendar-days/holidays/?year={rng.choice(years)}'), False),
+            ('calendar-days-workdays', 'get', get(lambda rng: '/api/calendar-days/workdays/'), False),
+            ('holidays-list', 'get', get(lambda rng: '/api/holidays/'), False),
+            ('holidays-detail', 'get', get(lambda rng: f'/api/holidays/{rng.choice(holiday_ids)}/'), False),
+            ('holidays-by-year', 'get', get(lambda rng: f'/api/holidays/year/{rng.choice(years)}/'), False),
+            ('holidays-lunar', 'get', get(lambda rng: '/api/holidays/lunar/'), False),
+            ('holidays-national', 'get', get(lambda rng: '/api/holidays/national/'), False),
+            ('workday-adjustments-list', 'get', get(lambda rng: '/api/workday-adjustments/'), False),
+            ('workday-adjustments-detail', 'get', get(
+                lambda rng: f'/api/workday-adjustments/{rng.choice(workday_ids)}/'
+            ), False),
+            ('workday-adjustments-by-year', 'get', get(
+                lambda rng: f'/api/workday-adjustments/year/{rng.choice(years)}/'
+            ), False),
+            ('calendar-range-month', 'get', get(lambda rng: range_path(rng, 31)), False),
+            ('calendar-range-year', 'get', get(lambda rng: range_path(rng, 365)), False),
+            ('calendar-range-ndjson', 'get', get(lambda rng: range_path(rng, 365 * 10, '&format=ndjson')), False),
+            ('calendar-range-compact', 'get', get(lambda rng: range_path(rng, 365 * 10, '&compact=bitmask')), False),
+            ('calendar-feed', 'get', get(lambda rng: (
+                lambda year: f'/api/calendar/feed.ics?start_year={year}&end_year={year + 2}'
+            )(rng.choice(years))), False),
+            ('calendar-today', 'get', get(lambda rng: '/api/calendar/today/'), False),
+            ('is-holiday', 'get', get(lambda rng: f'/api/calendar/is-holiday/?date={day(rng)}'), False),
+            ('is-holiday-batch', 'post', lambda rng: ('/api/calendar/is-holiday/batch/', {
+                'dates': [day(rng).isoformat() for _ in range(100)],
+                'ranges': [(lambda value: {
+                    'start_date': value.replace(month=1, day=1).isoformat(),
+                    'end_date': value.replace(month=12, day=31).isoformat(),
+                })(day(rng))],
+            }), False),
+            ('month-summary', 'get', get(lambda rng: (
+                lambda value: f'/api/calendar/month-summary/?year={value.year}&month={value.month}'
+            )(day(rng))), False),
+            ('year-summary', 'get', get(lambda rng: f'/api/calendar/year-summary/?year={rng.choice(years)}'), False),
+            ('add-workdays', 'get', get(
+                lambda rng: f'/api/calendar/add-workdays/?date={rng.choice(inner_days)}&days={rng.randint(-250, 250)}'
+            ), False),
+            ('count-workdays', 'get', get(
+                lambda rng: f'/api/calendar/count-workdays/?start_date={first}&end_date={day(rng)}'
+            ), False),
+            ('holidays-create', 'post', create_holiday, True),
+            ('holidays-update', 'patch', update_holiday, True),
+            ('holidays-delete', 'delete', delete('/api/holidays/', holiday_ids), True),
+            ('holidays-batch', 'post', batch('/api/holidays/', holiday_item), True),
+            ('calendar-days-create', 'post', create_calendar_day, True),
+            ('calendar-days-update', 'patch', update_calendar_day, True),
+            ('calendar-days-delete', 'delete', delete('/api/calendar-days/', day_ids), True),
+            ('calendar-days-batch', 'post', batch('/api/calendar-days/', calendar_day_item), True),
+            ('workday-adjustments-create', 'post', create_workday, True),
+            ('workday-adjustments-update', 'patch', update_workday, True),
+            ('workday-adjustments-delete', 'delete', delete('/api/workday-adjustments/', workday_ids), True),
+            ('workday-adjustments-batch', 'post', batch('/api/workday-adjustments/', workday_item), True),
+        ]
+        # 沒有資料可以指定 id 的端點略過
+        skipped = set()
+        if not holiday_ids:
+            skipped |= {'holidays-detail', 'holidays-update', 'holidays-delete'}
+        if not workday_ids:
+            skipped |= {'workday-adjustments-detail', 'workday-adjustments-update', 'workday-adjustments-delete'}
+        return [endpoint for endpoint in endpoints if endpoint[0] not in skipped]
+
+    def measure(self, method, make_request, concurrency):
+        """送出請求並統計結果"""
+        rng = random.Random(self.options['seed'])
+        # 多產生一個請求作為冷快取請求，寫入端點才不會重複刪除同一筆資料
+        requests = [make_request(rng) for _ in range(self.options['requests'] + 1)]
+        local = threading.local()
+
+        def fetch(request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            path, data = request
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                if data is None:
+                    response = getattr(client, method)(path)
+                else:
+                    response = getattr(client, method)(path, data, content_type='application/json')
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+            if method == 'post' and response.status_code == 201 and path in self.created:
+                self.created[path].append(response.json()['id'])
+            return elapsed, len(queries), len(body), response.status_code
+
+        # 第一次請求（冷快取）另外記錄，不列入統計
+        cold = fetch(requests[0])
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            samples = list(executor.map(fetch, requests[1:]))
+            total = time.perf_counter() - started
+
+        latencies = sorted(sample[0] * 1000 for sample in samples)
+        return {
+            'method': method.upper(),
+            'example': requests[0][0],
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample[3] >= 400),
+            'status_codes': sorted({sample[3] for sample in samples}),
+            'throughput_rps': round(len(samples) / total, 1),
+            'cold_ms': round(cold[0] * 1000, 3),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50), 3),
+                'p95': round(percentile(latencies, 0.95), 3),
+                'p99': round(percentile(latencies, 0.99), 3),
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'queries_per_request': round(sum(sample[1] for sample in samples) / len(samples), 2),
+            'response_bytes': round(sum(sample[2] for sample in samples) / len(samples)),
+        }
@@ -0,0 +1,129 @@
+"""
+同步 (WSGI) 與非同步 (ASGI) 讀取端點的併發測試
+以相同的請求組合，在不同併發數下比較三種執行方式的每秒請求數與延遲：
+- wsgi-sync：WSGI handler + 同步 DRF 端點，每個併發占用一個執行緒（相當於 gthread worker）
+- asgi-sync：ASGI handler + 同步 DRF 端點（停用 AsyncRoutingMiddleware），每個請求都要切換到執行緒
+- asgi-async：ASGI handler + async_views，在事件迴圈中直接處理
+"""
+import asyncio
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from calendar_api.benchmarking import benchmark_requests
+from calendar_api.index import get_calendar_index
+
+
+class Command(BaseCommand):
+    help = '比較熱門讀取端點在 WSGI 同步與 ASGI 非同步路徑下的併發表現'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='每種併發數送出的請求數（預設: 2000）'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=str,
+            default='1,8,32,128',
+            help='要測試的併發數，以逗號分隔（預設: 1,8,32,128）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='隨機日期的種子（預設: 0）'
+        )
+
+    def handle(self, *args, **options):
+        dates = list(get_calendar_index().dates())
+        if not dates:
+            self.stdout.write(self.style.ERROR('❌ 資料庫沒有日曆資料，請先執行匯入指令'))
+            return
+
+        rng = random.Random(options['seed'])
+        urls = [self.make_url(rng, rng.choice(dates)) for _ in range(options['requests'])]
+        levels = [int(value) for value in options['concurrency'].split(',')]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n⏱️  同步 / 非同步併發測試 ({len(dates)} 天資料, 每種併發數 {len(urls)} 次請求)\n'
+        ))
+        self.stdout.write(f'{"模式":<12}{"併發":>6}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}')
+
+        with benchmark_requests():
+            for mode in ('wsgi-sync', 'asgi-sync', 'asgi-async'):
+                for concurrency in levels:
+                    if mode == 'wsgi-sync':
+                        elapsed, latencies = self.run_wsgi(urls, concurrency)
+                    elif mode == 'asgi-sync':
+                        with override_settings(CALENDAR_ASYNC_URLCONF=''):
+                            elapsed, latencies = asyncio.run(self.run_asgi(urls, concurrency))
+                    else:
+                        elapsed, latencies = asyncio.run(self.run_asgi(urls, concurrency))
+                    latencies.sort()
+                    self.stdout.write(
+                        f'{mode:<12}{concurrency:>6}{len(urls) / elapsed:>10.0f}'
+                        f'{statistics.median(latencies) * 1000:>10.2f}'
+                        f'{latencies[int(len(latencies) * 0.95)] * 1000:>10.2f}'
+                    )
+        self.stdout.write('')
+
+    def make_url(self, rng, day):
+        """依序混合 async_views 涵蓋的六個端點"""
+        choice = rng.randrange(6)
+        if choice == 0:
+            return f'/api/calendar/is-holiday/?date={day}'
+        if choice == 1:
+            return f'/api/calendar-days/by-date/{day}/'
+        if choice == 2:
+            return '/api/calendar/today/'
+        if choice == 3:
+            return f'/api/calendar-days/month/{day.year}/{day.month}/'
+        if choice == 4:
+            return f'/api/calendar/month-summary/?year={day.year}&month={day.month}'
+        return f'/api/calendar/range/?start_date={day}&end_date={day.replace(day=28)}'
+
+    def run_wsgi(self, urls, concurrency):
+        """以執行緒池模擬 WSGI worker，回傳 (總秒數, 每個請求的秒數)"""
+        local = threading.local()
+
+        def fetch(url):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            started = time.perf_counter()
+            client.get(url)
+            return time.perf_counter() - started
+
+        Client().get(urls[0])
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            latencies = list(executor.map(fetch, urls))
+            elapsed = time.perf_counter() - started
+        return elapsed, latencies
+
+    async def run_asgi(self, urls, concurrency):
+        """以 concurrency 個協程同時送出請求，回傳 (總秒數, 每個請求的秒數)"""
+        client = AsyncClient()
+        await client.get(urls[0])
+        queue = list(reversed(urls))
+        latencies = []
+
+        async def worker():
+            while queue:
+                url = queue.pop()
+                started = time.perf_counter()
+                await client.get(url)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies
@@ -0,0 +1,50 @@
+"""
+匯入效能測試
+產生多年份的政府行政機關辦公日曆表 CSV，並在暫時的測試資料庫上量測 import_gov_calendar 的耗時
+"""
+import io
+import os
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from calendar_api.benchmarking import temporary_database, write_synthetic_gov_csv
+
+
+class Command(BaseCommand):
+    help = '產生多年份的政府日曆 CSV 並量測 import_gov_calendar 的匯入速度'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=50,
+            help='產生的年份數（預設: 50）'
+        )
+        parser.add_argument(
+            '--start-year',
+            type=int,
+            default=2000,
+            help='起始年份（預設: 2000）'
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as workdir:
+            csv_path = os.path.join(workdir, 'gov_calendar.csv')
+            rows = write_synthetic_gov_csv(csv_path, options['start_year'], options['years'])
+            self.stdout.write(self.style.SUCCESS(
+                f'\n⏱️  匯入效能測試 ({options["years"]} 年, {rows} 筆資料, 資料庫: {connection.vendor})\n'
+            ))
+
+            with temporary_database(os.path.join(workdir, 'bench.sqlite3')):
+                for label in ['首次匯入', '重新匯入']:
+                    started = time.perf_counter()
+                    call_command('import_gov_calendar', csv_path, stdout=io.StringIO())
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'  {label}: {elapsed:8.2f} 秒, {rows / elapsed:10.0f} 筆/秒'
+                    )
+        self.stdout.write('')
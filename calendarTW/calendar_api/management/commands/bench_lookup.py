@@ -0,0 +1,83 @@
+"""
+查詢端點效能測試
+比較使用記憶體索引前後，today / is-holiday / by-date 每秒可處理的請求數
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from calendar_api.benchmarking import benchmark_requests
+from calendar_api.index import get_calendar_index
+
+
+class Command(BaseCommand):
+    help = '測試查詢端點使用記憶體索引前後的每秒請求數'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='每個端點送出的請求數（預設: 2000）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='隨機日期的種子（預設: 0）'
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        index = get_calendar_index()
+        dates = [day.isoformat() for day in index.dates()]
+
+        if not dates:
+            self.stdout.write(self.style.ERROR('❌ 資料庫沒有日曆資料，請先執行匯入指令'))
+            return
+
+        rng = random.Random(options['seed'])
+        sample = [rng.choice(dates) for _ in range(total)]
+
+        endpoints = [
+            ('is-holiday', lambda day: f'/api/calendar/is-holiday/?date={day}'),
+            ('by-date', lambda day: f'/api/calendar-days/by-date/{day}/'),
+            ('today', lambda day: '/api/calendar/today/'),
+        ]
+
+        self.stdout.write(self.style.SUCCESS(f'\n⏱️  查詢端點效能測試 ({len(dates)} 天資料, 每端點 {total} 次請求)\n'))
+        self.stdout.write(f'{"端點":<12}{"資料庫 req/s":>16}{"索引 req/s":>16}{"倍數":>10}{"SQL/次(索引)":>16}')
+
+        client = Client()
+        with benchmark_requests():
+            self.run_endpoints(client, endpoints, sample)
+        self.stdout.write('')
+
+    def run_endpoints(self, client, endpoints, sample):
+        """依序測試每個端點，分別關閉與開啟記憶體索引"""
+        total = len(sample)
+        for name, make_url in endpoints:
+            urls = [make_url(day) for day in sample]
+            with override_settings(CALENDAR_INDEX_ENABLED=False):
+                db_rps, _ = self.run(client, urls)
+            with override_settings(CALENDAR_INDEX_ENABLED=True):
+                index_rps, queries = self.run(client, urls)
+            self.stdout.write(
+                f'{name:<12}{db_rps:>16.0f}{index_rps:>16.0f}'
+                f'{index_rps / db_rps:>9.1f}x{queries / total:>16.2f}'
+            )
+
+    def run(self, client, urls):
+        """依序送出請求，回傳 (每秒請求數, SQL 查詢總數)"""
+        # 先暖機，避免第一次建立索引的時間影響結果
+        client.get(urls[0])
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for url in urls:
+                client.get(url)
+            elapsed = time.perf_counter() - started
+        return len(urls) / elapsed, len(queries)
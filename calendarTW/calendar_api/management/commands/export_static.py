@@ -0,0 +1,205 @@
+"""
+匯出靜態日曆快照
+將每個年份的資料輸出成與 API 回應格式相同的 JSON 檔，可直接放在 nginx 或物件儲存上提供，不需要 Django 與資料庫
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from calendar_api.default_days import exception_storage_enabled, fill_default_days
+from calendar_api.models import CalendarDay, Holiday, MonthSummary, WorkdayAdjustment
+from calendar_api.serializers import CalendarDaySerializer, HolidaySerializer, WorkdayAdjustmentSerializer
+from calendar_api.summaries import aggregate_months, summary_to_dict
+from calendar_api.versioning import get_dataset_version
+
+MANIFEST_NAME = 'manifest.json'
+
+# 匯出檔案所在的子目錄，以及含內容雜湊的檔名（例如 2026.f5a74e62adc0.json、2026.f5a74e62adc0.json.gz）
+EXPORT_DIRS = ('calendar', 'holidays', 'workday-adjustments', 'summary')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.json(\.gz)?$')
+
+
+def write_atomic(path, content):
+    """先寫入同目錄的暫存檔再改名，讀取端不會看到寫到一半的檔案"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class Command(BaseCommand):
+    help = '匯出每個年份的靜態 JSON 快照（含 .gz 預先壓縮檔），只重新產生資料有變動的年份'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='static_export',
+            help='輸出目錄（預設: static_export）'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略上次匯出的紀錄，重新產生所有年份'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        self.renderer = JSONRenderer()
+
+        manifest_path = os.path.join(output, MANIFEST_NAME)
+        old_manifest = {'years': {}}
+        if os.path.exists(manifest_path) and not options['force']:
+            with open(manifest_path, encoding='utf-8') as f:
+                old_manifest = json.load(f)
+
+        self.stdout.write(self.style.SUCCESS(f'\n📦 匯出靜態日曆快照到 {output}'))
+
+        fingerprints = self.year_fingerprints()
+        years = {}
+        generated = 0
+        for year in sorted(fingerprints):
+            previous = old_manifest['years'].get(str(year))
+            if (
+                previous
+                and previous['fingerprint'] == fingerprints[year]
+                and all(os.path.exists(os.path.join(output, name)) for name in previous['files'].values())
+            ):
+                years[str(year)] = previous
+                continue
+
+            years[str(year)] = {
+                'fingerprint': fingerprints[year],
+                'files': self.export_year(output, year),
+            }
+            generated += 1
+            self.stdout.write(f'  ✓ {year} 年')
+
+        manifest = {
+            'dataset_version': get_dataset_version()[0],
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'years': years,
+            'files': {
+                logical: hashed
+                for year in sorted(years)
+                for logical, hashed in years[year]['files'].items()
+            },
+        }
+        write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        removed = self.remove_stale(output, manifest['files'].values())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 匯出完成！共 {len(years)} 個年份，重新產生 {generated} 個，移除 {removed} 個舊檔案\n'
+        ))
+
+    def remove_stale(self, output, current):
+        """
+        移除輸出目錄中不在新 manifest 的匯出檔案，回傳移除的檔案數
+        不依賴上次的 manifest（--force 或 manifest 遺失時也能清除）；只處理匯出子目錄中含內容雜湊的檔名
+        """
+        keep = set()
+        for hashed in current:
+            keep.update((os.path.normpath(hashed), os.path.normpath(hashed + '.gz')))
+
+        removed = 0
+        for directory in EXPORT_DIRS:
+            for root, _, names in os.walk(os.path.join(output, directory)):
+                for name in names:
+                    full_path = os.path.join(root, name)
+                    if HASHED_NAME.search(name) and os.path.relpath(full_path, output) not in keep:
+                        os.unlink(full_path)
+                        removed += 1
+        return removed
+
+    def year_fingerprints(self):
+        """
+        計算每個年份資料的指紋
+        只讀取欄位值並雜湊，不執行序列化，用於判斷哪些年份需要重新產生
+        """
+        hashes = {}
+
+        def feed(year, row):
+            if year not in hashes:
+                hashes[year] = hashlib.sha256()
+            hashes[year].update(repr(row).encode('utf-8'))
+
+        # 雜湊所有欄位的值；以欄位名稱取日期，不依賴欄位順序
+        for row in CalendarDay.objects.order_by('date').values_list(named=True):
+            feed(row.date.year, ('day', *row))
+        for row in Holiday.objects.order_by('date', 'id').values_list(named=True):
+            if row.date.year in hashes:
+                feed(row.date.year, ('holiday', *row))
+        for row in WorkdayAdjustment.objects.order_by('date').values_list(named=True):
+            if row.date.year in hashes:
+                feed(row.date.year, ('workday', *row))
+
+        return {year: digest.hexdigest() for year, digest in hashes.items()}
+
+    def export_year(self, output, year):
+        """輸出單一年份的所有檔案，回傳 {邏輯路徑: 含雜湊的實際路徑}"""
+        files = {}
+        calendar_days = CalendarDay.objects.filter(year=year)
+        if exception_storage_enabled():
+            calendar_days = fill_default_days(calendar_days, date(year, 1, 1), date(year, 12, 31))
+        calendar_days = list(calendar_days)
+        rows = CalendarDaySerializer(calendar_days, many=True).data
+
+        # 整年（與 /api/calendar/range/ 相同格式）與每個月份（與 /api/calendar-days/month/ 相同格式）
+        files.update(self.write(output, f'calendar/{year}.json', rows))
+        for month in range(1, 13):
+            month_rows = [row for day, row in zip(calendar_days, rows) if day.month == month]
+            files.update(self.write(output, f'calendar/{year}/{month:02d}.json', month_rows))
+
+        holidays = HolidaySerializer(Holiday.objects.filter(year=year), many=True).data
+        files.update(self.write(output, f'holidays/{year}.json', holidays))
+
+        workdays = WorkdayAdjustmentSerializer(
+            WorkdayAdjustment.objects.filter(date__year=year), many=True
+        ).data
+        files.update(self.write(output, f'workday-adjustments/{year}.json', workdays))
+
+        # 與 /api/calendar/year-summary/ 相同格式
+        summaries = aggregate_months(year)
+        months = [
+            summary_to_dict(summaries.get(month, MonthSummary(year=year, month=month)))
+            for month in range(1, 13)
+        ]
+        files.update(self.write(output, f'summary/{year}.json', {
+            'year': year,
+            'total_days': sum(month['total_days'] for month in months),
+            'actual_workdays': sum(month['actual_workdays'] for month in months),
+            'months': months,
+        }))
+        return files
+
+    def write(self, output, logical_path, data):
+        """以內容雜湊命名並寫入 JSON 與 .gz 檔，回傳 {邏輯路徑: 實際路徑}"""
+        content = self.renderer.render(data)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        base, ext = os.path.splitext(logical_path)
+        hashed_path = f'{base}.{digest}{ext}'
+
+        full_path = os.path.join(output, hashed_path)
+        if not os.path.exists(full_path):
+            write_atomic(full_path, content)
+            # mtime=0 讓相同內容產生相同的壓縮檔
+            write_atomic(full_path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        return {logical_path: hashed_path}
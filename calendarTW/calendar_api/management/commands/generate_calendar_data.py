@@ -0,0 +1,84 @@
+"""
+產生合成日曆資料（效能 / 規模測試用）
+以固定的亂數種子產生多年份的日曆、假日與補班日資料，可直接批次寫入資料庫，
+或輸出成政府行政機關辦公日曆表格式的 CSV 供 import_gov_calendar 匯入
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand
+
+from calendar_api.lunar import LunarDateError
+from calendar_api.metrics import record_import
+from calendar_api.synthetic import generate_gov_rows, write_gov_csv
+
+from .import_gov_calendar import DIFF_LABELS, Command as ImportGovCalendarCommand
+
+
+class Command(BaseCommand):
+    help = '產生多年份的合成日曆資料（含農曆假日、補假與補班），寫入資料庫或輸出成政府日曆 CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-year',
+            type=int,
+            default=1900,
+            help='起始年份（預設: 1900）'
+        )
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=201,
+            help='產生的年份數（預設: 201，即 1900～2100 年；年份範圍同農曆表）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='亂數種子，相同種子產生相同資料（預設: 0）'
+        )
+        parser.add_argument(
+            '--csv',
+            type=str,
+            help='輸出成政府日曆格式的 CSV 檔案，而不寫入資料庫'
+        )
+
+    def handle(self, *args, **options):
+        start_year = options['start_year']
+        end_year = start_year + options['years'] - 1
+        try:
+            rows = generate_gov_rows(start_year, options['years'], options['seed'])
+        except LunarDateError as e:
+            self.stdout.write(self.style.ERROR(f'❌ {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🧪 產生 {start_year}～{end_year} 年的合成日曆資料 (種子: {options["seed"]})'
+        ))
+        started = time.perf_counter()
+
+        if options['csv']:
+            count = write_gov_csv(options['csv'], rows)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ 已寫入 {options["csv"]}: {count} 筆, {elapsed:.2f} 秒'
+            ))
+            self.stdout.write(f'   匯入: python manage.py import_gov_calendar {options["csv"]}\n')
+            return
+
+        # 與 import_gov_calendar 使用相同的解析與批次寫入流程，確保兩種方式產生的資料相同
+        with record_import('generate_calendar_data'):
+            importer = ImportGovCalendarCommand(stdout=io.StringIO())
+            stats, diffs = importer.import_data(enumerate(rows, start=2))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'✅ 寫入完成 ({elapsed:.2f} 秒)'))
+        for name, diff in diffs.items():
+            counts = diff.counts()
+            self.stdout.write(
+                f'  {DIFF_LABELS[name]}: 新增 {counts["inserted"]} 筆, 更新 {counts["changed"]} 筆, '
+                f'移除 {counts["removed"]} 筆'
+            )
+        if stats['errors'] > 0:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  錯誤: {stats["errors"]} 筆'))
+        self.stdout.write('')
@@ -1,15 +1,22 @@
 """
 匯入台灣日曆資料的 Django 管理指令
-用於初始化資料庫中的日期資料
+用於初始化資料庫中的日期資料：以 holiday_rules 的假日規則推算任意年份的國定假日與補假，
+可在政府公告日曆之前先預先建立未來年份的資料
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import datetime, timedelta
+from django.db import transaction
+from datetime import datetime
+from calendar_api.default_days import exception_storage_enabled, is_default
+from calendar_api.holiday_rules import generate_day_flags, generate_holidays
+from calendar_api.ingest import chunked
+from calendar_api.metrics import record_import
 from calendar_api.models import CalendarDay, Holiday, WorkdayAdjustment
+from calendar_api.profiling import ImportProfiler, add_profile_arguments
+from calendar_api.upsert import DEFAULT_BATCH_SIZE, HOLIDAY_KEY, bulk_delete, bulk_upsert
 
 
 class Command(BaseCommand):
-    help = '匯入台灣日曆資料（日期、假日、補班日）'
+    help = '依假日規則匯入台灣日曆資料（日期、國定假日、補假）'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -28,112 +35,130 @@ class Command(BaseCommand):
             type=int,
             help='結束年份（用於匯入多年資料）'
         )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='覆蓋已有資料的年份（預設略過，避免蓋掉政府日曆的調整放假與補班日）'
+        )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
+        # 沒有讀取檔案，db 以外的時間計入 prepare 階段
+        with record_import('import_calendar_data') as self.import_run, \
+                ImportProfiler.from_options(options, phase='prepare') as self.profiler:
+            self.import_years(**options)
+        self.profiler.report(self.stdout, self.style)
+
+    def import_years(self, **options):
+        """匯入指定年份的日曆、假日資料"""
         # 判斷是匯入單年還是多年
         if options['start_year'] and options['end_year']:
-            years = range(options['start_year'], options['end_year'] + 1)
+            start_year, end_year = options['start_year'], options['end_year']
         else:
-            years = [options['year']]
+            start_year = end_year = options['year']
+
+        try:
+            holidays = generate_holidays(start_year, end_year)
+        except ValueError as e:
+            self.import_run.failed()
+            self.stdout.write(self.style.ERROR(f'❌ {e}'))
+            return
+
+        years = set(range(start_year, end_year + 1))
+        if not options['overwrite']:
+            existing = set(
+                CalendarDay.objects.filter(year__in=years).values_list('year', flat=True).distinct()
+            )
+            if existing:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️  略過已有資料的年份: {", ".join(map(str, sorted(existing)))}（使用 --overwrite 覆蓋）'
+                ))
+            years -= existing
+
+        if not years:
+            self.stdout.write(self.style.SUCCESS('沒有需要匯入的年份'))
+            return
 
-        for year in years:
-            self.stdout.write(self.style.SUCCESS(f'\n開始匯入 {year} 年資料...'))
-            self.import_calendar_days(year)
-            self.import_holidays(year)
-            self.stdout.write(self.style.SUCCESS(f'✅ {year} 年資料匯入完成！\n'))
+        self.stdout.write(self.style.SUCCESS(
+            f'\n開始匯入 {start_year}～{end_year} 年資料（{len(years)} 個年份）...'
+        ))
+        holidays = [holiday for holiday in holidays if holiday.date.year in years]
+        with transaction.atomic():
+            self.import_calendar_days(start_year, end_year, years, holidays)
+            self.import_holidays(years, holidays)
+        self.stdout.write(self.style.SUCCESS('✅ 資料匯入完成！\n'))
 
-    def import_calendar_days(self, year):
-        """匯入整年的日曆日期資料"""
-        start_date = datetime(year, 1, 1).date()
-        end_date = datetime(year, 12, 31).date()
-        
-        current_date = start_date
+    def import_calendar_days(self, start_year, end_year, years, holidays):
+        """
+        以假日規則產生每一天的日曆資料，分批寫入
+        例外日儲存模式下先移除這些年份原有的資料，只寫入假日（一般日不建立模型物件）
+        """
         created_count = 0
         updated_count = 0
-        
-        while current_date <= end_date:
-            calendar_day, created = CalendarDay.objects.update_or_create(
-                date=current_date,
-                defaults={
-                    'year': current_date.year,
-                    'month': current_date.month,
-                    'day': current_date.day,
-                    'weekday': current_date.weekday(),
-                    'is_weekend': current_date.weekday() in [5, 6],
-                }
+
+        flags = (
+            day for day in generate_day_flags(start_year, end_year, holidays)
+            if day.date.year in years
+        )
+        if exception_storage_enabled():
+            deleted = bulk_delete(
+                CalendarDay,
+                CalendarDay.objects.filter(year__in=years).values_list('date', flat=True),
+            )
+            if deleted:
+                self.stdout.write(f'  🗑️  移除原有資料 {deleted} 筆')
+            flags = (
+                day for day in flags
+                if not is_default(day.date, day.is_holiday, False, day.holiday_name, day.description)
             )
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-            
-            current_date += timedelta(days=1)
-        
+        for chunk in chunked(flags, DEFAULT_BATCH_SIZE):
+            calendar_days = [
+                CalendarDay.from_date(
+                    day.date,
+                    is_holiday=day.is_holiday,
+                    is_workday=False,
+                    holiday_name=day.holiday_name,
+                    description=day.description,
+                )
+                for day in chunk
+            ]
+            created, updated = bulk_upsert(
+                CalendarDay,
+                calendar_days,
+                ['year', 'month', 'day', 'weekday', 'is_weekend', 'is_holiday', 'is_workday', 'holiday_name', 'description'],
+            )
+            created_count += created
+            updated_count += updated
+            self.profiler.add_rows(len(chunk))
+
         self.stdout.write(
             f'  📅 日曆日期: 新增 {created_count} 筆, 更新 {updated_count} 筆'
         )
 
-    def import_holidays(self, year):
-        """匯入假日資料"""
-        # 這裡是範例資料，實際使用時需要根據政府公告調整
-        holidays_data = self.get_holidays_data(year)
-        
-        created_count = 0
-        updated_count = 0
-        
-        for holiday_info in holidays_data:
-            # 建立或更新假日記錄
-            holiday, created = Holiday.objects.update_or_create(
-                date=holiday_info['date'],
-                defaults={
-                    'name': holiday_info['name'],
-                    'year': year,
-                    'holiday_type': holiday_info.get('holiday_type', 'national'),
-                    'is_lunar': holiday_info.get('is_lunar', False),
-                    'description': holiday_info.get('description', ''),
-                }
-            )
-            
-            # 更新對應的 CalendarDay
-            try:
-                calendar_day = CalendarDay.objects.get(date=holiday_info['date'])
-                calendar_day.is_holiday = True
-                calendar_day.holiday_name = holiday_info['name']
-                calendar_day.save()
-            except CalendarDay.DoesNotExist:
-                pass
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-        
+    def import_holidays(self, years, holidays):
+        """寫入假日資料；覆蓋的年份先移除原有的假日與補班日，使結果與規則一致"""
+        # 以 bulk_delete 刪除，不逐筆觸發 post_delete 重新推導日曆旗標（日曆資料已由 import_calendar_days 寫入）
+        bulk_delete(Holiday, Holiday.objects.filter(year__in=years).values_list('date', flat=True).distinct())
+        bulk_delete(WorkdayAdjustment, WorkdayAdjustment.objects.filter(date__year__in=years).values_list('date', flat=True))
+
+        created_count, updated_count = bulk_upsert(
+            Holiday,
+            [
+                Holiday(
+                    date=holiday.date,
+                    name=holiday.name,
+                    year=holiday.date.year,
+                    holiday_type=holiday.holiday_type,
+                    is_lunar=holiday.is_lunar,
+                    description=holiday.description,
+                )
+                for holiday in holidays
+            ],
+            ['year', 'holiday_type', 'is_lunar', 'description'],
+            # 同一天可能有兩個假日（例如兒童節與民族掃墓節），不能只以日期為 key
+            key=HOLIDAY_KEY,
+        )
+
         self.stdout.write(
             f'  🎉 假日資料: 新增 {created_count} 筆, 更新 {updated_count} 筆'
         )
-
-    def get_holidays_data(self, year):
-        """
-        取得假日資料
-        TODO: 這裡需要根據實際情況調整
-        可以從政府開放資料平台或其他來源取得
-        """
-        # 2026 年範例資料
-        if year == 2026:
-            return [
-                {'date': datetime(2026, 1, 1).date(), 'name': '中華民國開國紀念日', 'holiday_type': 'national'},
-                {'date': datetime(2026, 1, 26).date(), 'name': '農曆除夕', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 1, 27).date(), 'name': '春節', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 1, 28).date(), 'name': '春節', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 1, 29).date(), 'name': '春節', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 2, 28).date(), 'name': '和平紀念日', 'holiday_type': 'national'},
-                {'date': datetime(2026, 4, 3).date(), 'name': '兒童節', 'holiday_type': 'national'},
-                {'date': datetime(2026, 4, 4).date(), 'name': '清明節', 'holiday_type': 'national'},
-                {'date': datetime(2026, 6, 25).date(), 'name': '端午節', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 10, 1).date(), 'name': '中秋節', 'holiday_type': 'national', 'is_lunar': True},
-                {'date': datetime(2026, 10, 10).date(), 'name': '國慶日', 'holiday_type': 'national'},
-            ]
-        
-        # 其他年份回傳空列表，或實作自動抓取邏輯
-        return []
@@ -5,7 +5,11 @@
 import csv
 from django.core.management.base import BaseCommand
 from django.utils.dateparse import parse_date
+from calendar_api.ingest import EncodingDetectionError, chunked, open_csv
+from calendar_api.metrics import record_import
 from calendar_api.models import CalendarDay, Holiday, WorkdayAdjustment
+from calendar_api.profiling import ImportProfiler, add_profile_arguments
+from calendar_api.upsert import DEFAULT_BATCH_SIZE, HOLIDAY_KEY, bulk_upsert, save_calendar_days
 from datetime import datetime
 
 
@@ -28,16 +32,24 @@ class Command(BaseCommand):
         parser.add_argument(
             '--encoding',
             type=str,
-            default='utf-8-sig',
-            help='CSV 檔案編碼 (預設: utf-8-sig，支援 Big5, UTF-8 等)'
+            default=None,
+            help='CSV 檔案編碼 (預設: 自動偵測，支援 Big5, UTF-8 等)'
         )
         parser.add_argument(
             '--skip-header',
             action='store_true',
             help='是否跳過第一行標題列'
         )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
+        with record_import('import_csv') as self.import_run, \
+                ImportProfiler.from_options(options) as self.profiler:
+            self.import_file(**options)
+        self.profiler.report(self.stdout, self.style)
+
+    def import_file(self, **options):
+        """讀取並匯入 CSV 檔案，錯誤時輸出訊息並標記這次執行失敗"""
         csv_file = options['csv_file']
         data_type = options['type']
         encoding = options['encoding']
@@ -45,56 +57,68 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'\n開始匯入 CSV 檔案: {csv_file}'))
         self.stdout.write(f'資料類型: {data_type}')
-        self.stdout.write(f'檔案編碼: {encoding}\n')
+        self.stdout.write(f'檔案編碼: {encoding or "自動偵測"}\n')
 
         try:
-            # 嘗試不同的編碼
-            encodings_to_try = [encoding, 'utf-8-sig', 'utf-8', 'big5', 'cp950']
-            
-            csv_data = None
-            used_encoding = None
-            
-            for enc in encodings_to_try:
-                try:
-                    with open(csv_file, 'r', encoding=enc, newline='') as f:
-                        csv_data = list(csv.reader(f))
-                        used_encoding = enc
-                        break
-                except (UnicodeDecodeError, FileNotFoundError):
-                    continue
-            
-            if csv_data is None:
-                self.stdout.write(self.style.ERROR('無法讀取 CSV 檔案，請檢查檔案路徑和編碼'))
-                return
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ 成功讀取檔案 (使用編碼: {used_encoding})'))
-            self.stdout.write(f'總共 {len(csv_data)} 行資料\n')
-
-            # 如果要跳過標題列
-            if skip_header and len(csv_data) > 0:
-                header = csv_data[0]
-                self.stdout.write(f'標題列: {header}')
-                csv_data = csv_data[1:]
-
-            # 根據類型匯入
-            if data_type == 'calendar':
-                self.import_calendar_days(csv_data)
-            elif data_type == 'holiday':
-                self.import_holidays(csv_data)
-            elif data_type == 'workday':
-                self.import_workdays(csv_data)
+            with open_csv(csv_file, encoding, profiler=self.profiler) as (f, used_encoding):
+                self.stdout.write(self.style.SUCCESS(f'✓ 成功開啟檔案 (使用編碼: {used_encoding})'))
+
+                reader = csv.reader(f)
+
+                # 如果要跳過標題列
+                start = 1
+                if skip_header:
+                    header = next(reader, None)
+                    self.stdout.write(f'標題列: {header}')
+                    start = 2
+
+                rows = self.profiler.count(enumerate(reader, start=start))
+
+                # 根據類型匯入
+                if data_type == 'calendar':
+                    self.import_calendar_days(rows)
+                elif data_type == 'holiday':
+                    self.import_holidays(rows)
+                elif data_type == 'workday':
+                    self.import_workdays(rows)
 
         except FileNotFoundError:
+            self.import_run.failed()
             self.stdout.write(self.style.ERROR(f'找不到檔案: {csv_file}'))
+        except (EncodingDetectionError, UnicodeDecodeError) as e:
+            self.import_run.failed()
+            self.stdout.write(self.style.ERROR(f'無法讀取 CSV 檔案，請檢查檔案編碼: {str(e)}'))
         except Exception as e:
+            self.import_run.failed()
             self.stdout.write(self.style.ERROR(f'匯入過程發生錯誤: {str(e)}'))
             import traceback
             traceback.print_exc()
 
-    def import_calendar_days(self, csv_data):
+    def upsert_grouped(self, model, objects, base_fields, key='date'):
+        """
+        依每筆資料實際提供的欄位分組後批次寫入，回傳 (新增筆數, 更新筆數)
+        objects 為 (物件, 額外更新欄位 tuple) 的 list，只更新 CSV 中有提供的欄位
+        CalendarDay 經由 save_calendar_days 寫入，例外日儲存模式下只保留例外日
+        """
+        groups = {}
+        for obj, fields in objects:
+            groups.setdefault(fields, []).append(obj)
+
+        created_count = 0
+        updated_count = 0
+        for fields, group in groups.items():
+            if model is CalendarDay:
+                created, updated = save_calendar_days(group, base_fields + list(fields))
+            else:
+                created, updated = bulk_upsert(model, group, base_fields + list(fields), key=key)
+            created_count += created
+            updated_count += updated
+        return created_count, updated_count
+
+    def import_calendar_days(self, rows):
         """
         匯入日曆資料
-        預期 CSV 格式：日期,年,月,日,星期,是否週末,是否假日,是否補班,假日名稱,說明
+        預期 CSV 格式：日期,是否假日,假日名稱,是否補班,說明
         或簡化格式：日期,是否假日,假日名稱
         """
         created_count = 0
@@ -103,65 +127,56 @@ class Command(BaseCommand):
 
         self.stdout.write('開始匯入日曆資料...')
         
-        for i, row in enumerate(csv_data, start=1):
-            try:
-                if len(row) < 1:
-                    continue
-
-                # 解析日期（支援多種格式）
-                date_str = row[0].strip()
-                date = self.parse_date_flexible(date_str)
-                
-                if not date:
-                    self.stdout.write(self.style.WARNING(f'第 {i} 行: 無法解析日期 "{date_str}"'))
-                    error_count += 1
-                    continue
-
-                # 準備資料
-                defaults = {
-                    'year': date.year,
-                    'month': date.month,
-                    'day': date.day,
-                    'weekday': date.weekday(),
-                    'is_weekend': date.weekday() in [5, 6],
-                }
-
-                # 如果有更多欄位
-                if len(row) >= 2:
-                    # 是否為假日
-                    is_holiday_str = row[1].strip() if len(row) > 1 else ''
-                    defaults['is_holiday'] = is_holiday_str.lower() in ['true', '1', 'yes', 'y', '是']
-                
-                if len(row) >= 3:
-                    # 假日名稱
-                    defaults['holiday_name'] = row[2].strip() if row[2].strip() else None
-                
-                if len(row) >= 4:
-                    # 是否為補班日
-                    is_workday_str = row[3].strip() if len(row) > 3 else ''
-                    defaults['is_workday'] = is_workday_str.lower() in ['true', '1', 'yes', 'y', '是']
-                
-                if len(row) >= 5:
-                    # 說明
-                    defaults['description'] = row[4].strip() if row[4].strip() else None
+        for chunk in chunked(rows, DEFAULT_BATCH_SIZE):
+            calendar_days = []
 
-                # 建立或更新
-                calendar_day, created = CalendarDay.objects.update_or_create(
-                    date=date,
-                    defaults=defaults
-                )
-
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-
-                if (created_count + updated_count) % 100 == 0:
-                    self.stdout.write(f'  處理進度: {created_count + updated_count} 筆...')
+            for i, row in chunk:
+                try:
+                    if len(row) < 1:
+                        continue
+
+                    # 解析日期（支援多種格式）
+                    date_str = row[0].strip()
+                    date = self.parse_date_flexible(date_str)
+                    
+                    if not date:
+                        self.stdout.write(self.style.WARNING(f'第 {i} 行: 無法解析日期 "{date_str}"'))
+                        error_count += 1
+                        continue
+
+                    # 準備資料
+                    defaults = {}
+
+                    # 如果有更多欄位
+                    if len(row) >= 2:
+                        # 是否為假日
+                        defaults['is_holiday'] = row[1].strip().lower() in ['true', '1', 'yes', 'y', '是']
+                    
+                    if len(row) >= 3:
+                        # 假日名稱
+                        defaults['holiday_name'] = row[2].strip() if row[2].strip() else None
+                    
+                    if len(row) >= 4:
+                        # 是否為補班日
+                        defaults['is_workday'] = row[3].strip().lower() in ['true', '1', 'yes', 'y', '是']
+                    
+                    if len(row) >= 5:
+                        # 說明
+                        defaults['description'] = row[4].strip() if row[4].strip() else None
+
+                    calendar_days.append((CalendarDay.from_date(date, **defaults), tuple(defaults)))
+
+                except Exception as e:
+                    error_count += 1
+                    self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
 
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
+            # 建立或更新
+            created, updated = self.upsert_grouped(
+                CalendarDay, calendar_days, ['year', 'month', 'day', 'weekday', 'is_weekend']
+            )
+            created_count += created
+            updated_count += updated
+            self.stdout.write(f'  處理進度: {created_count + updated_count} 筆...')
 
         self.stdout.write(self.style.SUCCESS(f'\n✅ 日曆資料匯入完成！'))
         self.stdout.write(f'  新增: {created_count} 筆')
@@ -169,7 +184,7 @@ class Command(BaseCommand):
         if error_count > 0:
             self.stdout.write(self.style.WARNING(f'  錯誤: {error_count} 筆'))
 
-    def import_holidays(self, csv_data):
+    def import_holidays(self, rows):
         """
         匯入假日資料
         預期 CSV 格式：日期,假日名稱,假日類型,是否農曆,說明
@@ -181,76 +196,69 @@ class Command(BaseCommand):
 
         self.stdout.write('開始匯入假日資料...')
 
-        for i, row in enumerate(csv_data, start=1):
-            try:
-                if len(row) < 2:
-                    continue
-
-                # 解析日期
-                date_str = row[0].strip()
-                date = self.parse_date_flexible(date_str)
-                
-                if not date:
-                    self.stdout.write(self.style.WARNING(f'第 {i} 行: 無法解析日期 "{date_str}"'))
-                    error_count += 1
-                    continue
-
-                # 假日名稱
-                holiday_name = row[1].strip()
-
-                # 準備資料
-                defaults = {
-                    'name': holiday_name,
-                    'year': date.year,
-                }
-
-                # 假日類型
-                if len(row) >= 3:
-                    holiday_type = row[2].strip()
-                    if holiday_type in ['national', 'flexible', 'adjusted']:
-                        defaults['holiday_type'] = holiday_type
-                    else:
-                        defaults['holiday_type'] = 'national'
-                else:
-                    defaults['holiday_type'] = 'national'
-
-                # 是否農曆
-                if len(row) >= 4:
-                    is_lunar_str = row[3].strip()
-                    defaults['is_lunar'] = is_lunar_str.lower() in ['true', '1', 'yes', 'y', '是']
-
-                # 說明
-                if len(row) >= 5:
-                    defaults['description'] = row[4].strip()
-
-                # 建立或更新假日
-                holiday, created = Holiday.objects.update_or_create(
-                    date=date,
-                    defaults=defaults
-                )
-
-                # 同時更新 CalendarDay
+        for chunk in chunked(rows, DEFAULT_BATCH_SIZE):
+            holidays = []
+            calendar_days = []
+
+            for i, row in chunk:
                 try:
-                    calendar_day = CalendarDay.objects.get(date=date)
-                    calendar_day.is_holiday = True
-                    calendar_day.holiday_name = holiday_name
-                    calendar_day.save()
-                except CalendarDay.DoesNotExist:
-                    # 如果沒有對應的日曆日期，建立一個
-                    CalendarDay.objects.create(
-                        date=date,
-                        is_holiday=True,
-                        holiday_name=holiday_name
+                    if len(row) < 2:
+                        continue
+
+                    # 解析日期
+                    date_str = row[0].strip()
+                    date = self.parse_date_flexible(date_str)
+                    
+                    if not date:
+                        self.stdout.write(self.style.WARNING(f'第 {i} 行: 無法解析日期 "{date_str}"'))
+                        error_count += 1
+                        continue
+
+                    # 假日名稱
+                    holiday_name = row[1].strip()
+
+                    # 準備資料
+                    defaults = {}
+
+                    # 是否農曆
+                    if len(row) >= 4:
+                        defaults['is_lunar'] = row[3].strip().lower() in ['true', '1', 'yes', 'y', '是']
+
+                    # 說明
+                    if len(row) >= 5:
+                        defaults['description'] = row[4].strip()
+
+                    # 假日類型
+                    holiday_type = row[2].strip() if len(row) >= 3 else ''
+                    if holiday_type not in ['national', 'flexible', 'adjusted']:
+                        holiday_type = 'national'
+
+                    holidays.append((
+                        Holiday(
+                            date=date,
+                            name=holiday_name,
+                            year=date.year,
+                            holiday_type=holiday_type,
+                            **defaults
+                        ),
+                        tuple(defaults),
+                    ))
+
+                    # 同時更新 CalendarDay（沒有對應的日曆日期時建立一個）
+                    calendar_days.append(
+                        CalendarDay.from_date(date, is_holiday=True, holiday_name=holiday_name)
                     )
 
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+                except Exception as e:
+                    error_count += 1
+                    self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
 
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
+            # 建立或更新假日
+            # 同一天可以有多個假日，以 (日期, 名稱) 比對既有資料
+            created, updated = self.upsert_grouped(Holiday, holidays, ['year', 'holiday_type'], key=HOLIDAY_KEY)
+            created_count += created
+            updated_count += updated
+            bulk_upsert(CalendarDay, calendar_days, ['is_holiday', 'holiday_name'])
 
         self.stdout.write(self.style.SUCCESS(f'\n✅ 假日資料匯入完成！'))
         self.stdout.write(f'  新增: {created_count} 筆')
@@ -258,7 +266,7 @@ class Command(BaseCommand):
         if error_count > 0:
             self.stdout.write(self.style.WARNING(f'  錯誤: {error_count} 筆'))
 
-    def import_workdays(self, csv_data):
+    def import_workdays(self, rows):
         """
         匯入補班日資料
         預期 CSV 格式：日期,說明,補哪一天
@@ -269,58 +277,54 @@ class Command(BaseCommand):
 
         self.stdout.write('開始匯入補班日資料...')
 
-        for i, row in enumerate(csv_data, start=1):
-            try:
-                if len(row) < 1:
-                    continue
-
-                # 解析日期
-                date_str = row[0].strip()
-                date = self.parse_date_flexible(date_str)
-                
-                if not date:
-                    error_count += 1
-                    continue
-
-                # 準備資料
-                defaults = {
-                    'year': date.year,
-                }
-
-                if len(row) >= 2:
-                    defaults['description'] = row[1].strip()
-
-                if len(row) >= 3:
-                    compensate_date_str = row[2].strip()
-                    compensate_date = self.parse_date_flexible(compensate_date_str)
-                    if compensate_date:
-                        defaults['compensate_date'] = compensate_date
+        for chunk in chunked(rows, DEFAULT_BATCH_SIZE):
+            workdays = []
+            calendar_days = []
 
-                # 建立或更新補班日
-                workday, created = WorkdayAdjustment.objects.update_or_create(
-                    date=date,
-                    defaults=defaults
-                )
-
-                # 同時更新 CalendarDay
+            for i, row in chunk:
                 try:
-                    calendar_day = CalendarDay.objects.get(date=date)
-                    calendar_day.is_workday = True
-                    calendar_day.save()
-                except CalendarDay.DoesNotExist:
-                    CalendarDay.objects.create(
-                        date=date,
-                        is_workday=True
-                    )
-
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+                    if len(row) < 1:
+                        continue
+
+                    # 解析日期
+                    date_str = row[0].strip()
+                    date = self.parse_date_flexible(date_str)
+                    
+                    if not date:
+                        error_count += 1
+                        continue
+
+                    # 補哪一天的假（必填）
+                    compensate_date = None
+                    if len(row) >= 3:
+                        compensate_date = self.parse_date_flexible(row[2].strip())
+                    if not compensate_date:
+                        self.stdout.write(self.style.WARNING(f'第 {i} 行: 缺少補哪一天的日期'))
+                        error_count += 1
+                        continue
+
+                    # 準備資料
+                    defaults = {}
+                    if len(row) >= 2:
+                        defaults['description'] = row[1].strip()
+
+                    workdays.append((
+                        WorkdayAdjustment(date=date, compensate_for=compensate_date, **defaults),
+                        tuple(defaults),
+                    ))
+
+                    # 同時更新 CalendarDay（沒有對應的日曆日期時建立一個）
+                    calendar_days.append(CalendarDay.from_date(date, is_workday=True))
+
+                except Exception as e:
+                    error_count += 1
+                    self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
 
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
+            # 建立或更新補班日
+            created, updated = self.upsert_grouped(WorkdayAdjustment, workdays, ['compensate_for'])
+            created_count += created
+            updated_count += updated
+            bulk_upsert(CalendarDay, calendar_days, ['is_workday'])
 
         self.stdout.write(self.style.SUCCESS(f'\n✅ 補班日資料匯入完成！'))
         self.stdout.write(f'  新增: {created_count} 筆')
@@ -1,16 +1,48 @@
 """
 匯入政府行政機關辦公日曆表 CSV 檔案
 專門處理政府公開資料平台的標準格式
+與資料庫現有資料比對後只寫入差異，--dry-run 只輸出差異不寫入
 """
 import csv
+import json
 from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from calendar_api.default_days import exception_storage_enabled, is_default
+from calendar_api.diff import DiffTotals, KeyedDiff, date_span, load_existing
+from calendar_api.ingest import EncodingDetectionError, chunked, open_csv
+from calendar_api.metrics import record_import
 from calendar_api.models import CalendarDay, Holiday, WorkdayAdjustment
-from datetime import datetime
+from calendar_api.profiling import ImportProfiler, add_profile_arguments
+from calendar_api.upsert import (
+    CALENDAR_DAY_UPDATE_FIELDS,
+    CALENDAR_FLAG_FIELDS,
+    DEFAULT_BATCH_SIZE,
+    HOLIDAY_KEY,
+    bulk_delete,
+    bulk_upsert,
+    save_calendar_days,
+)
+from datetime import datetime, timedelta
+
+# 比對差異時使用的欄位（年份等衍生欄位由日期決定，不需比對）
+HOLIDAY_FIELDS = ('name', 'holiday_type', 'is_lunar', 'description')
+WORKDAY_FIELDS = ('compensate_for', 'description')
+
+# 差異報告中各模型的顯示名稱
+DIFF_LABELS = {
+    'calendar_days': '日曆資料',
+    'holidays': '假日資料',
+    'workday_adjustments': '補班日資料',
+}
 
 
 class Command(BaseCommand):
     help = '匯入政府行政機關辦公日曆表 CSV 檔案'
 
+    # 未指定 --profile 時（或由其他指令直接呼叫 import_data 時）不做效能分析
+    profiler = ImportProfiler(enabled=False)
+
     def add_arguments(self, parser):
         parser.add_argument(
             'csv_file',
@@ -20,213 +52,345 @@ class Command(BaseCommand):
         parser.add_argument(
             '--encoding',
             type=str,
-            default='utf-8',
-            help='CSV 檔案編碼 (預設: utf-8)'
+            default=None,
+            help='CSV 檔案編碼 (預設: 自動偵測 UTF-8 / Big5)'
         )
         parser.add_argument(
             '--year',
             type=int,
             help='只匯入指定年份的資料'
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只比對並輸出與資料庫的差異，不寫入任何資料'
+        )
+        parser.add_argument(
+            '--diff-json',
+            type=str,
+            metavar='PATH',
+            help='將差異明細以 JSON 格式寫入指定檔案'
+        )
+        add_profile_arguments(parser)
 
     def handle(self, *args, **options):
+        with record_import('import_gov_calendar') as self.import_run, \
+                ImportProfiler.from_options(options) as self.profiler:
+            self.import_file(**options)
+        self.profiler.report(self.stdout, self.style)
+
+    def import_file(self, **options):
+        """讀取並匯入 CSV 檔案，錯誤時輸出訊息並標記這次執行失敗"""
         csv_file = options['csv_file']
         encoding = options['encoding']
         filter_year = options.get('year')
+        dry_run = options.get('dry_run', False)
+        diff_json = options.get('diff_json')
 
         self.stdout.write(self.style.SUCCESS(f'\n📅 開始匯入政府行政機關辦公日曆表'))
         self.stdout.write(f'檔案: {csv_file}')
-        self.stdout.write(f'編碼: {encoding}\n')
+        self.stdout.write(f'編碼: {encoding or "自動偵測"}\n')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🔍 試執行 (--dry-run)：只比對差異，不寫入資料庫\n'))
 
         try:
-            # 嘗試不同的編碼
-            encodings_to_try = [encoding, 'utf-8', 'utf-8-sig', 'big5', 'cp950']
-            
-            csv_data = None
-            used_encoding = None
-            
-            for enc in encodings_to_try:
-                try:
-                    with open(csv_file, 'r', encoding=enc, newline='') as f:
-                        reader = csv.DictReader(f)
-                        csv_data = list(reader)
-                        
-                        # 移除 BOM (Byte Order Mark)
-                        if csv_data and csv_data[0]:
-                            first_key = list(csv_data[0].keys())[0]
-                            if first_key.startswith('\ufeff'):
-                                # 重新讀取，修正欄位名稱
-                                csv_data = []
-                                with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f2:
-                                    reader2 = csv.DictReader(f2)
-                                    csv_data = list(reader2)
-                                    enc = 'utf-8-sig'
-                        
-                        used_encoding = enc
-                        break
-                except (UnicodeDecodeError, FileNotFoundError):
-                    continue
-            
-            if csv_data is None:
-                self.stdout.write(self.style.ERROR('❌ 無法讀取 CSV 檔案'))
-                return
-            
-            self.stdout.write(self.style.SUCCESS(f'✓ 成功讀取檔案 (編碼: {used_encoding})'))
-            self.stdout.write(f'總筆數: {len(csv_data)}\n')
-
-            # 檢查欄位
-            if csv_data:
-                expected_fields = ['date', 'year', 'name', 'isholiday', 'holidaycategory', 'description']
-                actual_fields = list(csv_data[0].keys())
-                self.stdout.write(f'欄位: {actual_fields}\n')
-
-            # 如果指定年份，過濾資料
-            if filter_year:
-                csv_data = [row for row in csv_data if row.get('year') == str(filter_year)]
-                self.stdout.write(f'過濾年份 {filter_year}: {len(csv_data)} 筆\n')
-
-            # 統計資料
-            stats = self.import_data(csv_data)
-            
+            with open_csv(csv_file, encoding, profiler=self.profiler) as (f, used_encoding):
+                self.stdout.write(self.style.SUCCESS(f'✓ 成功開啟檔案 (編碼: {used_encoding})'))
+
+                reader = csv.DictReader(f)
+                # 檢查欄位
+                self.stdout.write(f'欄位: {reader.fieldnames}\n')
+
+                rows = self.profiler.count(enumerate(reader, start=1))
+                # 如果指定年份，過濾資料
+                if filter_year:
+                    self.stdout.write(f'過濾年份 {filter_year}\n')
+                    rows = ((i, row) for i, row in rows if row.get('year') == str(filter_year))
+
+                # 統計資料
+                stats, diffs = self.import_data(rows, dry_run=dry_run, keep_rows=bool(diff_json))
+            # 沒有任何差異時不寫入資料，資料集版本不會遞增，快取維持有效
+            changed = any(diffs.values())
+
+            if diff_json:
+                with open(diff_json, 'w', encoding='utf-8') as output:
+                    json.dump(
+                        {
+                            'file': csv_file,
+                            'dry_run': dry_run,
+                            **{name: diff.to_dict() for name, diff in diffs.items()},
+                        },
+                        output,
+                        cls=DjangoJSONEncoder,
+                        ensure_ascii=False,
+                        indent=2,
+                    )
+
             # 顯示統計結果
             self.stdout.write(self.style.SUCCESS('\n' + '='*60))
-            self.stdout.write(self.style.SUCCESS('✅ 匯入完成！'))
+            self.stdout.write(self.style.SUCCESS('✅ 比對完成（未寫入資料）' if dry_run else '✅ 匯入完成！'))
             self.stdout.write(self.style.SUCCESS('='*60))
             self.stdout.write(f'\n📊 統計資訊:')
-            self.stdout.write(f'  日曆資料: 新增 {stats["calendar_created"]} 筆, 更新 {stats["calendar_updated"]} 筆')
-            self.stdout.write(f'  假日資料: 新增 {stats["holiday_created"]} 筆, 更新 {stats["holiday_updated"]} 筆')
-            self.stdout.write(f'  補班日資料: 新增 {stats["workday_created"]} 筆, 更新 {stats["workday_updated"]} 筆')
+            self.stdout.write(f'  總筆數: {stats["rows"]}')
+            for name, diff in diffs.items():
+                counts = diff.counts()
+                self.stdout.write(
+                    f'  {DIFF_LABELS[name]}: 新增 {counts["inserted"]} 筆, 更新 {counts["changed"]} 筆, '
+                    f'移除 {counts["removed"]} 筆, 未變更 {counts["unchanged"]} 筆'
+                )
             if stats["errors"] > 0:
                 self.stdout.write(self.style.WARNING(f'  ⚠️  錯誤: {stats["errors"]} 筆'))
+            if not changed:
+                self.stdout.write('  資料與資料庫相同，未寫入任何資料')
+            elif dry_run:
+                self.stdout.write(f'\n📝 差異明細:')
+                for name, diff in diffs.items():
+                    if diff:
+                        self.stdout.write(f'  [{DIFF_LABELS[name]}]')
+                        for line in diff.lines():
+                            self.stdout.write(f'    {line}')
+            if diff_json:
+                self.stdout.write(f'  差異明細已寫入: {diff_json}')
             self.stdout.write('')
 
         except FileNotFoundError:
+            self.import_run.failed()
             self.stdout.write(self.style.ERROR(f'❌ 找不到檔案: {csv_file}'))
+        except (EncodingDetectionError, UnicodeDecodeError) as e:
+            self.import_run.failed()
+            self.stdout.write(self.style.ERROR(f'❌ 無法讀取 CSV 檔案: {str(e)}'))
         except Exception as e:
+            self.import_run.failed()
             self.stdout.write(self.style.ERROR(f'❌ 匯入過程發生錯誤: {str(e)}'))
             import traceback
             traceback.print_exc()
 
-    def import_data(self, csv_data):
-        """匯入資料"""
-        stats = {
-            'calendar_created': 0,
-            'calendar_updated': 0,
-            'holiday_created': 0,
-            'holiday_updated': 0,
-            'workday_created': 0,
-            'workday_updated': 0,
-            'errors': 0,
+    def import_data(self, rows, dry_run=False, keep_rows=False):
+        """
+        匯入資料，回傳 (統計資訊, 各模型累計的 DiffTotals)
+        rows 為 (行號, 欄位 dict) 的產生器，每批 DEFAULT_BATCH_SIZE 筆解析成精簡的欄位值 tuple（不建立模型物件），
+        與資料庫中該批日期範圍內的資料比對後立即寫入差異，全部在同一個交易中；dry_run 時不寫入
+        只保留目前這一批的資料，記憶體用量不隨檔案大小增加；keep_rows 或 dry_run 時另外保留差異明細供輸出
+        """
+        stats = {'rows': 0, 'errors': 0}
+        keep_rows = keep_rows or dry_run
+        diffs = {
+            'calendar_days': DiffTotals(CALENDAR_FLAG_FIELDS, keep_rows),
+            'holidays': DiffTotals(HOLIDAY_FIELDS, keep_rows),
+            'workday_adjustments': DiffTotals(WORKDAY_FIELDS, keep_rows),
         }
+        # 補班日要對應到整個檔案中距離最近的調整放假日，兩者每年只有數筆，保留到最後再比對
+        workday_rows = []
+        adjusted_dates = []
+        span = None
 
         self.stdout.write('開始處理資料...\n')
-        
-        for i, row in enumerate(csv_data, start=1):
-            try:
-                # 解析欄位
-                date_str = row.get('date', '').strip()
-                year_str = row.get('year', '').strip()
-                name = row.get('name', '').strip()
-                isholiday = row.get('isholiday', '').strip()
-                holidaycategory = row.get('holidaycategory', '').strip()
-                description = row.get('description', '').strip()
-
-                # 解析日期
-                if len(date_str) != 8:
-                    self.stdout.write(self.style.WARNING(f'第 {i} 行: 日期格式錯誤 "{date_str}"'))
-                    stats['errors'] += 1
+        with transaction.atomic():
+            for chunk in chunked(rows, DEFAULT_BATCH_SIZE):
+                days, holidays = self.parse_chunk(chunk, stats, workday_rows, adjusted_dates)
+                stats['rows'] += len(chunk)
+                self.stdout.write(f'  處理進度: {stats["rows"]} 筆...')
+
+                chunk_span = date_span(days)
+                if chunk_span is None:
                     continue
+                # 與前面各批的範圍銜接，檔案中沒有資料的空檔也會比對假日的移除
+                removal_start = chunk_span[0] if span is None else span[1] + timedelta(days=1)
+                chunk_diffs = self.diff_chunk(days, holidays, chunk_span, removal_start)
+                if not dry_run:
+                    self.write_diff(chunk_diffs)
+                for name, diff in chunk_diffs.items():
+                    diffs[name].add(diff)
+                span = chunk_span if span is None else (min(span[0], chunk_span[0]), max(span[1], chunk_span[1]))
 
-                date = datetime.strptime(date_str, '%Y%m%d').date()
-
-                # 判斷是否為假日
-                is_holiday = isholiday == '是'
-                
-                # 判斷是否為補班日
-                is_workday = holidaycategory == '補行上班日'
-                
-                # 判斷是否為週末
-                is_weekend = date.weekday() in [5, 6]
-
-                # 建立或更新 CalendarDay
-                calendar_defaults = {
-                    'year': date.year,
-                    'month': date.month,
-                    'day': date.day,
-                    'weekday': date.weekday(),
-                    'is_weekend': is_weekend,
-                    'is_holiday': is_holiday and not is_workday,  # 補班日不算假日
-                    'is_workday': is_workday,
-                    'holiday_name': name if name else None,
-                    'description': description if description else None,
-                }
-
-                calendar_day, created = CalendarDay.objects.update_or_create(
-                    date=date,
-                    defaults=calendar_defaults
+            if span is not None:
+                workdays = self.match_workdays(workday_rows, adjusted_dates, stats)
+                workday_diff = KeyedDiff(
+                    WORKDAY_FIELDS,
+                    load_existing(WorkdayAdjustment.objects.filter(date__range=span), WORKDAY_FIELDS),
+                    workdays,
                 )
+                if not dry_run:
+                    self.write_diff({'workday_adjustments': workday_diff})
+                diffs['workday_adjustments'].add(workday_diff)
+        return stats, diffs
 
-                if created:
-                    stats['calendar_created'] += 1
-                else:
-                    stats['calendar_updated'] += 1
-
-                # 如果有假日名稱，建立 Holiday 記錄
-                if name and is_holiday and not is_workday:
-                    # 判斷假日類型
-                    if holidaycategory == '放假之紀念日及節日':
-                        holiday_type = 'national'
-                    elif holidaycategory == '調整放假日':
-                        holiday_type = 'adjusted'
-                    elif holidaycategory == '補假':
-                        holiday_type = 'flexible'
-                    else:
-                        holiday_type = 'national'
-
-                    # 判斷是否為農曆假日
-                    is_lunar = any(keyword in name for keyword in ['春節', '端午', '中秋', '農曆'])
-
-                    holiday_defaults = {
-                        'name': name,
-                        'year': date.year,
-                        'holiday_type': holiday_type,
-                        'is_lunar': is_lunar,
-                        'description': description if description else '',
-                    }
-
-                    holiday, h_created = Holiday.objects.update_or_create(
-                        date=date,
-                        defaults=holiday_defaults
-                    )
+    def parse_chunk(self, chunk, stats, workday_rows, adjusted_dates):
+        """
+        解析一批資料列，回傳 {日期: 欄位值 tuple} 的 (日曆資料, 假日)
+        欄位順序分別為 CALENDAR_FLAG_FIELDS、HOLIDAY_FIELDS；同一日期重複時以最後一筆為準
+        調整放假日與補班日附加到 adjusted_dates / workday_rows
+        """
+        days = {}
+        holidays = {}
+        for i, row in chunk:
+            try:
+                parsed = self.parse_row(i, row)
+            except Exception as e:
+                stats['errors'] += 1
+                self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
+                continue
+            if parsed is None:
+                stats['errors'] += 1
+                continue
 
-                    if h_created:
-                        stats['holiday_created'] += 1
-                    else:
-                        stats['holiday_updated'] += 1
-
-                # 如果是補班日，建立 WorkdayAdjustment 記錄
-                if is_workday:
-                    workday_defaults = {
-                        'year': date.year,
-                        'description': description if description else holidaycategory,
-                    }
-
-                    workday, w_created = WorkdayAdjustment.objects.update_or_create(
-                        date=date,
-                        defaults=workday_defaults
-                    )
+            date, flags, holiday, is_adjusted, workday_description = parsed
+            days[date] = flags
+            if holiday is not None:
+                holidays[date] = holiday
+            if is_adjusted:
+                adjusted_dates.append(date)
+            if workday_description is not None:
+                workday_rows.append((i, date, workday_description))
+        return days, holidays
 
-                    if w_created:
-                        stats['workday_created'] += 1
-                    else:
-                        stats['workday_updated'] += 1
+    def match_workdays(self, workday_rows, adjusted_dates, stats):
+        """補班日對應到距離最近的調整放假日，回傳 {日期: WORKDAY_FIELDS 欄位值 tuple}"""
+        workdays = {}
+        for i, date, description in workday_rows:
+            if not adjusted_dates:
+                stats['errors'] += 1
+                self.stdout.write(self.style.WARNING(f'第 {i} 行: 找不到 {date} 補班日對應的調整放假日'))
+                continue
+            compensate_for = min(adjusted_dates, key=lambda adjusted: abs((adjusted - date).days))
+            workdays[date] = (compensate_for, description)
+        return workdays
 
-                # 進度顯示
-                if i % 100 == 0:
-                    self.stdout.write(f'  處理進度: {i}/{len(csv_data)} 筆...')
+    def diff_chunk(self, days, holidays, span, removal_start):
+        """
+        以每個模型一次查詢取回這一批日期範圍內的資料，依日期比對
+        - 日曆資料只比對這一批有的日期，檔案中沒有的日期保留原資料；
+          例外日儲存模式下檔案中的一般日不需要儲存，原本有資料時列為移除
+        - 假日：removal_start～這一批最晚日期之間檔案中已沒有的假日列為移除（例如假日改期）；
+          removal_start 為前面各批最晚日期的隔天，政府日曆依日期排序，各批的移除範圍不重疊
+        """
+        existing_days = load_existing(CalendarDay.objects.filter(date__range=span), CALENDAR_FLAG_FIELDS)
+        existing_days = {date: flags for date, flags in existing_days.items() if date in days}
+        if exception_storage_enabled():
+            days = {date: flags for date, flags in days.items() if not is_default(date, *flags)}
 
-            except Exception as e:
-                stats['errors'] += 1
-                self.stdout.write(self.style.WARNING(f'第 {i} 行處理失敗: {str(e)}'))
+        holiday_span = (min(span[0], removal_start), span[1])
+        existing_holidays = self.load_holidays(holiday_span)
+        existing_holidays = {
+            date: values for date, values in existing_holidays.items()
+            if date >= removal_start or date in holidays
+        }
+
+        return {
+            'calendar_days': KeyedDiff(CALENDAR_FLAG_FIELDS, existing_days, days),
+            'holidays': KeyedDiff(HOLIDAY_FIELDS, existing_holidays, holidays),
+        }
+
+    def load_holidays(self, span):
+        """
+        取回範圍內的假日 {日期: HOLIDAY_FIELDS 欄位值 tuple}
+        政府日曆每天最多一個假日；資料庫中同一天有多筆假日時以最早建立的一筆為準，名稱改為以「、」串接所有名稱，
+        一定不會與檔案相同，寫入時整天的假日替換為檔案中的假日
+        """
+        holidays = {}
+        for date, *values in Holiday.objects.filter(date__range=span).order_by('id').values_list(
+            'date', *HOLIDAY_FIELDS
+        ).iterator():
+            if date in holidays:
+                first = holidays[date]
+                holidays[date] = (f'{first[0]}、{values[0]}', *first[1:])
+            else:
+                holidays[date] = tuple(values)
+        return holidays
+
+    def write_diff(self, diffs):
+        """只寫入有差異的資料列；由 import_data 在交易中逐批呼叫"""
+        calendar_diff = diffs.get('calendar_days')
+        if calendar_diff:
+            bulk_delete(CalendarDay, sorted(calendar_diff.removed))
+            save_calendar_days(
+                [
+                    CalendarDay.from_date(date, **dict(zip(CALENDAR_FLAG_FIELDS, flags)))
+                    for date, flags in sorted(calendar_diff.written().items())
+                ],
+                CALENDAR_DAY_UPDATE_FIELDS,
+            )
+
+        holiday_diff = diffs.get('holidays')
+        if holiday_diff:
+            # 以日期比對，變更的日期先移除當天所有的假日再寫入，不會只改到同一天多筆假日中的一筆
+            bulk_delete(Holiday, sorted([*holiday_diff.removed, *holiday_diff.changed]))
+            bulk_upsert(
+                Holiday,
+                [
+                    Holiday(date=date, year=date.year, **dict(zip(HOLIDAY_FIELDS, values)))
+                    for date, values in sorted(holiday_diff.written().items())
+                ],
+                ['year', 'holiday_type', 'is_lunar', 'description'],
+                key=HOLIDAY_KEY,
+            )
+
+        workday_diff = diffs.get('workday_adjustments')
+        if workday_diff:
+            bulk_delete(WorkdayAdjustment, sorted(workday_diff.removed))
+            bulk_upsert(
+                WorkdayAdjustment,
+                [
+                    WorkdayAdjustment(date=date, **dict(zip(WORKDAY_FIELDS, values)))
+                    for date, values in sorted(workday_diff.written().items())
+                ],
+                list(WORKDAY_FIELDS),
+            )
+
+    def parse_row(self, i, row):
+        """
+        解析一行政府日曆資料
+        回傳 (日期, 日曆欄位值, 假日欄位值或 None, 是否為調整放假日, 補班日說明或 None)，
+        欄位值依 CALENDAR_FLAG_FIELDS / HOLIDAY_FIELDS 的順序；日期格式錯誤時回傳 None
+        """
+        # 解析欄位
+        date_str = row.get('date', '').strip()
+        name = row.get('name', '').strip()
+        isholiday = row.get('isholiday', '').strip()
+        holidaycategory = row.get('holidaycategory', '').strip()
+        description = row.get('description', '').strip()
+
+        # 解析日期
+        if len(date_str) != 8:
+            self.stdout.write(self.style.WARNING(f'第 {i} 行: 日期格式錯誤 "{date_str}"'))
+            return None
+
+        date = datetime.strptime(date_str, '%Y%m%d').date()
+
+        # 判斷是否為假日
+        is_holiday = isholiday == '是'
+        
+        # 判斷是否為補班日
+        is_workday = holidaycategory == '補行上班日'
+
+        flags = (
+            is_holiday and not is_workday,  # 補班日不算假日
+            is_workday,
+            name if name else None,
+            description if description else None,
+        )
+
+        # 如果有假日名稱，建立 Holiday 記錄
+        holiday = None
+        if name and is_holiday and not is_workday:
+            # 判斷假日類型
+            if holidaycategory == '放假之紀念日及節日':
+                holiday_type = 'national'
+            elif holidaycategory == '調整放假日':
+                holiday_type = 'adjusted'
+            elif holidaycategory == '補假':
+                holiday_type = 'flexible'
+            else:
+                holiday_type = 'national'
+
+            # 判斷是否為農曆假日
+            is_lunar = any(keyword in name for keyword in ['春節', '端午', '中秋', '農曆'])
+
+            holiday = (name, holiday_type, is_lunar, description if description else '')
+
+        # 如果是補班日，記錄說明供稍後建立 WorkdayAdjustment
+        workday_description = None
+        if is_workday:
+            workday_description = description if description else holidaycategory
 
-        return stats
+        return date, flags, holiday, holidaycategory == '調整放假日', workday_description
@@ -0,0 +1,297 @@
+"""
+Prometheus 格式的效能指標
+不依賴外部服務：每個行程在記憶體中累計，定期將快照寫入 CALENDAR_METRICS_DIR 下自己的檔案，
+/metrics 被抓取時合併目錄中所有行程（包含已結束的 worker 與匯入指令）的快照輸出
+
+- 請求數、延遲直方圖、SQL 查詢數與耗時：以端點的 URL 名稱 (route) 為標籤，由 ServerTimingMiddleware 記錄
+- 快取命中：blob_cache 的命中 / 未命中次數與命中率，記憶體索引的重建次數
+- 匯入指令：每次執行的耗時與結果（record_import）
+
+部署時應在啟動前清空 CALENDAR_METRICS_DIR（與 prometheus_client 的 multiprocess 模式相同），
+設為空字串時只輸出目前行程的指標
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# 延遲直方圖的上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_enabled():
+    return getattr(settings, 'CALENDAR_METRICS_ENABLED', True)
+
+
+def metrics_dir():
+    return getattr(settings, 'CALENDAR_METRICS_DIR', '')
+
+
+class MetricsRegistry:
+    """單一行程的指標；鍵為標籤 tuple，快照以 [標籤..., 值] 的列表表示以便寫成 JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一個 pid 可能被重複使用，檔名另外加上隨機字串
+        self.process_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.last_flush = time.monotonic()
+        self.requests = {}
+        self.latency = {}
+        self.db_queries = {}
+        self.db_seconds = {}
+        self.imports = {}
+
+    def observe_request(self, route, method, status, seconds, queries, query_seconds):
+        with self._lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.latency.get((route, method))
+            if histogram is None:
+                # 各 bucket 的次數（非累計）+ 超過最大上界的次數, 總和
+                histogram = self.latency[(route, method)] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    break
+            else:
+                position = len(LATENCY_BUCKETS)
+            histogram[0][position] += 1
+            histogram[1] += seconds
+
+            self.db_queries[route] = self.db_queries.get(route, 0) + queries
+            self.db_seconds[route] = self.db_seconds.get(route, 0.0) + query_seconds
+        self.maybe_flush()
+
+    def observe_import(self, command, status, seconds):
+        with self._lock:
+            stats = self.imports.setdefault(command, {'runs': {}, 'sum': 0.0, 'count': 0})
+            stats['runs'][status] = stats['runs'].get(status, 0) + 1
+            stats['sum'] += seconds
+            stats['count'] += 1
+            stats['last'] = seconds
+            stats['last_timestamp'] = time.time()
+        # 匯入指令通常是獨立的短暫行程，立即寫入
+        self.flush()
+
+    def snapshot(self):
+        from .blob_cache import blob_cache
+        from .index import index_builds
+
+        with self._lock:
+            return {
+                'requests': [[*key, value] for key, value in self.requests.items()],
+                'latency': [[*key, buckets, total] for key, (buckets, total) in self.latency.items()],
+                'db_queries': [[key, value] for key, value in self.db_queries.items()],
+                'db_seconds': [[key, value] for key, value in self.db_seconds.items()],
+                'cache': [['blob', blob_cache.hits, blob_cache.misses]],
+                'index_builds': index_builds(),
+                'imports': [[command, stats] for command, stats in self.imports.items()],
+            }
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'CALENDAR_METRICS_FLUSH_INTERVAL', 5)
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """將目前行程的快照寫入 CALENDAR_METRICS_DIR/<行程>.json（先寫暫存檔再取代，讀取端不會讀到一半的檔案）"""
+        self.last_flush = time.monotonic()
+        directory = metrics_dir()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, os.path.join(directory, f'{self.process_id}.json'))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+registry = MetricsRegistry()
+
+
+@atexit.register
+def _flush_on_exit():
+    if registry.requests or registry.imports:
+        registry.flush()
+
+
+def observe_request(route, method, status, seconds, queries, query_seconds):
+    """記錄一個請求（由 ServerTimingMiddleware 呼叫）"""
+    if metrics_enabled():
+        registry.observe_request(route, method, status, seconds, queries, query_seconds)
+
+
+class ImportRun:
+    """record_import 產生的執行紀錄；指令自行處理錯誤（不拋出例外）時以 failed() 標記失敗"""
+
+    def __init__(self):
+        self.status = 'success'
+
+    def failed(self):
+        self.status = 'error'
+
+
+@contextmanager
+def record_import(command):
+    """
+    記錄匯入指令的執行時間與結果，未處理的例外視為失敗
+    用法：
+        with record_import('import_gov_calendar') as run:
+            ...
+            run.failed()
+    """
+    run = ImportRun()
+    started = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        run.failed()
+        raise
+    finally:
+        if metrics_enabled():
+            registry.observe_import(command, run.status, time.perf_counter() - started)
+
+
+def collect_snapshots():
+    """目前行程的最新快照，加上 CALENDAR_METRICS_DIR 中其他行程的快照"""
+    registry.flush()
+    snapshots = {registry.process_id: registry.snapshot()}
+    directory = metrics_dir()
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            process_id, extension = os.path.splitext(name)
+            if extension != '.json' or process_id in snapshots:
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    snapshots[process_id] = json.load(f)
+            except (OSError, ValueError):
+                continue
+    return list(snapshots.values())
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_metrics():
+    """合併所有行程的快照，輸出 Prometheus text exposition format"""
+    requests = {}
+    latency = {}
+    db_queries = {}
+    db_seconds = {}
+    cache = {}
+    index_builds = 0
+    imports = {}
+
+    for snapshot in collect_snapshots():
+        for route, method, status, value in snapshot['requests']:
+            key = (route, method, status)
+            requests[key] = requests.get(key, 0) + value
+        for route, method, buckets, total in snapshot['latency']:
+            merged = latency.setdefault((route, method), [[0] * len(buckets), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+        for route, value in snapshot['db_queries']:
+            db_queries[route] = db_queries.get(route, 0) + value
+        for route, value in snapshot['db_seconds']:
+            db_seconds[route] = db_seconds.get(route, 0.0) + value
+        for name, hits, misses in snapshot['cache']:
+            merged = cache.setdefault(name, [0, 0])
+            merged[0] += hits
+            merged[1] += misses
+        index_builds += snapshot['index_builds']
+        for command, stats in snapshot['imports']:
+            merged = imports.setdefault(command, {'runs': {}, 'sum': 0.0, 'count': 0})
+            for status, value in stats['runs'].items():
+                merged['runs'][status] = merged['runs'].get(status, 0) + value
+            merged['sum'] += stats['sum']
+            merged['count'] += stats['count']
+            if stats.get('last_timestamp', 0) >= merged.get('last_timestamp', 0):
+                merged['last'] = stats['last']
+                merged['last_timestamp'] = stats['last_timestamp']
+
+    lines = []
+
+    def family(name, metric_type, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+    family('calendar_http_requests_total', 'counter', 'HTTP requests by route, method and status')
+    for (route, method, status), value in sorted(requests.items()):
+        lines.append(f'calendar_http_requests_total{_labels(route=route, method=method, status=status)} {value}')
+
+    family('calendar_http_request_duration_seconds', 'histogram', 'HTTP request latency by route and method')
+    for (route, method), (buckets, total) in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += count
+            labels = _labels(route=route, method=method, le=_number(bound))
+            lines.append(f'calendar_http_request_duration_seconds_bucket{labels} {cumulative}')
+        cumulative += buckets[-1]
+        labels = _labels(route=route, method=method, le='+Inf')
+        lines.append(f'calendar_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(route=route, method=method)
+        lines.append(f'calendar_http_request_duration_seconds_sum{labels} {_number(total)}')
+        lines.append(f'calendar_http_request_duration_seconds_count{labels} {cumulative}')
+
+    family('calendar_db_queries_total', 'counter', 'SQL queries executed by route')
+    for route, value in sorted(db_queries.items()):
+        lines.append(f'calendar_db_queries_total{_labels(route=route)} {value}')
+
+    family('calendar_db_query_seconds_total', 'counter', 'Time spent in SQL queries by route')
+    for route, value in sorted(db_seconds.items()):
+        lines.append(f'calendar_db_query_seconds_total{_labels(route=route)} {_number(value)}')
+
+    family('calendar_cache_hits_total', 'counter', 'Cache hits')
+    for name, (hits, _) in sorted(cache.items()):
+        lines.append(f'calendar_cache_hits_total{_labels(cache=name)} {hits}')
+    family('calendar_cache_misses_total', 'counter', 'Cache misses')
+    for name, (_, misses) in sorted(cache.items()):
+        lines.append(f'calendar_cache_misses_total{_labels(cache=name)} {misses}')
+    family('calendar_cache_hit_ratio', 'gauge', 'Cache hit ratio since the metrics directory was created')
+    for name, (hits, misses) in sorted(cache.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'calendar_cache_hit_ratio{_labels(cache=name)} {_number(ratio)}')
+
+    family('calendar_index_builds_total', 'counter', 'In-memory calendar index rebuilds')
+    lines.append(f'calendar_index_builds_total {index_builds}')
+
+    family('calendar_import_runs_total', 'counter', 'Import command runs by result')
+    for command, stats in sorted(imports.items()):
+        for status, value in sorted(stats['runs'].items()):
+            lines.append(f'calendar_import_runs_total{_labels(command=command, status=status)} {value}')
+    family('calendar_import_duration_seconds', 'summary', 'Import command run duration')
+    for command, stats in sorted(imports.items()):
+        lines.append(f'calendar_import_duration_seconds_sum{_labels(command=command)} {_number(stats["sum"])}')
+        lines.append(f'calendar_import_duration_seconds_count{_labels(command=command)} {stats["count"]}')
+    family('calendar_import_last_duration_seconds', 'gauge', 'Duration of the most recent import run')
+    for command, stats in sorted(imports.items()):
+        lines.append(f'calendar_import_last_duration_seconds{_labels(command=command)} {_number(stats["last"])}')
+    family('calendar_import_last_run_timestamp_seconds', 'gauge', 'Unix time of the most recent import run')
+    for command, stats in sorted(imports.items()):
+        lines.append(
+            f'calendar_import_last_run_timestamp_seconds{_labels(command=command)} {_number(stats["last_timestamp"])}'
+        )
+
+    return '\n'.join(lines) + '\n'
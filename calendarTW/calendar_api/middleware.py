@@ -0,0 +1,226 @@
+"""
+calendar_api 使用的 middleware
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import observe_request
+
+timing_logger = logging.getLogger('calendar_api.timing')
+
+# 每個請求最多保留的 SQL 數（慢請求時輸出）
+MAX_RECORDED_QUERIES = 200
+
+# 目前請求的 QueryRecorder；contextvar 會跟著 sync_to_async 進入執行 ORM 的執行緒
+_current_recorder = ContextVar('calendar_query_recorder', default=None)
+
+
+class AsyncRoutingMiddleware:
+    """
+    ASGI 請求改用 CALENDAR_ASYNC_URLCONF，讓熱門唯讀端點由 async_views 處理
+    WSGI 請求維持原本的 URL 設定；設定為空字串時停用
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        urlconf = getattr(settings, 'CALENDAR_ASYNC_URLCONF', '')
+        if urlconf:
+            request.urlconf = urlconf
+        return await self.get_response(request)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    資料庫連線的 execute wrapper（由 install_query_recorder 在建立連線時安裝）
+    交給目前請求的 QueryRecorder 記錄；不在計時中的請求直接執行
+    每個執行緒各有自己的連線，非同步端點的查詢在 sync_to_async 的執行緒中執行，
+    因此以 contextvar 找到所屬請求，而不是在 middleware 中對當下的 connection 使用 execute_wrapper
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created 的接收器（於 AppConfig.ready 註冊）：每個資料庫連線安裝 record_query，重新連線時不重複安裝"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class QueryRecorder:
+    """單一請求的 SQL 紀錄器：累計查詢數與耗時，並保留 SQL 供慢請求輸出"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'params': None if many else params,
+                    'ms': round(elapsed * 1000, 3),
+                })
+
+
+class RequestTiming:
+    """單一請求的計時資料"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint = None
+        self.view_started = None
+        self.view_finished = None
+        self.render_finished = None
+        self.queries = QueryRecorder()
+
+    def metrics(self, finished):
+        """回傳 [(名稱, 毫秒, 說明)]，沒有經過的階段不列出"""
+        metrics = [('db', self.queries.duration * 1000, f'{self.queries.count} queries')]
+        if self.view_started is not None:
+            view_finished = self.view_finished or finished
+            metrics.append(('view', (view_finished - self.view_started) * 1000, 'view'))
+        if self.view_finished is not None and self.render_finished is not None:
+            metrics.append(('render', (self.render_finished - self.view_finished) * 1000, 'serialization'))
+        metrics.append(('total', (finished - self.started) * 1000, 'total'))
+        return metrics
+
+
+def timing_exempt(view_func):
+    """標記不量測的 view（例如 /metrics：抓取指標本身不計入請求指標，也不加上 Server-Timing）"""
+    view_func.calendar_timing_exempt = True
+    return view_func
+
+
+def _endpoint_name(view_func, resolver_match):
+    """
+    只計時 calendar_api 的端點，回傳端點名稱（URL name，沒有時使用路由）
+    其他端點與以 timing_exempt 標記的 view 回傳 None
+    """
+    view = getattr(view_func, 'cls', view_func)
+    if not view.__module__.startswith('calendar_api.') or getattr(view_func, 'calendar_timing_exempt', False):
+        return None
+    return resolver_match.view_name or resolver_match.route
+
+
+def slow_request_threshold(endpoint):
+    """端點的慢請求門檻（毫秒），未個別設定時使用 CALENDAR_SLOW_REQUEST_MS"""
+    thresholds = getattr(settings, 'CALENDAR_SLOW_REQUEST_THRESHOLDS', {})
+    return thresholds.get(endpoint, getattr(settings, 'CALENDAR_SLOW_REQUEST_MS', 500))
+
+
+class ServerTimingMiddleware:
+    """
+    calendar_api 端點的效能量測
+    - 以 execute wrapper (record_query) 累計 SQL 查詢數與耗時，另外量測 view 與序列化 (render) 的時間
+    - 結果輸出成 Server-Timing 回應標頭與 calendar_api.timing 的 JSON 記錄，並累計到 /metrics 的指標
+    - 超過端點的慢請求門檻時，以 WARNING 記錄執行過的 SQL
+    串流回應的內容在 middleware 之後才產生，只會量測到開始串流前的時間
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.calendar_timing = RequestTiming()
+        token = _current_recorder.set(request.calendar_timing.queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        request.calendar_timing = RequestTiming()
+        token = _current_recorder.set(request.calendar_timing.queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = request.calendar_timing
+        timing.endpoint = _endpoint_name(view_func, request.resolver_match)
+        timing.view_started = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF 的 Response 在此之後才 render，render 完成的時間由回呼記錄
+        timing = request.calendar_timing
+        timing.view_finished = time.perf_counter()
+
+        def rendered(response):
+            timing.render_finished = time.perf_counter()
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response):
+        timing = request.calendar_timing
+        if timing.endpoint is None:
+            return response
+
+        finished = time.perf_counter()
+        metrics = timing.metrics(finished)
+        if getattr(settings, 'CALENDAR_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration:.3f};desc="{description}"' for name, duration, description in metrics
+            )
+
+        record = {
+            'endpoint': timing.endpoint,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'db_queries': timing.queries.count,
+        }
+        record.update({f'{name}_ms': round(duration, 3) for name, duration, _ in metrics})
+        timing_logger.info(json.dumps(record, ensure_ascii=False))
+        observe_request(
+            timing.endpoint,
+            request.method,
+            response.status_code,
+            finished - timing.started,
+            timing.queries.count,
+            timing.queries.duration,
+        )
+
+        if record['total_ms'] >= slow_request_threshold(timing.endpoint):
+            record['threshold_ms'] = slow_request_threshold(timing.endpoint)
+            record['queries'] = timing.queries.queries
+            timing_logger.warning('slow request %s', json.dumps(record, ensure_ascii=False, default=str))
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='年份')),
+                ('month', models.IntegerField(verbose_name='月份')),
+                ('total_days', models.IntegerField(default=0, verbose_name='總天數')),
+                ('weekends', models.IntegerField(default=0, verbose_name='週末天數')),
+                ('holidays', models.IntegerField(default=0, verbose_name='假日天數')),
+                ('workday_adjustments', models.IntegerField(default=0, verbose_name='補班天數')),
+            ],
+            options={
+                'verbose_name': '月份統計摘要',
+                'verbose_name_plural': '月份統計摘要',
+                'ordering': ['year', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('year', 'month'), name='unique_month_summary')],
+            },
+        ),
+    ]
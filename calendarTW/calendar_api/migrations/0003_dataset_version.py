@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_api', '0002_month_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='版本')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='最後更新時間')),
+            ],
+            options={
+                'verbose_name': '資料集版本',
+                'verbose_name_plural': '資料集版本',
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+"""
+為既有的 CalendarDay 資料建立 MonthSummary 摘要
+統計端點讀取時不再寫回摘要表，摘要表建立前已匯入的月份在此一次補齊；之後由寫入路徑維護
+以遷移當時的模型自行彙總，不呼叫 calendar_api.summaries，結果不受 CALENDAR_MONTH_SUMMARY_TABLE 與之後程式修改的影響
+"""
+from calendar import monthrange
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Q
+
+SUMMARY_FIELDS = ['total_days', 'weekends', 'holidays', 'workday_adjustments']
+
+
+def month_days(year, month):
+    """整個月份的 (天數, 週末天數)"""
+    total_days = monthrange(year, month)[1]
+    weekends = sum(1 for day in range(1, total_days + 1) if date(year, month, day).weekday() >= 5)
+    return total_days, weekends
+
+
+def backfill_month_summaries(apps, schema_editor):
+    CalendarDay = apps.get_model('calendar_api', 'CalendarDay')
+    MonthSummary = apps.get_model('calendar_api', 'MonthSummary')
+    # 例外日儲存模式只儲存與一般日不同的日期，天數與週末由星期推算
+    exception_storage = getattr(settings, 'CALENDAR_EXCEPTION_STORAGE', False)
+
+    rows = CalendarDay.objects.values('year', 'month').annotate(
+        total_days=Count('id'),
+        weekends=Count('id', filter=Q(is_weekend=True)),
+        holidays=Count('id', filter=Q(is_holiday=True)),
+        workday_adjustments=Count('id', filter=Q(is_workday=True)),
+        weekday_holidays=Count('id', filter=Q(is_holiday=True, is_weekend=False)),
+        weekend_non_holidays=Count('id', filter=Q(is_holiday=False, is_weekend=True)),
+    ).order_by()
+
+    summaries = []
+    for row in rows:
+        if exception_storage:
+            total_days, weekends = month_days(row['year'], row['month'])
+            holidays = weekends + row['weekday_holidays'] - row['weekend_non_holidays']
+        else:
+            total_days, weekends, holidays = row['total_days'], row['weekends'], row['holidays']
+        summaries.append(MonthSummary(
+            year=row['year'],
+            month=row['month'],
+            total_days=total_days,
+            weekends=weekends,
+            holidays=holidays,
+            workday_adjustments=row['workday_adjustments'],
+        ))
+
+    MonthSummary.objects.bulk_create(
+        summaries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['year', 'month'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_api', '0003_dataset_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_month_summaries, migrations.RunPython.noop),
+    ]
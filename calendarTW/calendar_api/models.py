@@ -1,7 +1,22 @@
 from django.db import models
 
 
-class CalendarDay(models.Model):
+class LoadedDateMixin:
+    """
+    記下從資料庫讀出時的日期 (_loaded_date)
+    修改日期後儲存時，訊號處理以此更新原本的日期，不需要再查詢一次資料庫
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 延遲載入 (defer) 日期時不記錄，儲存時再查詢
+        if 'date' in instance.__dict__:
+            instance._loaded_date = instance.date
+        return instance
+
+
+class CalendarDay(LoadedDateMixin, models.Model):
     """
     日曆日期模型 - 儲存每一天的詳細資訊
     """
@@ -45,6 +60,23 @@ class CalendarDay(models.Model):
         weekdays = ['週一', '週二', '週三', '週四', '週五', '週六', '週日']
         return weekdays[self.weekday]
 
+    @classmethod
+    def from_date(cls, date, **fields):
+        """
+        建立指定日期的物件並填好年、月、日、星期等衍生欄位
+        供 bulk_create 等不會呼叫 save() 的批次寫入使用
+        """
+        weekday = date.weekday()
+        return cls(
+            date=date,
+            year=date.year,
+            month=date.month,
+            day=date.day,
+            weekday=weekday,
+            is_weekend=weekday in [5, 6],
+            **fields
+        )
+
     def save(self, *args, **kwargs):
         """
         覆寫 save 方法，自動計算年、月、日、星期等欄位
@@ -60,7 +92,7 @@ class CalendarDay(models.Model):
         super().save(*args, **kwargs)
 
 
-class Holiday(models.Model):
+class Holiday(LoadedDateMixin, models.Model):
     """
     假日模型 - 儲存國定假日、彈性放假等資訊
     """
@@ -103,7 +135,7 @@ class Holiday(models.Model):
         super().save(*args, **kwargs)
 
 
-class WorkdayAdjustment(models.Model):
+class WorkdayAdjustment(LoadedDateMixin, models.Model):
     """
     補班日模型 - 儲存補班日資訊
     """
@@ -118,3 +150,48 @@ class WorkdayAdjustment(models.Model):
 
     def __str__(self):
         return f"{self.date} 補 {self.compensate_for} 的假"
+
+
+class MonthSummary(models.Model):
+    """
+    月份統計摘要 - 由匯入指令維護的 CalendarDay 彙總資料
+    讓月份 / 年度統計端點只需讀取一筆資料
+    """
+    year = models.IntegerField(verbose_name="年份")
+    month = models.IntegerField(verbose_name="月份")
+    total_days = models.IntegerField(default=0, verbose_name="總天數")
+    weekends = models.IntegerField(default=0, verbose_name="週末天數")
+    holidays = models.IntegerField(default=0, verbose_name="假日天數")
+    workday_adjustments = models.IntegerField(default=0, verbose_name="補班天數")
+
+    class Meta:
+        verbose_name = "月份統計摘要"
+        verbose_name_plural = "月份統計摘要"
+        ordering = ['year', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='unique_month_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} 統計摘要"
+
+    @property
+    def actual_workdays(self):
+        """實際工作日 = 總天數 - 週末 - 假日 + 補班日"""
+        return self.total_days - self.weekends - self.holidays + self.workday_adjustments
+
+
+class DatasetVersion(models.Model):
+    """
+    資料集版本 - 全域只有一筆資料
+    每次匯入或透過 API / Admin 修改日曆資料時遞增，用於產生 ETag 與讓各行程的快取失效
+    """
+    version = models.BigIntegerField(default=0, verbose_name="版本")
+    updated_at = models.DateTimeField(null=True, blank=True, verbose_name="最後更新時間")
+
+    class Meta:
+        verbose_name = "資料集版本"
+        verbose_name_plural = "資料集版本"
+
+    def __str__(self):
+        return f"v{self.version} ({self.updated_at})"
@@ -0,0 +1,91 @@
+"""
+分頁設定
+列表端點預設使用頁碼分頁；加上 ?pagination=cursor 時改用以日期為鍵的游標分頁 (keyset pagination)，
+不執行 COUNT(*)，也不使用 OFFSET，翻到多後面的頁面延遲都相同
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+
+
+class CursorOrderingNotSupported(APIException):
+    """游標分頁固定依日期排序，不接受 ordering 參數"""
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class DateCursorPagination(CursorPagination):
+    """
+    以 date 欄位（已建立索引）為鍵的游標分頁
+    同一天可能有多筆假日，以主鍵作為第二排序鍵，同一日期的資料在每次查詢的順序都相同，翻頁時不會重複或遺漏
+    """
+    ordering = ('date', 'pk')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        # 不採用 view 的 OrderingFilter 排序（只有 date，沒有第二排序鍵）
+        return self.ordering
+
+
+class DatePagination(BasePagination):
+    """
+    依查詢參數切換分頁方式
+    - 預設：PageNumberPagination（?page=2）
+    - ?pagination=cursor 或帶有 cursor 參數：DateCursorPagination
+    """
+    cursor_query_param = DateCursorPagination.cursor_query_param
+
+    def __init__(self):
+        self.page_number_paginator = PageNumberPagination()
+        self.cursor_paginator = DateCursorPagination()
+        self.paginator = self.page_number_paginator
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get('pagination') == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            if request.query_params.get(api_settings.ORDERING_PARAM):
+                raise CursorOrderingNotSupported({'error': '游標分頁固定依日期排序，不支援 ordering 參數'})
+            self.paginator = self.cursor_paginator
+        else:
+            self.paginator = self.page_number_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.page_number_paginator.get_schema_operation_parameters(view)
+        parameters.append({
+            'name': 'pagination',
+            'required': False,
+            'in': 'query',
+            'description': '設為 cursor 時改用以日期為鍵的游標分頁（不計算總筆數）',
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        parameters.append({
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': '游標分頁的游標值（由 next / previous 連結提供）',
+            'schema': {'type': 'string'},
+        })
+        return parameters
@@ -0,0 +1,232 @@
+"""
+匯入指令的效能分析（--profile）
+記錄各階段的實際耗時、每秒筆數、SQL 陳述式數與行程的最大常駐記憶體，
+可另外以 tracemalloc 記錄 Python 物件的記憶體峰值（--profile-memory）或輸出 cProfile 檔案（--profile-output）
+
+階段以「獨佔時間」計算，巢狀的階段不會重複計入外層：
+- read：從檔案讀取位元組
+- decode：將位元組解碼成文字行
+- db：執行 SQL（connection.execute_wrapper）
+- 其餘時間計入指令指定的外層階段（CSV 匯入為 parse：CSV 解析、欄位轉換與建立模型物件）
+"""
+import cProfile
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def add_profile_arguments(parser):
+    """加入 --profile 與 --profile-output 參數"""
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='輸出各階段耗時、每秒筆數、SQL 數與最大常駐記憶體'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='另外以 tracemalloc 記錄記憶體峰值（匯入會慢數倍），會自動啟用 --profile'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=str,
+        help='另外將 cProfile 結果寫入指定檔案（可用 python -m pstats 檢視），會自動啟用 --profile'
+    )
+
+
+def max_rss():
+    """行程的最大常駐記憶體（位元組），無法取得時回傳 None"""
+    if resource is None:
+        return None
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+class _TimedBuffer:
+    """包裝二進位檔案，讀取時間計入 read 階段；其餘屬性直接轉給原本的檔案"""
+
+    def __init__(self, buffer, profiler):
+        self._buffer = buffer
+        self._profiler = profiler
+
+    def read(self, size=-1):
+        with self._profiler.phase('read'):
+            return self._buffer.read(size)
+
+    def read1(self, size=-1):
+        with self._profiler.phase('read'):
+            return self._buffer.read1(size)
+
+    def readinto(self, buffer):
+        with self._profiler.phase('read'):
+            return self._buffer.readinto(buffer)
+
+    def __getattr__(self, name):
+        return getattr(self._buffer, name)
+
+
+class ImportProfiler:
+    """
+    匯入效能分析器；enabled=False 時所有方法都不做事，指令可以無條件呼叫
+
+    用法：
+        with ImportProfiler.from_options(options) as profiler:
+            with open_csv(path, profiler=profiler) as (f, encoding):
+                for row in profiler.count(csv.reader(f)):
+                    ...
+        profiler.report(self.stdout, self.style)
+    """
+
+    def __init__(self, enabled=True, profile_output=None, phase='parse', trace_memory=False):
+        self.enabled = enabled or trace_memory or bool(profile_output)
+        self.profile_output = profile_output
+        self.trace_memory = trace_memory
+        self.outer_phase = phase
+        self.times = {}
+        self.rows = 0
+        self.statements = 0
+        self.peak_memory = None
+        self.max_rss = None
+        self.elapsed = 0.0
+        self._stack = []
+        self._mark = None
+        self._profile = None
+
+    @classmethod
+    def from_options(cls, options, phase='parse'):
+        return cls(
+            options.get('profile', False),
+            options.get('profile_output'),
+            phase,
+            options.get('profile_memory', False),
+        )
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        self._started_tracemalloc = self.trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self._wrapper = connection.execute_wrapper(self._execute)
+        self._wrapper.__enter__()
+        if self.profile_output:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+        self._enter(self.outer_phase)
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.enabled:
+            return False
+        self._exit()
+        self.elapsed = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_output)
+        self._wrapper.__exit__(*exc_info)
+        self.max_rss = max_rss()
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return False
+
+    def _enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.times[parent] = self.times.get(parent, 0.0) + now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        name = self._stack.pop()
+        self.times[name] = self.times.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name):
+        """期間的獨佔時間計入 name 階段"""
+        if not self.enabled or not self._stack:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def _execute(self, execute, sql, params, many, context):
+        self.statements += 1
+        with self.phase('db'):
+            return execute(sql, params, many, context)
+
+    def wrap_buffer(self, buffer):
+        """包裝二進位檔案以記錄 read 階段"""
+        return _TimedBuffer(buffer, self) if self.enabled else buffer
+
+    def iterate(self, name, iterable):
+        """逐項取出 iterable，取值的時間計入 name 階段"""
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, iterable):
+        """計算經過的資料列數"""
+        if not self.enabled:
+            return iterable
+        return self._count(iterable)
+
+    def _count(self, iterable):
+        for item in iterable:
+            self.rows += 1
+            yield item
+
+    def add_rows(self, count):
+        """不是逐列讀取資料的指令自行累計處理筆數"""
+        self.rows += count
+
+    def report(self, stdout, style):
+        if not self.enabled:
+            return
+        rate = self.rows / self.elapsed if self.elapsed else 0
+        stdout.write(style.SUCCESS('\n⏱️  匯入效能分析'))
+        stdout.write(f'  總時間: {self.elapsed:.3f} 秒, {self.rows} 筆, {rate:.0f} 筆/秒')
+        stdout.write(f'  {"階段":<10}{"秒":>10}{"比例":>8}')
+        for name in ('read', 'decode', self.outer_phase, 'db'):
+            if name not in self.times:
+                continue
+            seconds = self.times[name]
+            share = seconds / self.elapsed * 100 if self.elapsed else 0
+            stdout.write(f'  {name:<10}{seconds:>10.3f}{share:>7.1f}%')
+        stdout.write(f'  SQL 陳述式: {self.statements} 次（executemany 計為 1 次）')
+        if self.max_rss is not None:
+            stdout.write(f'  最大常駐記憶體: {self.max_rss / 1024 / 1024:.1f} MB（整個行程）')
+        if self.peak_memory is not None:
+            stdout.write(f'  記憶體峰值: {self.peak_memory / 1024 / 1024:.1f} MB (tracemalloc)')
+        if self.profile_output:
+            stdout.write(f'  cProfile: {self.profile_output}（python -m pstats {self.profile_output}）')
+        stdout.write('')
@@ -1,8 +1,51 @@
+from django.db import models
 from rest_framework import serializers
+from .lunar import lunar_fields, lunar_fields_range
 from .models import CalendarDay, Holiday, WorkdayAdjustment
 
 
-class CalendarDaySerializer(serializers.ModelSerializer):
+class LunarListSerializer(serializers.ListSerializer):
+    """
+    要求農曆欄位時，先以整段日期範圍一次換算，再交給每一筆使用
+    日期分散在很長的範圍（例如跨多年的假日列表）時，逐筆換算反而較快
+    """
+
+    def to_representation(self, data):
+        if not self.child.context.get('lunar'):
+            return super().to_representation(data)
+
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        if items:
+            dates = [item.date for item in items]
+            start, end = min(dates), max(dates)
+            if (end - start).days < 4 * len(items):
+                self.child.lunar_range = (start, lunar_fields_range(start, end))
+        try:
+            return [self.child.to_representation(item) for item in items]
+        finally:
+            self.child.lunar_range = None
+
+
+class LunarFieldsMixin:
+    """
+    context 的 lunar 為 True 時（?lunar=true）在輸出加上農曆欄位：
+    lunar_year、lunar_month、lunar_day、lunar_leap（是否為閏月）、solar_term（節氣，非節氣日為 null）
+    """
+    lunar_range = None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.context.get('lunar'):
+            if self.lunar_range is not None:
+                start, fields = self.lunar_range
+                data.update(fields[(instance.date - start).days])
+            else:
+                data.update(lunar_fields(instance.date))
+        return data
+
+
+class CalendarDaySerializer(LunarFieldsMixin, serializers.ModelSerializer):
     """
     日曆日期序列化器
     """
@@ -25,6 +68,7 @@ class CalendarDaySerializer(serializers.ModelSerializer):
             'description',
         ]
         read_only_fields = ['year', 'month', 'day', 'weekday', 'is_weekend']
+        list_serializer_class = LunarListSerializer
     
     def get_weekday_display(self, obj):
         """返回星期的中文顯示"""
@@ -92,7 +136,7 @@ class WorkdayAdjustmentSerializer(serializers.ModelSerializer):
         return data
 
 
-class CalendarDayListSerializer(serializers.ModelSerializer):
+class CalendarDayListSerializer(LunarFieldsMixin, serializers.ModelSerializer):
     """
     日曆日期列表序列化器（簡化版，用於列表顯示）
     """
@@ -109,6 +153,7 @@ class CalendarDayListSerializer(serializers.ModelSerializer):
             'is_workday',
             'holiday_name',
         ]
+        list_serializer_class = LunarListSerializer
     
     def get_weekday_display(self, obj):
         """返回星期的中文顯示"""
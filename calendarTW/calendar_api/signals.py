@@ -0,0 +1,92 @@
+"""
+資料異動時的訊號處理
+日曆資料變更後只更新受影響日期的 CalendarDay 旗標、記憶體索引、月份摘要與快取，並遞增資料集版本（見 maintenance），
+確保查詢端點回應最新資料而不需要整個重建
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .maintenance import (
+    advance_to_version,
+    calendar_days_changed,
+    holidays_changed,
+    sync_calendar_days,
+    workdays_changed,
+)
+from .models import CalendarDay, Holiday, WorkdayAdjustment
+from .upsert import bulk_written, key_fields
+from .versioning import dataset_version_bumped
+
+
+@receiver(pre_save, sender=CalendarDay)
+@receiver(pre_save, sender=Holiday)
+@receiver(pre_save, sender=WorkdayAdjustment)
+def remember_previous_date(sender, instance, update_fields=None, **kwargs):
+    """
+    記下修改前的日期；日期被修改時，原本的日期也需要更新
+    從資料庫讀出的物件使用 from_db 記下的日期 (LoadedDateMixin)，只有自行指定主鍵建立的物件才查詢；
+    update_fields 不含日期時日期不會改變，不需要原本的日期
+    """
+    instance._previous_date = None
+    if instance.pk is None or (update_fields is not None and 'date' not in update_fields):
+        return
+    if hasattr(instance, '_loaded_date'):
+        instance._previous_date = instance._loaded_date
+    else:
+        instance._previous_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=CalendarDay)
+@receiver(post_save, sender=Holiday)
+@receiver(post_save, sender=WorkdayAdjustment)
+def remember_saved_date(sender, instance, update_fields=None, **kwargs):
+    """儲存後以寫入的日期作為下一次儲存時的原本日期"""
+    if update_fields is None or 'date' in update_fields:
+        instance._loaded_date = instance.date
+
+
+def _affected_dates(instance):
+    return {day for day in (instance.date, getattr(instance, '_previous_date', None)) if day is not None}
+
+
+@receiver(post_save, sender=CalendarDay)
+@receiver(post_delete, sender=CalendarDay)
+def calendar_day_changed(sender, instance, **kwargs):
+    """直接修改日期資料時，以寫入的內容為準，只更新衍生資料"""
+    calendar_days_changed(_affected_dates(instance))
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_save, sender=WorkdayAdjustment)
+@receiver(post_delete, sender=WorkdayAdjustment)
+def adjustment_changed(sender, instance, **kwargs):
+    """假日或補班日異動時重新推導受影響日期的 CalendarDay 旗標"""
+    dates = _affected_dates(instance)
+    if sender is Holiday:
+        holidays_changed(dates)
+    else:
+        workdays_changed(dates)
+    sync_calendar_days(dates)
+
+
+@receiver(bulk_written)
+def bulk_data_written(sender, keys, key, **kwargs):
+    """bulk_upsert / bulk_delete 的寫入；匯入指令會自行寫入 CalendarDay，不重新推導旗標"""
+    fields = key_fields(key)
+    if 'date' not in fields:
+        return
+    if len(fields) > 1:
+        position = fields.index('date')
+        keys = {values[position] for values in keys}
+    if sender is CalendarDay:
+        calendar_days_changed(keys)
+    elif sender is Holiday:
+        holidays_changed(keys)
+    elif sender is WorkdayAdjustment:
+        workdays_changed(keys)
+
+
+@receiver(dataset_version_bumped)
+def dataset_version_changed(sender, version, **kwargs):
+    advance_to_version(version)
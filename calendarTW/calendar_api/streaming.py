@@ -0,0 +1,170 @@
+"""
+NDJSON 串流輸出
+每行一筆 JSON，直接從資料庫游標逐批讀取並輸出，記憶體用量與第一個位元組的等待時間都不隨範圍長度增加
+
+ASGI 下 StreamingHttpResponse 遇到同步迭代器會先以 sync_to_async(list) 讀完整個內容才送出，
+因此 streaming_response 在 ASGI 請求改用 aiter_chunks，每次只在同步執行緒中產生下一批
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .default_days import exception_storage_enabled, fill_default_rows
+from .lunar import SOLAR_TERMS, from_solar_range, solar_terms_between
+from .models import CalendarDay
+
+STREAM_CHUNK_SIZE = 2000
+
+WEEKDAY_DISPLAY = ['週一', '週二', '週三', '週四', '週五', '週六', '週日']
+
+# 與 CalendarDaySerializer 的欄位順序相同
+CALENDAR_DAY_FIELDS = [
+    'id',
+    'date',
+    'year',
+    'month',
+    'day',
+    'weekday',
+    'is_weekend',
+    'is_holiday',
+    'is_workday',
+    'holiday_name',
+    'description',
+]
+
+
+_EXHAUSTED = object()
+
+
+async def aiter_chunks(chunks):
+    """
+    將同步的 bytes 產生器轉為非同步迭代器，每一批各以一次 sync_to_async 產生
+    thread_sensitive 讓所有批次在同一個執行緒中執行，資料庫游標與連線維持一致；
+    用戶端中途斷線時關閉原本的產生器
+    """
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(iterator, _EXHAUSTED)
+            if chunk is _EXHAUSTED:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def is_asgi_request(request):
+    """請求是否由 ASGI 處理（DRF 的 Request 會取出原本的 HttpRequest）"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def streaming_response(request, chunks, content_type):
+    """串流回應；ASGI 請求改用非同步迭代器，才能邊產生邊送出"""
+    if is_asgi_request(request):
+        chunks = aiter_chunks(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+def _dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_calendar_day_row(row):
+    """將 .values(*CALENDAR_DAY_FIELDS) 的一筆資料轉為與 CalendarDaySerializer 相同的 JSON bytes"""
+    return _dumps({
+        'id': row['id'],
+        'date': row['date'].isoformat(),
+        'year': row['year'],
+        'month': row['month'],
+        'day': row['day'],
+        'weekday': row['weekday'],
+        'weekday_display': WEEKDAY_DISPLAY[row['weekday']],
+        'is_weekend': row['is_weekend'],
+        'is_holiday': row['is_holiday'],
+        'is_workday': row['is_workday'],
+        'holiday_name': row['holiday_name'],
+        'description': row['description'],
+    })
+
+
+_TERM_JSON = {None: 'null', **{name: json.dumps(name, ensure_ascii=False) for name in SOLAR_TERMS}}
+
+
+def render_lunar_fields_range(start, end):
+    """
+    start～end（含）每一天的農曆欄位 JSON 片段（bytes，不含大括號），內容與 lunar.lunar_fields_range 相同
+    直接格式化字串，省去逐日建立 dict 與 JSON 編碼，供已序列化的資料（blob_cache、NDJSON）附加欄位
+    """
+    terms = solar_terms_between(start, end)
+    fragments = []
+    for offset, lunar_date in enumerate(from_solar_range(start, end)):
+        term = _TERM_JSON[terms.get(offset)]
+        if lunar_date is None:
+            fragment = f'"lunar_year":null,"lunar_month":null,"lunar_day":null,"lunar_leap":null,"solar_term":{term}'
+        else:
+            fragment = (
+                f'"lunar_year":{lunar_date.year},"lunar_month":{lunar_date.month},"lunar_day":{lunar_date.day},'
+                f'"lunar_leap":{"true" if lunar_date.is_leap else "false"},"solar_term":{term}'
+            )
+        fragments.append(fragment.encode('utf-8'))
+    return fragments
+
+
+def append_fields(row_json, fragment):
+    """在一筆 JSON 物件的 bytes 最後加上欄位片段"""
+    return row_json[:-1] + b',' + fragment + b'}'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """application/x-ndjson；列表每個元素一行，其他資料（例如錯誤訊息）輸出成單行"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            return b''.join(_dumps(item) + b'\n' for item in data)
+        return _dumps(data) + b'\n'
+
+
+def _render_rows(rows, lunar):
+    if not lunar:
+        return b''.join(render_calendar_day_row(row) + b'\n' for row in rows)
+    start = rows[0]['date']
+    fragments = render_lunar_fields_range(start, rows[-1]['date'])
+    return b''.join(
+        append_fields(render_calendar_day_row(row), fragments[(row['date'] - start).days]) + b'\n'
+        for row in rows
+    )
+
+
+def stream_calendar_days(start_date, end_date, chunk_size=STREAM_CHUNK_SIZE, lunar=False):
+    """
+    逐批輸出日期範圍內的 CalendarDay，每行內容與 CalendarDaySerializer 的輸出相同
+    使用 .values() 略過模型實例化，每次只保留一批資料在記憶體中；lunar=True 時每批一次換算農曆欄位
+    例外日儲存模式下邊讀取邊補上未儲存的一般日
+    """
+    rows = CalendarDay.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+    ).order_by('date').values(*CALENDAR_DAY_FIELDS).iterator(chunk_size=chunk_size)
+    if exception_storage_enabled():
+        rows = fill_default_rows(rows, start_date, end_date)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield _render_rows(batch, lunar)
+            batch = []
+    if batch:
+        yield _render_rows(batch, lunar)
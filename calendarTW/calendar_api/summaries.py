@@ -0,0 +1,165 @@
+"""
+月份統計摘要
+以單一條件彙總查詢計算每月的天數統計，並維護 MonthSummary 摘要表
+摘要表只在寫入路徑更新（maintenance.calendar_days_changed 與 0004 資料遷移），讀取時不寫入資料庫；
+CALENDAR_MONTH_SUMMARY_TABLE 只控制讀取端是否使用摘要表，寫入路徑一律維護，重新啟用時不會讀到過時的摘要
+"""
+from calendar import monthrange
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .default_days import exception_storage_enabled
+from .models import CalendarDay, MonthSummary
+
+SUMMARY_FIELDS = ['total_days', 'weekends', 'holidays', 'workday_adjustments']
+
+# refresh_month_summaries 每次彙總查詢涵蓋的年份數
+REFRESH_BATCH_YEARS = 100
+
+
+def summary_table_enabled():
+    """是否使用 MonthSummary 摘要表回應統計端點（只影響讀取）"""
+    return getattr(settings, 'CALENDAR_MONTH_SUMMARY_TABLE', True)
+
+
+def aggregate_months(year, month=None):
+    """
+    以一次條件彙總查詢計算指定年份（或月份）的統計
+    回傳 {month: MonthSummary}（未儲存），沒有資料的月份不會出現（例外日儲存模式下每個月份都有）
+    """
+    return _summaries_from_rows(year, month, _aggregate_queryset(year, month))
+
+
+def _aggregate_queryset(year, month=None):
+    queryset = CalendarDay.objects.filter(year=year)
+    if month is not None:
+        queryset = queryset.filter(month=month)
+    return _annotate(queryset, 'month')
+
+
+def _annotate(queryset, *group_by):
+    if exception_storage_enabled():
+        # 只需統計與一般日不同的部分，其餘由星期推算
+        return queryset.values(*group_by).annotate(
+            weekday_holidays=Count('id', filter=Q(is_holiday=True, is_weekend=False)),
+            weekend_non_holidays=Count('id', filter=Q(is_holiday=False, is_weekend=True)),
+            workday_adjustments=Count('id', filter=Q(is_workday=True)),
+        ).order_by()
+
+    return queryset.values(*group_by).annotate(
+        total_days=Count('id'),
+        weekends=Count('id', filter=Q(is_weekend=True)),
+        holidays=Count('id', filter=Q(is_holiday=True)),
+        workday_adjustments=Count('id', filter=Q(is_workday=True)),
+    ).order_by()
+
+
+def _summaries_from_rows(year, month, rows):
+    if not exception_storage_enabled():
+        return {row['month']: MonthSummary(year=year, **row) for row in rows}
+
+    stored = {row['month']: row for row in rows}
+    return {
+        number: _summary_with_defaults(year, number, stored.get(number))
+        for number in ([month] if month is not None else range(1, 13))
+    }
+
+
+def _summary_with_defaults(year, month, row):
+    """例外日儲存模式：以整個月份的天數與週末數，加上已儲存例外日的差異計算統計"""
+    total_days = monthrange(year, month)[1]
+    weekends = sum(1 for day in range(1, total_days + 1) if date(year, month, day).weekday() >= 5)
+    row = row or {}
+    return MonthSummary(
+        year=year,
+        month=month,
+        total_days=total_days,
+        weekends=weekends,
+        holidays=weekends + row.get('weekday_holidays', 0) - row.get('weekend_non_holidays', 0),
+        workday_adjustments=row.get('workday_adjustments', 0),
+    )
+
+
+def refresh_month_summaries(months):
+    """
+    重新計算指定月份的摘要並寫入 MonthSummary
+    months 為 (year, month) 的集合；每批年份以一次彙總查詢計算，再以一次 upsert 寫入
+    不論 CALENDAR_MONTH_SUMMARY_TABLE 是否啟用都會更新，停用期間的寫入在重新啟用後仍反映在摘要表中
+    """
+    by_year = {}
+    for year, month in months:
+        by_year.setdefault(year, set()).add(month)
+
+    years = sorted(by_year)
+    with transaction.atomic():
+        for start in range(0, len(years), REFRESH_BATCH_YEARS):
+            batch = years[start:start + REFRESH_BATCH_YEARS]
+            rows_by_year = {}
+            for row in _annotate(CalendarDay.objects.filter(year__in=batch), 'year', 'month'):
+                rows_by_year.setdefault(row.pop('year'), []).append(row)
+
+            summaries = []
+            empty = Q()
+            for year in batch:
+                computed = _summaries_from_rows(year, None, rows_by_year.get(year, []))
+                summaries.extend(computed[month] for month in sorted(by_year[year]) if month in computed)
+                missing = [month for month in by_year[year] if month not in computed]
+                if missing:
+                    empty |= Q(year=year, month__in=missing)
+
+            # 已沒有資料的月份移除摘要
+            if empty:
+                MonthSummary.objects.filter(empty).delete()
+            MonthSummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['year', 'month'],
+                update_fields=SUMMARY_FIELDS,
+            )
+
+
+def get_month_summaries(year, months):
+    """
+    取得指定年份各月份的統計，回傳 {month: MonthSummary}
+    優先讀取摘要表；缺少的月份以一次彙總查詢在記憶體中計算（不寫回摘要表）
+    """
+    months = list(months)
+    summaries = {}
+    if summary_table_enabled():
+        summaries = {
+            summary.month: summary
+            for summary in MonthSummary.objects.filter(year=year, month__in=months)
+        }
+    missing = [month for month in months if month not in summaries]
+    if missing:
+        computed = aggregate_months(year, missing[0] if len(missing) == 1 else None)
+        for month in missing:
+            summaries[month] = computed.get(month, MonthSummary(year=year, month=month))
+    return summaries
+
+
+async def aget_month_summary(year, month):
+    """get_month_summaries 單一月份的非同步版本"""
+    if summary_table_enabled():
+        summary = await MonthSummary.objects.filter(year=year, month=month).afirst()
+        if summary is not None:
+            return summary
+
+    rows = [row async for row in _aggregate_queryset(year, month)]
+    return _summaries_from_rows(year, month, rows).get(month) or MonthSummary(year=year, month=month)
+
+
+def summary_to_dict(summary):
+    """轉換為 month-summary 端點的回應格式"""
+    return {
+        'year': int(summary.year),
+        'month': int(summary.month),
+        'total_days': summary.total_days,
+        'weekends': summary.weekends,
+        'holidays': summary.holidays,
+        'workday_adjustments': summary.workday_adjustments,
+        'actual_workdays': summary.actual_workdays,
+    }
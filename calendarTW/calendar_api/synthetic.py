@@ -0,0 +1,124 @@
+"""
+合成日曆資料產生器（效能測試用）
+以固定的亂數種子產生任意年份範圍、格式與政府行政機關辦公日曆表相同的資料列，
+包含週末、國定假日、農曆假日（春節、端午、中秋）、補假，以及調整放假日與補行上班日的配對
+
+國定假日與補假由 holiday_rules 依現行規則推算（農曆日期以 lunar 模組換算），年份範圍同 holiday_rules；
+只有行政院每年公告、沒有固定規則的調整放假日與補行上班日以亂數產生
+"""
+import csv
+import random
+from datetime import date, timedelta
+
+from . import holiday_rules, lunar
+
+GOV_CSV_FIELDS = ['date', 'year', 'name', 'isholiday', 'holidaycategory', 'description']
+
+# 兩個國定假日之間只隔一個上班日時，該日調整放假的機率
+BRIDGE_PROBABILITY = 0.8
+
+CATEGORY_NATIONAL = '放假之紀念日及節日'
+CATEGORY_COMPENSATORY = '補假'
+CATEGORY_ADJUSTED = '調整放假日'
+CATEGORY_MAKEUP_WORKDAY = '補行上班日'
+CATEGORY_WEEKEND = '星期六、星期日'
+
+# holiday_rules 的假日類型對應到政府日曆的類別
+HOLIDAY_CATEGORIES = {
+    'national': CATEGORY_NATIONAL,
+    'flexible': CATEGORY_COMPENSATORY,
+}
+
+
+def generate_year(year, rng):
+    """
+    產生一整年的政府日曆資料列（dict，欄位同 GOV_CSV_FIELDS）
+
+    - 國定假日與補假：holiday_rules.generate_holidays
+    - 國定假日與週末之間只隔一天上班日時，以 BRIDGE_PROBABILITY 的機率調整放假，
+      並在前後三週內挑一個週六補行上班
+    """
+    # date -> (名稱, 類別, 說明)
+    holidays = {
+        occurrence.date: (
+            occurrence.name, HOLIDAY_CATEGORIES[occurrence.holiday_type], occurrence.description,
+        )
+        for occurrence in holiday_rules.generate_holidays(year, year)
+    }
+
+    # 調整放假：週二放假則週一調整放假，週四放假則週五調整放假
+    makeup_workdays = {}
+    for value, (name, _, _) in sorted(holidays.items()):
+        if value.weekday() == 1:
+            bridge = value - timedelta(days=1)
+        elif value.weekday() == 3:
+            bridge = value + timedelta(days=1)
+        else:
+            continue
+        if bridge.year != year or bridge in holidays or rng.random() >= BRIDGE_PROBABILITY:
+            continue
+
+        saturdays = [
+            saturday
+            for weeks in (-3, -2, -1, 1, 2, 3)
+            for saturday in [bridge + timedelta(days=5 - bridge.weekday() + 7 * weeks)]
+            if saturday.year == year and saturday not in holidays and saturday not in makeup_workdays
+        ]
+        if not saturdays:
+            continue
+        saturday = rng.choice(saturdays)
+        holidays[bridge] = ('調整放假', CATEGORY_ADJUSTED, f'{name}調整放假，於{saturday.month}月{saturday.day}日補行上班')
+        makeup_workdays[saturday] = f'補行{bridge.month}月{bridge.day}日上班'
+
+    rows = []
+    current = date(year, 1, 1)
+    while current.year == year:
+        if current in makeup_workdays:
+            name, category, description, is_holiday = '', CATEGORY_MAKEUP_WORKDAY, makeup_workdays[current], False
+        elif current in holidays:
+            name, category, description = holidays[current]
+            is_holiday = True
+        elif current.weekday() >= 5:
+            name, category, description, is_holiday = '', CATEGORY_WEEKEND, '', True
+        else:
+            name, category, description, is_holiday = '', '', '', False
+        rows.append({
+            'date': current.strftime('%Y%m%d'),
+            'year': str(year),
+            'name': name,
+            'isholiday': '是' if is_holiday else '否',
+            'holidaycategory': category,
+            'description': description,
+        })
+        current += timedelta(days=1)
+    return rows
+
+
+def generate_gov_rows(start_year, years, seed=0):
+    """
+    回傳依序產生 start_year 起 years 年資料列的產生器；相同的參數與種子一定產生相同的資料
+    年份超出 holiday_rules 可推算的範圍時立即拋出 LunarDateError（在寫入任何資料之前）
+    """
+    end_year = start_year + years - 1
+    if years < 1 or start_year < holiday_rules.MIN_YEAR or end_year > holiday_rules.MAX_YEAR:
+        raise lunar.LunarDateError(
+            f'年份需介於 {holiday_rules.MIN_YEAR} 與 {holiday_rules.MAX_YEAR} 之間: {start_year}～{end_year}'
+        )
+    return _generate_rows(start_year, end_year, random.Random(seed))
+
+
+def _generate_rows(start_year, end_year, rng):
+    for year in range(start_year, end_year + 1):
+        yield from generate_year(year, rng)
+
+
+def write_gov_csv(path, rows):
+    """將資料列寫成政府日曆格式的 CSV（UTF-8 BOM），回傳寫入的資料列數"""
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=GOV_CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
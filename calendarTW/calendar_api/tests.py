@@ -0,0 +1,1398 @@
+import codecs
+import csv
+import importlib
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.throttling import BaseThrottle
+
+from . import holiday_rules, ics, index, ingest, lunar, metrics, profiling, streaming, synthetic, views
+from .blob_cache import BlobCache, blob_cache, get_month_days
+from .compact import COMPACT_ENCODINGS, compact_range, decode_compact, decode_runs
+from .default_days import fill_default_days, is_default, is_default_day
+from .index import CalendarIndex, invalidate_calendar_index
+from .management.commands import import_gov_calendar
+from .models import CalendarDay, Holiday, MonthSummary, WorkdayAdjustment
+from .profiling import ImportProfiler
+from .serializers import CalendarDaySerializer
+from .upsert import HOLIDAY_KEY, bulk_delete, bulk_upsert
+from .versioning import bump_dataset_version, dataset_version_bumped, get_dataset_version
+from .workdays import WorkdayRangeError, add_workdays, count_workdays
+
+
+def create_days(start, end, holidays=None):
+    """建立 start～end（含）每一天的 CalendarDay；holidays 為 {日期: 假日名稱}"""
+    holidays = holidays or {}
+    days = []
+    current = start
+    while current <= end:
+        name = holidays.get(current)
+        days.append(CalendarDay.from_date(
+            current,
+            is_holiday=name is not None or current.weekday() >= 5,
+            is_workday=False,
+            holiday_name=name,
+            description=None,
+        ))
+        current += timedelta(days=1)
+    CalendarDay.objects.bulk_create(days)
+
+
+class NDJSONStreamingTests(TestCase):
+    """ASGI 下 format=ndjson 必須邊查詢邊送出，而不是先讀完整個查詢結果"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 3 個批次：2000 + 2000 + 其餘
+        create_days(date(2000, 1, 1), date(2000, 1, 1) + timedelta(days=4499))
+
+    async def test_first_chunk_arrives_before_queryset_is_consumed(self):
+        with mock.patch.object(streaming, '_render_rows', wraps=streaming._render_rows) as render:
+            response = await self.async_client.get(
+                '/api/calendar/range/',
+                {'start_date': '2000-01-01', 'end_date': '2012-12-31', 'format': 'ndjson'},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+
+            chunks = aiter(response.streaming_content)
+            first = await anext(chunks)
+            # 只產生了第一批，其餘資料還沒有從資料庫讀出
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(first.count(b'\n'), streaming.STREAM_CHUNK_SIZE)
+
+            rest = [chunk async for chunk in chunks]
+        self.assertEqual(render.call_count, 3)
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in [first, *rest]), 4500)
+
+    def test_wsgi_keeps_sync_iterator(self):
+        response = self.client.get(
+            '/api/calendar/range/',
+            {'start_date': '2000-01-01', 'end_date': '2000-01-31', 'format': 'ndjson'},
+        )
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 31)
+
+
+class ICalendarFeedStreamingTests(TestCase):
+    """ASGI 下 feed.ics 逐筆事件輸出，完整輸出後才寫入快取"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Holiday.objects.bulk_create([
+            Holiday(date=date(year, 10, 10), year=year, name='國慶日', holiday_type='national')
+            for year in range(1950, 2050)
+        ])
+
+    def setUp(self):
+        blob_cache.clear()
+
+    async def test_feed_streams_before_events_are_read(self):
+        with mock.patch.object(ics, '_event', wraps=ics._event) as event:
+            response = await self.async_client.get('/api/calendar/feed.ics', {'type': 'national'})
+            self.assertTrue(response.is_async)
+
+            chunks = aiter(response.streaming_content)
+            first = await anext(chunks)
+            self.assertEqual(first, ics.CALENDAR_HEADER)
+            self.assertLessEqual(event.call_count, 1)
+            self.assertIsNone(await sync_to_async(ics.cached_feed)(1, 9999, ['national']))
+
+            body = first + b''.join([chunk async for chunk in chunks])
+        self.assertEqual(event.call_count, 100)
+        self.assertEqual(body.count(b'BEGIN:VEVENT'), 100)
+        self.assertEqual(await sync_to_async(ics.cached_feed)(1, 9999, ['national']), body)
+
+    def test_wsgi_body_matches_cached_feed(self):
+        response = self.client.get('/api/calendar/feed.ics', {'type': 'national'})
+        self.assertFalse(response.is_async)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(body.count(b'BEGIN:VEVENT'), 100)
+        # 第二次請求直接回應快取內容，與串流輸出相同
+        cached = self.client.get('/api/calendar/feed.ics', {'type': 'national'})
+        self.assertEqual(cached.content, body)
+
+
+class CompactRoundTripTests(TestCase):
+    """精簡表示解碼後必須與 CalendarDaySerializer 的輸出相同"""
+
+    FIELDS = ('date', 'is_holiday', 'is_workday', 'is_weekend', 'holiday_name')
+
+    @classmethod
+    def setUpTestData(cls):
+        create_days(date(2026, 1, 1), date(2026, 3, 31), holidays={
+            date(2026, 1, 1): '中華民國開國紀念日',
+            date(2026, 2, 16): '農曆除夕',
+            date(2026, 2, 17): '春節',
+            date(2026, 2, 21): '春節',
+        })
+        # 週六補班，以及一天沒有資料的日期
+        CalendarDay.objects.filter(date=date(2026, 1, 31)).update(is_holiday=False, is_workday=True)
+        CalendarDay.objects.filter(date=date(2026, 3, 15)).delete()
+
+    def setUp(self):
+        invalidate_calendar_index()
+
+    def expected(self):
+        queryset = CalendarDay.objects.filter(
+            date__range=(date(2026, 1, 1), date(2026, 3, 31)),
+        ).order_by('date')
+        return [
+            {field: row[field] for field in self.FIELDS}
+            for row in CalendarDaySerializer(queryset, many=True).data
+        ]
+
+    def assert_round_trip(self):
+        expected = self.expected()
+        for encoding in COMPACT_ENCODINGS:
+            with self.subTest(encoding=encoding):
+                payload = compact_range(date(2026, 1, 1), date(2026, 3, 31), encoding)
+                self.assertNotIn('weekend', payload)
+                self.assertIn('missing', payload)
+                self.assertEqual(decode_compact(payload), expected)
+
+    def test_round_trip_with_index(self):
+        self.assert_round_trip()
+
+    @override_settings(CALENDAR_INDEX_ENABLED=False)
+    def test_round_trip_without_index(self):
+        self.assert_round_trip()
+
+    def test_holiday_diff_only_marks_exceptions_to_weekends(self):
+        payload = compact_range(date(2026, 1, 1), date(2026, 3, 31), 'rle')
+        # 1/1、2/16、2/17 平日放假，1/31 週六補班；2/21 是週六，與週末相同不另外標示
+        diff = decode_runs(payload['holiday_diff'], payload['days'])
+        self.assertEqual([offset for offset, bit in enumerate(diff) if bit], [0, 30, 46, 47])
+
+
+class WorkdayCalculationTests(TestCase):
+    """以 2024 年 2 月（春節 2/8～2/14 連假、2/17 週六補班）驗證上班日的推算與計數"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_days(date(2024, 2, 1), date(2024, 2, 29), holidays={
+            date(2024, 2, 1) + timedelta(days=offset): '春節' for offset in range(7, 14)
+        })
+        CalendarDay.objects.filter(date=date(2024, 2, 17)).update(
+            is_holiday=False, is_workday=True, description='補行上班'
+        )
+
+    def setUp(self):
+        self.index = CalendarIndex.build()
+
+    def test_count_workdays(self):
+        self.assertEqual(count_workdays(date(2024, 2, 1), date(2024, 2, 29), self.index), 17)
+        # 連假期間沒有上班日，補班的週六計入
+        self.assertEqual(count_workdays(date(2024, 2, 8), date(2024, 2, 14), self.index), 0)
+        self.assertEqual(count_workdays(date(2024, 2, 15), date(2024, 2, 18), self.index), 3)
+        self.assertEqual(count_workdays(date(2024, 2, 15), date(2024, 2, 15), self.index), 1)
+        self.assertEqual(count_workdays(date(2024, 2, 20), date(2024, 2, 19), self.index), 0)
+
+    def test_add_workdays_forward(self):
+        self.assertEqual(add_workdays(date(2024, 2, 7), 1, self.index), date(2024, 2, 15))
+        self.assertEqual(add_workdays(date(2024, 2, 16), 1, self.index), date(2024, 2, 17))
+        self.assertEqual(add_workdays(date(2024, 2, 17), 1, self.index), date(2024, 2, 19))
+        # 起始日為假日時從下一個上班日起算
+        self.assertEqual(add_workdays(date(2024, 2, 10), 2, self.index), date(2024, 2, 16))
+
+    def test_add_workdays_backward(self):
+        self.assertEqual(add_workdays(date(2024, 2, 15), -1, self.index), date(2024, 2, 7))
+        self.assertEqual(add_workdays(date(2024, 2, 19), -1, self.index), date(2024, 2, 17))
+        self.assertEqual(add_workdays(date(2024, 2, 11), -2, self.index), date(2024, 2, 6))
+
+    def test_zero_days_returns_start_date(self):
+        self.assertEqual(add_workdays(date(2024, 2, 10), 0, self.index), date(2024, 2, 10))
+        self.assertEqual(add_workdays(date(2024, 2, 15), 0, self.index), date(2024, 2, 15))
+
+    def test_round_trip_matches_count(self):
+        start = date(2024, 2, 2)
+        for days in range(1, 15):
+            result = add_workdays(start, days, self.index)
+            self.assertEqual(count_workdays(start + timedelta(days=1), result, self.index), days)
+            self.assertEqual(add_workdays(result, -days, self.index), start)
+
+    def test_out_of_range(self):
+        with self.assertRaises(WorkdayRangeError):
+            add_workdays(date(2024, 2, 28), 2, self.index)
+        with self.assertRaises(WorkdayRangeError):
+            add_workdays(date(2024, 2, 2), -2, self.index)
+        with self.assertRaises(WorkdayRangeError):
+            add_workdays(date(2024, 3, 1), 0, self.index)
+        with self.assertRaises(WorkdayRangeError):
+            count_workdays(date(2024, 1, 31), date(2024, 2, 5), self.index)
+        with self.assertRaises(WorkdayRangeError):
+            count_workdays(date(2024, 2, 1), date(2024, 3, 1), self.index)
+
+    def test_empty_calendar(self):
+        CalendarDay.objects.all().delete()
+        with self.assertRaises(WorkdayRangeError):
+            add_workdays(date(2024, 2, 1), 1, CalendarIndex.build())
+
+    def test_api_out_of_range_returns_404(self):
+        invalidate_calendar_index()
+        response = self.client.get('/api/calendar/add-workdays/', {'date': '2024-02-28', 'days': 5})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/calendar/add-workdays/', {'date': '2024-02-16', 'days': -1})
+        self.assertEqual(response.json()['result'], '2024-02-15')
+        response = self.client.get(
+            '/api/calendar/count-workdays/', {'start_date': '2024-02-29', 'end_date': '2024-02-01'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+class CSVIngestTests(SimpleTestCase):
+    """ingest 的編碼偵測、串流讀取與分批"""
+
+    def write(self, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'data.csv')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def read(self, path, **kwargs):
+        with ingest.open_csv(path, **kwargs) as (f, encoding):
+            return list(csv.reader(f)), encoding
+
+    def test_detect_encoding(self):
+        text = '日期,名稱\n2026-09-25,孔子誕辰紀念日\n'
+        self.assertEqual(ingest.detect_encoding(codecs.BOM_UTF8 + text.encode('utf-8')), 'utf-8-sig')
+        self.assertEqual(ingest.detect_encoding(text.encode('utf-8')), 'utf-8')
+        self.assertEqual(ingest.detect_encoding(text.encode('big5')), 'big5')
+        # 碁、€ 只有 cp950 有，Big5 無法解碼
+        self.assertEqual(ingest.detect_encoding('碁 €'.encode('cp950')), 'cp950')
+        # 樣本尾端截斷的多位元組字元仍視為 UTF-8
+        self.assertEqual(ingest.detect_encoding(text.encode('utf-8')[:4]), 'utf-8')
+        self.assertIsNone(ingest.detect_encoding(b'\xff\xfe\x00'))
+
+    def test_open_csv_decodes_cp950(self):
+        path = self.write('日期,名稱\r\n2026-01-01,碁聖紀念日\r\n'.encode('cp950'))
+        rows, encoding = self.read(path)
+        self.assertEqual(encoding, 'cp950')
+        self.assertEqual(rows, [['日期', '名稱'], ['2026-01-01', '碁聖紀念日']])
+
+    def test_open_csv_strips_bom(self):
+        path = self.write(codecs.BOM_UTF8 + '日期,名稱\n2026-01-01,開國紀念日\n'.encode('utf-8'))
+        for encoding in (None, 'utf-8', 'UTF8'):
+            rows, used = self.read(path, encoding=encoding)
+            self.assertEqual(used, 'utf-8-sig')
+            self.assertEqual(rows[0], ['日期', '名稱'])
+
+    def test_undetectable_encoding(self):
+        path = self.write(b'\xff\xfe\x00\x81')
+        with self.assertRaises(ingest.EncodingDetectionError):
+            self.read(path)
+
+    def test_file_larger_than_sample(self):
+        # 樣本只有 7 個位元組，多位元組字元跨越樣本邊界，其餘內容仍需完整讀取
+        lines = [['日期', '名稱']] + [[f'2026-01-{day:02d}', f'第{day}天'] for day in range(1, 32)]
+        content = ''.join(','.join(line) + '\n' for line in lines)
+        for encoding in ('utf-8', 'cp950'):
+            rows, used = self.read(self.write(content.encode(encoding)), sample_size=7)
+            self.assertEqual(used, encoding if encoding == 'utf-8' else 'big5')
+            self.assertEqual(rows, lines)
+
+    def test_chunked(self):
+        self.assertEqual(list(ingest.chunked(iter(range(7)), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(ingest.chunked(range(6), 3)), [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(list(ingest.chunked([], 3)), [])
+
+        # 逐批取用時不會預先讀完整個產生器
+        consumed = []
+
+        def rows():
+            for value in range(10):
+                consumed.append(value)
+                yield value
+
+        chunks = ingest.chunked(rows(), 4)
+        self.assertEqual(next(chunks), [0, 1, 2, 3])
+        self.assertEqual(consumed, [0, 1, 2, 3])
+
+class HolidayRuleTests(SimpleTestCase):
+    """holiday_rules 推算的放假日與行政院人事行政總處公告的日曆一致（不含每年公告的調整放假日）"""
+
+    def holidays(self, year):
+        return [
+            (occurrence.date.strftime('%m-%d'), occurrence.name)
+            for occurrence in holiday_rules.generate_holidays(year, year)
+        ]
+
+    def test_2024(self):
+        # 兒童節與民族掃墓節同為 4/4 星期四，兒童節於後一日放假
+        self.assertEqual(self.holidays(2024), [
+            ('01-01', '中華民國開國紀念日'),
+            ('02-09', '農曆除夕'), ('02-10', '春節'), ('02-11', '春節'), ('02-12', '春節'),
+            ('02-13', '春節補假'), ('02-14', '春節補假'),
+            ('02-28', '和平紀念日'),
+            ('04-04', '民族掃墓節'), ('04-05', '兒童節'),
+            ('06-10', '端午節'),
+            ('09-17', '中秋節'),
+            ('10-10', '國慶日'),
+        ])
+
+    def test_2025(self):
+        # 兒童節與民族掃墓節同為 4/4 星期五，兒童節於前一日放假；勞動節、孔子誕辰等 2025 年起放假
+        self.assertEqual(self.holidays(2025), [
+            ('01-01', '中華民國開國紀念日'),
+            ('01-28', '農曆除夕'), ('01-29', '春節'), ('01-30', '春節'), ('01-31', '春節'),
+            ('02-28', '和平紀念日'),
+            ('04-03', '兒童節'), ('04-04', '民族掃墓節'),
+            ('05-01', '勞動節'),
+            ('05-30', '端午節補假'), ('05-31', '端午節'),
+            ('09-28', '孔子誕辰紀念日'), ('09-29', '孔子誕辰紀念日補假'),
+            ('10-06', '中秋節'),
+            ('10-10', '國慶日'),
+            ('10-24', '臺灣光復暨金門古寧頭大捷紀念日補假'), ('10-25', '臺灣光復暨金門古寧頭大捷紀念日'),
+            ('12-25', '行憲紀念日'),
+        ])
+
+    def test_2026(self):
+        # 2026 年起農曆除夕前一日放假；逢星期六於前一個上班日、逢星期日於次一個上班日補假
+        self.assertEqual(self.holidays(2026), [
+            ('01-01', '中華民國開國紀念日'),
+            ('02-15', '農曆除夕前一日'), ('02-16', '農曆除夕'),
+            ('02-17', '春節'), ('02-18', '春節'), ('02-19', '春節'),
+            ('02-20', '農曆除夕前一日補假'),
+            ('02-27', '和平紀念日補假'), ('02-28', '和平紀念日'),
+            ('04-03', '兒童節補假'), ('04-04', '兒童節'), ('04-05', '民族掃墓節'), ('04-06', '民族掃墓節補假'),
+            ('05-01', '勞動節'),
+            ('06-19', '端午節'),
+            ('09-25', '中秋節'),
+            ('09-28', '孔子誕辰紀念日'),
+            ('10-09', '國慶日補假'), ('10-10', '國慶日'),
+            ('10-25', '臺灣光復暨金門古寧頭大捷紀念日'), ('10-26', '臺灣光復暨金門古寧頭大捷紀念日補假'),
+            ('12-25', '行憲紀念日'),
+        ])
+
+    def test_substitute_day_in_previous_year(self):
+        # 2022/1/1 逢星期六，於 2021/12/31 補假
+        self.assertIn(('12-31', '中華民國開國紀念日補假'), self.holidays(2021))
+        self.assertNotIn('中華民國開國紀念日補假', [name for _, name in self.holidays(2022)])
+        occurrence = holiday_rules.generate_holidays(2021, 2021)[-1]
+        self.assertEqual(
+            (occurrence.holiday_type, occurrence.is_lunar, occurrence.description),
+            ('flexible', False, '中華民國開國紀念日逢星期六補假'),
+        )
+
+    def test_holidays_before_2001(self):
+        names = {name for _, name in self.holidays(1995)}
+        self.assertTrue({'青年節', '蔣公誕辰紀念日', '國父誕辰紀念日', '臺灣光復節'} <= names)
+        self.assertNotIn('和平紀念日', names)
+        self.assertNotIn('勞動節', names)
+
+    def test_qingming(self):
+        self.assertEqual(
+            [holiday_rules.qingming(year) for year in (2008, 2024, 2025, 2026)],
+            [date(2008, 4, 4), date(2024, 4, 4), date(2025, 4, 4), date(2026, 4, 5)],
+        )
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            holiday_rules.generate_holidays(2026, 2025)
+        with self.assertRaises(lunar.LunarDateError):
+            holiday_rules.generate_holidays(holiday_rules.MIN_YEAR - 1, 2000)
+        with self.assertRaises(lunar.LunarDateError):
+            holiday_rules.generate_holidays(2000, holiday_rules.MAX_YEAR + 1)
+
+    def test_day_flags(self):
+        flags = {day.date: day for day in holiday_rules.generate_day_flags(2026, 2026)}
+        self.assertEqual(len(flags), 365)
+        self.assertEqual(flags[date(2026, 2, 20)], holiday_rules.DayFlags(
+            date(2026, 2, 20), True, '農曆除夕前一日補假', '農曆除夕前一日逢星期日補假'
+        ))
+        self.assertEqual(flags[date(2026, 2, 21)], holiday_rules.DayFlags(date(2026, 2, 21), True, None, None))
+        self.assertEqual(flags[date(2026, 2, 23)], holiday_rules.DayFlags(date(2026, 2, 23), False, None, None))
+
+class LunarConversionTests(SimpleTestCase):
+    """西元與農曆日期互換（含閏月）及節氣"""
+
+    KNOWN = [
+        (date(1900, 1, 31), (1900, 1, 1, False)),
+        (date(2020, 5, 23), (2020, 4, 1, True)),
+        (date(2023, 3, 21), (2023, 2, 30, False)),
+        (date(2023, 3, 22), (2023, 2, 1, True)),
+        (date(2023, 4, 20), (2023, 3, 1, False)),
+        (date(2024, 9, 17), (2024, 8, 15, False)),
+        (date(2025, 7, 25), (2025, 6, 1, True)),
+        (date(2026, 2, 16), (2025, 12, 29, False)),
+        (date(2026, 2, 17), (2026, 1, 1, False)),
+        (date(2033, 12, 22), (2033, 11, 1, True)),
+    ]
+
+    def test_known_conversions(self):
+        for day, (year, month, lunar_day, leap) in self.KNOWN:
+            self.assertEqual(tuple(lunar.from_solar(day)), (year, month, lunar_day, leap), day)
+            self.assertEqual(lunar.to_solar(year, month, lunar_day, leap=leap), day)
+
+    def test_leap_months(self):
+        self.assertEqual([lunar.leap_month(year) for year in (2020, 2023, 2024, 2025, 2033)], [4, 2, 0, 6, 11])
+        self.assertEqual(lunar.month_days(2023, 2, leap=True), 29)
+        self.assertEqual(len(lunar.months(2023)), 13)
+        self.assertEqual(lunar.year_days(2023), 384)
+        with self.assertRaises(lunar.LunarDateError):
+            lunar.to_solar(2024, 2, 1, leap=True)
+        with self.assertRaises(lunar.LunarDateError):
+            lunar.to_solar(2023, 2, 30, leap=True)
+
+    def test_new_year_and_eve(self):
+        self.assertEqual(lunar.lunar_new_year(2026), date(2026, 2, 17))
+        self.assertEqual(lunar.lunar_new_years_eve(2025), date(2026, 2, 16))
+
+    def test_range_matches_single_day(self):
+        # 跨越閏二月與農曆年的範圍，逐月展開的結果與逐日換算相同
+        start, end = date(2022, 12, 1), date(2024, 3, 1)
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        self.assertEqual(lunar.from_solar_range(start, end), [lunar.from_solar(day) for day in days])
+        self.assertEqual(lunar.lunar_fields_range(start, end), [lunar.lunar_fields(day) for day in days])
+
+    def test_out_of_table_range(self):
+        with self.assertRaises(lunar.LunarDateError):
+            lunar.from_solar(lunar.MIN_DATE - timedelta(days=1))
+        with self.assertRaises(lunar.LunarDateError):
+            lunar.from_solar(lunar.MAX_DATE + timedelta(days=1))
+        fields = lunar.from_solar_range(lunar.MIN_DATE - timedelta(days=2), lunar.MIN_DATE)
+        self.assertEqual(fields[:2], [None, None])
+        self.assertEqual(tuple(fields[2]), (1900, 1, 1, False))
+        self.assertIsNone(lunar.lunar_fields(date(1900, 1, 30))['lunar_year'])
+
+    def test_solar_terms(self):
+        self.assertEqual(lunar.solar_term_date(2024, '立春'), date(2024, 2, 4))
+        self.assertEqual(lunar.solar_term_date(2024, '冬至'), date(2024, 12, 21))
+        self.assertEqual(lunar.solar_term(date(2025, 6, 21)), '夏至')
+        self.assertIsNone(lunar.solar_term(date(2025, 6, 22)))
+        self.assertEqual(len(lunar.solar_terms(2025)), 24)
+
+
+class LunarSerializerTests(TestCase):
+    """?lunar=true 時日曆資料加上農曆欄位，列表與單筆的結果相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_days(date(2023, 3, 1), date(2023, 4, 30))
+
+    def setUp(self):
+        invalidate_calendar_index()
+
+    def test_detail_fields(self):
+        response = self.client.get('/api/calendar-days/by-date/2023-03-22/', {'lunar': 'true'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            {field: data[field] for field in lunar.LUNAR_FIELDS},
+            {'lunar_year': 2023, 'lunar_month': 2, 'lunar_day': 1, 'lunar_leap': True, 'solar_term': None},
+        )
+
+        data = self.client.get('/api/calendar-days/by-date/2023-03-21/', {'lunar': 'true'}).json()
+        self.assertEqual((data['lunar_month'], data['lunar_day'], data['lunar_leap']), (2, 30, False))
+        self.assertEqual(data['solar_term'], '春分')
+
+    def test_fields_only_when_requested(self):
+        data = self.client.get('/api/calendar-days/by-date/2023-03-22/').json()
+        self.assertFalse(set(lunar.LUNAR_FIELDS) & set(data))
+
+    def test_list_matches_single_day(self):
+        queryset = CalendarDay.objects.order_by('date')
+        rows = CalendarDaySerializer(queryset, many=True, context={'lunar': True}).data
+        self.assertEqual(len(rows), 61)
+        for row, day in zip(rows, queryset):
+            self.assertEqual({field: row[field] for field in lunar.LUNAR_FIELDS}, lunar.lunar_fields(day.date))
+
+def without_ids(value):
+    """移除回應中所有的 id 欄位（例外日儲存模式補上的日期 id 為 null）"""
+    if isinstance(value, list):
+        return [without_ids(item) for item in value]
+    if isinstance(value, dict):
+        return {key: without_ids(item) for key, item in value.items() if key != 'id'}
+    return value
+
+
+@override_settings(CALENDAR_DATASET_VERSION_TTL=0)
+class DefaultDayReadPathTests(TestCase):
+    """例外日儲存模式只儲存例外日，各讀取路徑補上一般日後的回應與逐日儲存相同"""
+
+    URLS = [
+        '/api/calendar-days/by-date/2026-01-14/',
+        '/api/calendar-days/by-date/2026-01-17/',
+        '/api/calendar-days/by-date/2026-01-31/',
+        '/api/calendar-days/month/2026/1/',
+        '/api/calendar-days/month/2026/2/?lunar=true',
+        '/api/calendar-days/holidays/?year=2026',
+        '/api/calendar/range/?start_date=2026-01-10&end_date=2026-02-20',
+        '/api/calendar/range/?start_date=2026-01-01&end_date=2026-02-28&format=ndjson',
+        '/api/calendar/is-holiday/?date=2026-01-14',
+        '/api/calendar/is-holiday/?date=2026-01-17',
+        '/api/calendar/count-workdays/?start_date=2026-01-01&end_date=2026-12-25',
+        '/api/calendar/add-workdays/?date=2026-02-13&days=1',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        create_days(date(2026, 1, 1), date(2026, 12, 31), holidays={
+            date(2026, 1, 1): '中華民國開國紀念日',
+            date(2026, 2, 16): '農曆除夕',
+            date(2026, 2, 17): '春節',
+            date(2026, 12, 25): '行憲紀念日',
+        })
+        CalendarDay.objects.filter(date=date(2026, 1, 31)).update(
+            is_holiday=False, is_workday=True, description='補行上班'
+        )
+        CalendarDay.objects.filter(date=date(2026, 1, 15)).update(description='備註')
+
+    def setUp(self):
+        blob_cache.clear()
+        invalidate_calendar_index()
+
+    def responses(self):
+        result = {}
+        for url in self.URLS:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            if response.streaming:
+                body = b''.join(response.streaming_content).decode()
+                result[url] = [json.loads(line) for line in body.splitlines()]
+            else:
+                result[url] = response.json()
+        return result
+
+    def test_read_paths_match_full_storage(self):
+        expected = without_ids(self.responses())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CalendarDay.objects.filter(
+                id__in=[day.id for day in CalendarDay.objects.all() if is_default_day(day)]
+            ).delete()
+        self.assertEqual(CalendarDay.objects.count(), 6)
+
+        with override_settings(CALENDAR_EXCEPTION_STORAGE=True):
+            for index_enabled in (True, False):
+                for max_bytes in (blob_cache.max_bytes, 0):
+                    with self.subTest(index=index_enabled, blob_cache=max_bytes > 0), override_settings(
+                        CALENDAR_INDEX_ENABLED=index_enabled
+                    ), mock.patch.object(blob_cache, 'max_bytes', max_bytes):
+                        blob_cache.clear()
+                        invalidate_calendar_index()
+                        actual = self.responses()
+                        self.assertEqual(without_ids(actual), expected)
+                        # 補上的一般日沒有 id，儲存的例外日保留 id
+                        self.assertIsNone(actual['/api/calendar-days/by-date/2026-01-14/']['id'])
+                        self.assertIsNotNone(actual['/api/calendar-days/by-date/2026-01-31/']['id'])
+                        # 上班日計算只涵蓋第一筆到最後一筆例外日（12/25）之間
+                        response = self.client.get(
+                            '/api/calendar/count-workdays/', {'start_date': '2026-01-01', 'end_date': '2026-12-28'}
+                        )
+                        self.assertEqual(response.status_code, 404)
+
+    def test_fill_default_days(self):
+        stored = CalendarDay.objects.filter(date__in=[date(2026, 1, 15), date(2026, 1, 17)]).order_by('date')
+        days = list(fill_default_days(iter(stored), date(2026, 1, 14), date(2026, 1, 19)))
+        self.assertEqual([day.date.day for day in days], [14, 15, 16, 17, 18, 19])
+        self.assertEqual([day.id is None for day in days], [True, False, True, False, True, True])
+        self.assertEqual([day.is_holiday for day in days], [False, False, False, True, True, False])
+
+        days = list(fill_default_days([], date(2026, 1, 30), date(2026, 2, 1)))
+        self.assertEqual([(day.date.day, day.is_weekend, day.is_holiday) for day in days], [
+            (30, False, False), (31, True, True), (1, True, True),
+        ])
+        self.assertEqual(len(list(fill_default_days([], date(9999, 12, 30), date(9999, 12, 31)))), 2)
+
+    def test_is_default(self):
+        self.assertTrue(is_default(date(2026, 1, 14), False))
+        self.assertTrue(is_default(date(2026, 1, 17), True))
+        self.assertFalse(is_default(date(2026, 1, 17), False))
+        self.assertFalse(is_default(date(2026, 1, 14), False, description='備註'))
+        self.assertFalse(is_default(date(2026, 1, 31), False, is_workday=True))
+        self.assertFalse(is_default(date(2026, 1, 1), True, holiday_name='中華民國開國紀念日'))
+
+class IsHolidayBatchValidationTests(TestCase):
+    """批次查詢的請求內容格式錯誤時回應 400，而不是 500"""
+
+    URL = '/api/calendar/is-holiday/batch/'
+
+    def test_non_object_body(self):
+        for body in (['2026-01-01'], '"2026-01-01"', 1, None):
+            with self.subTest(body=body):
+                response = self.client.post(self.URL, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_non_list_fields(self):
+        for body in ({'dates': '2026-01-01'}, {'dates': {}}, {'ranges': {'start_date': '2026-01-01'}}):
+            with self.subTest(body=body):
+                response = self.client.post(self.URL, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class BatchWriteValidationTests(TestCase):
+    """批次寫入的請求內容在逐筆處理前先檢查型別，格式錯誤時回應 400 且不寫入"""
+
+    URL = '/api/calendar-days/batch/'
+
+    def assert_rejected(self, body):
+        response = self.client.post(self.URL, body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'error'})
+
+    def test_non_object_body(self):
+        for body in ([{'date': '2026-01-01'}], '"2026-01-01"', None):
+            with self.subTest(body=body):
+                self.assert_rejected(body)
+
+    def test_field_types(self):
+        for body in (
+            {'upsert': {'date': '2026-01-01'}},
+            {'delete': '2026-01-01'},
+            {'delete': ['2026-01-01'], 'atomic': 'false'},
+            {'delete': ['2026-01-01'], 'atomic': 0},
+        ):
+            with self.subTest(body=body):
+                self.assert_rejected(body)
+
+    def test_valid_body_still_writes(self):
+        create_days(date(2026, 1, 1), date(2026, 1, 2))
+        response = self.client.post(
+            self.URL, {'delete': ['2026-01-01'], 'atomic': False}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'deleted')
+        self.assertEqual(list(CalendarDay.objects.values_list('date', flat=True)), [date(2026, 1, 2)])
+
+
+class HolidayBatchWriteTests(TestCase):
+    """/api/holidays/batch/ 以 (日期, 名稱) 寫入假日，同一天的其他假日不受影響"""
+
+    URL = '/api/holidays/batch/'
+
+    def setUp(self):
+        self.national = Holiday.objects.create(
+            date=date(2030, 3, 5), year=2030, name='國定假日', holiday_type='national',
+        )
+        self.memorial = Holiday.objects.create(
+            date=date(2030, 3, 5), year=2030, name='紀念日', holiday_type='flexible',
+        )
+
+    def post(self, body):
+        return self.client.post(self.URL, body, content_type='application/json')
+
+    def test_upsert_on_shared_date(self):
+        response = self.post({'upsert': [
+            {'date': '2030-03-05', 'name': '紀念日', 'holiday_type': 'flexible', 'description': '改'},
+            {'date': '2030-03-05', 'name': '新假日', 'holiday_type': 'adjusted'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['updated', 'created'])
+        self.assertEqual(
+            dict(Holiday.objects.values_list('name', 'description')),
+            {'國定假日': '', '紀念日': '改', '新假日': ''},
+        )
+        self.national.refresh_from_db()
+        self.assertEqual(self.national.holiday_type, 'national')
+
+    def test_duplicate_name_on_same_date(self):
+        item = {'date': '2030-03-06', 'name': '新假日', 'holiday_type': 'national'}
+        response = self.post({'upsert': [item, item]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][1]['errors'], {'date': ['同一批次中日期與名稱重複']})
+        self.assertEqual(Holiday.objects.count(), 2)
+
+    def test_delete_removes_every_holiday_on_date(self):
+        response = self.post({'delete': ['2030-03-05']})
+        self.assertEqual(response.json()['results'][0]['status'], 'deleted')
+        self.assertFalse(Holiday.objects.exists())
+
+
+class GovCalendarChunkedDiffTests(TestCase):
+    """import_gov_calendar 逐批比對時，假日的移除範圍跨批次銜接，結果與一次比對整個檔案相同"""
+
+    @staticmethod
+    def gov_rows(start, end, holidays):
+        rows = []
+        current = start
+        while current <= end:
+            name = holidays.get(current, '')
+            rows.append({
+                'date': current.strftime('%Y%m%d'),
+                'name': name,
+                'isholiday': '是' if name or current.weekday() >= 5 else '否',
+                'holidaycategory': '放假之紀念日及節日' if name else '',
+                'description': '',
+            })
+            current += timedelta(days=1)
+        return list(enumerate(rows, start=2))
+
+    def import_rows(self, rows, **options):
+        with mock.patch.object(import_gov_calendar, 'DEFAULT_BATCH_SIZE', 10):
+            return import_gov_calendar.Command(stdout=io.StringIO()).import_data(rows, **options)
+
+    def test_holiday_in_gap_between_chunks_is_removed(self):
+        self.import_rows(self.gov_rows(date(2026, 1, 1), date(2026, 1, 30), {
+            date(2026, 1, 5): '甲', date(2026, 1, 12): '乙', date(2026, 1, 27): '丙',
+        }))
+        # 第二次匯入少了 1/11～1/13（第一批與第二批之間的空檔），甲、丙改名
+        rows = self.gov_rows(date(2026, 1, 1), date(2026, 1, 30), {
+            date(2026, 1, 5): '甲2', date(2026, 1, 27): '丙2',
+        })
+        rows = rows[:10] + rows[13:]
+        _, diffs = self.import_rows(rows, dry_run=True)
+        self.assertEqual(diffs['holidays'].counts(), {'inserted': 0, 'changed': 2, 'removed': 1, 'unchanged': 0})
+        self.assertEqual(list(diffs['holidays'].rows.removed), [date(2026, 1, 12)])
+        self.assertEqual(Holiday.objects.count(), 3)
+
+        self.import_rows(rows)
+        self.assertEqual(
+            list(Holiday.objects.order_by('date').values_list('date', 'name')),
+            [(date(2026, 1, 5), '甲2'), (date(2026, 1, 27), '丙2')],
+        )
+        self.assertEqual(CalendarDay.objects.count(), 30)
+
+
+    def test_date_with_several_holidays_is_replaced(self):
+        self.import_rows(self.gov_rows(date(2026, 1, 1), date(2026, 1, 10), {date(2026, 1, 5): '甲'}))
+        Holiday.objects.create(date=date(2026, 1, 5), year=2026, name='紀念日', holiday_type='flexible')
+
+        _, diffs = self.import_rows(
+            self.gov_rows(date(2026, 1, 1), date(2026, 1, 10), {date(2026, 1, 5): '甲'}), dry_run=True,
+        )
+        self.assertEqual(diffs['holidays'].counts(), {'inserted': 0, 'changed': 1, 'removed': 0, 'unchanged': 0})
+        self.assertEqual(diffs['holidays'].rows.changed[date(2026, 1, 5)][0][0], '甲、紀念日')
+
+        self.import_rows(self.gov_rows(date(2026, 1, 1), date(2026, 1, 10), {date(2026, 1, 5): '甲'}))
+        self.assertEqual(list(Holiday.objects.values_list('name', flat=True)), ['甲'])
+
+
+    def test_cp950_file_is_imported_in_chunks(self):
+        rows = [row for _, row in self.gov_rows(date(2026, 1, 1), date(2026, 1, 25), {
+            date(2026, 1, 1): '開國紀念日', date(2026, 1, 23): '碁聖紀念日',
+        })]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'gov.csv')
+            with open(path, 'w', encoding='cp950', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['date', 'name', 'isholiday', 'holidaycategory', 'description'])
+                writer.writeheader()
+                writer.writerows(rows)
+            output = io.StringIO()
+            with mock.patch.object(import_gov_calendar, 'DEFAULT_BATCH_SIZE', 10):
+                call_command('import_gov_calendar', path, stdout=output)
+
+        self.assertIn('cp950', output.getvalue())
+        self.assertEqual(CalendarDay.objects.count(), 25)
+        self.assertEqual(
+            list(Holiday.objects.order_by('date').values_list('date', 'name')),
+            [(date(2026, 1, 1), '開國紀念日'), (date(2026, 1, 23), '碁聖紀念日')],
+        )
+
+class HolidayNaturalKeyUpsertTests(TestCase):
+    """Holiday 以 (日期, 名稱) 寫入，同一天的多筆假日各自更新，不會蓋掉其他假日"""
+
+    def setUp(self):
+        self.national = Holiday.objects.create(
+            date=date(2030, 3, 5), year=2030, name='國定假日', holiday_type='national',
+        )
+        self.memorial = Holiday.objects.create(
+            date=date(2030, 3, 5), year=2030, name='紀念日', holiday_type='flexible',
+        )
+
+    def test_upsert_updates_only_matching_name(self):
+        created, updated = bulk_upsert(
+            Holiday,
+            [
+                Holiday(date=date(2030, 3, 5), year=2030, name='紀念日', holiday_type='flexible', description='改'),
+                Holiday(date=date(2030, 3, 5), year=2030, name='新假日', holiday_type='adjusted'),
+            ],
+            ['year', 'holiday_type', 'is_lunar', 'description'],
+            key=HOLIDAY_KEY,
+        )
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(
+            list(Holiday.objects.order_by('pk').values_list('pk', 'name', 'description')),
+            [(self.national.pk, '國定假日', ''), (self.memorial.pk, '紀念日', '改'), (mock.ANY, '新假日', '')],
+        )
+
+    def test_delete_by_natural_key(self):
+        deleted = bulk_delete(Holiday, [(date(2030, 3, 5), '紀念日'), (date(2030, 3, 6), '紀念日')], key=HOLIDAY_KEY)
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(Holiday.objects.values_list('pk', flat=True)), [self.national.pk])
+
+
+class CursorPaginationTests(TestCase):
+    """游標分頁以 (date, pk) 排序，同一天的多筆假日翻頁時不重複也不遺漏"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Holiday.objects.bulk_create([
+            Holiday(date=date(2026, 1, 1 + index // 3), year=2026, name=f'假日{index}', holiday_type='national')
+            for index in range(9)
+        ])
+
+    def test_pages_split_inside_same_date(self):
+        url = '/api/holidays/?pagination=cursor&page_size=2'
+        seen = []
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                page = self.client.get(url).json()
+                seen.extend(holiday['id'] for holiday in page['results'])
+                url = page['next']
+        self.assertEqual(seen, list(Holiday.objects.order_by('date', 'pk').values_list('pk', flat=True)))
+        quote = connection.ops.quote_name
+        order_by = (
+            f'ORDER BY {quote("calendar_api_holiday")}.{quote("date")} ASC, '
+            f'{quote("calendar_api_holiday")}.{quote("id")} ASC'
+        )
+        self.assertTrue(all(order_by in query['sql'] for query in queries if 'calendar_api_holiday' in query['sql']))
+
+    def test_ordering_param_is_rejected(self):
+        response = self.client.get('/api/holidays/', {'pagination': 'cursor', 'ordering': '-date'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIsInstance(response.json()['error'], str)
+        # 頁碼分頁仍可指定排序
+        response = self.client.get('/api/holidays/', {'ordering': '-date'})
+        self.assertEqual(response.json()['results'][0]['date'], '2026-01-03')
+
+
+class MonthSummaryTests(TestCase):
+    """MonthSummary 摘要表由寫入路徑維護，統計端點讀取時不寫入資料庫"""
+
+    def test_write_path_refreshes_summary(self):
+        self.client.post('/api/calendar-days/batch/', {
+            'upsert': [{'date': '2026-03-02', 'is_holiday': True, 'holiday_name': '測試假日'}],
+        }, content_type='application/json')
+        summary = MonthSummary.objects.get(year=2026, month=3)
+        self.assertEqual((summary.total_days, summary.holidays), (1, 1))
+
+    def test_read_computes_missing_month_without_writing(self):
+        create_days(date(2026, 1, 1), date(2026, 1, 31), holidays={date(2026, 1, 1): '中華民國開國紀念日'})
+        MonthSummary.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/calendar/month-summary/', {'year': 2026, 'month': 1})
+        self.assertEqual(response.json()['holidays'], 10)
+        self.assertEqual(response.json()['weekends'], 9)
+        self.assertFalse(MonthSummary.objects.exists())
+        self.assertFalse([query for query in queries if not query['sql'].lstrip().upper().startswith('SELECT')])
+
+    async def test_async_read_does_not_write(self):
+        await sync_to_async(create_days)(date(2026, 2, 1), date(2026, 2, 28))
+        await MonthSummary.objects.all().adelete()
+        response = await self.async_client.get('/api/calendar/month-summary/', {'year': 2026, 'month': 2})
+        self.assertEqual(response.json()['weekends'], 8)
+        self.assertFalse(await MonthSummary.objects.aexists())
+
+
+    def test_disabled_table_is_still_maintained(self):
+        create_days(date(2026, 4, 1), date(2026, 4, 30))
+        with override_settings(CALENDAR_MONTH_SUMMARY_TABLE=False):
+            day = CalendarDay.objects.get(date=date(2026, 4, 6))
+            day.is_holiday = True
+            day.holiday_name = '清明節補假'
+            day.save()
+        # 重新啟用時讀到的是停用期間寫入後的統計
+        response = self.client.get('/api/calendar/month-summary/', {'year': 2026, 'month': 4})
+        self.assertEqual(response.json()['holidays'], 9)
+        self.assertEqual(MonthSummary.objects.get(year=2026, month=4).holidays, 9)
+
+    @override_settings(CALENDAR_MONTH_SUMMARY_TABLE=False)
+    def test_backfill_migration_ignores_table_setting(self):
+        backfill = importlib.import_module('calendar_api.migrations.0004_backfill_month_summaries')
+        create_days(date(2026, 5, 1), date(2026, 6, 30), holidays={date(2026, 5, 1): '勞動節'})
+        MonthSummary.objects.all().delete()
+
+        backfill.backfill_month_summaries(django_apps, None)
+        self.assertEqual(
+            list(MonthSummary.objects.values_list('month', 'total_days', 'weekends', 'holidays')),
+            [(5, 31, 10, 11), (6, 30, 8, 8)],
+        )
+
+    @override_settings(CALENDAR_EXCEPTION_STORAGE=True)
+    async def test_async_invalid_month_matches_sync_error(self):
+        response = await self.async_client.get('/api/calendar/month-summary/', {'year': 2024, 'month': 13})
+        self.assertEqual(response.status_code, 400)
+        sync_response = await sync_to_async(self.client.get)(
+            '/api/calendar/month-summary/', {'year': 2024, 'month': 13},
+        )
+        self.assertEqual(response.json(), sync_response.json())
+
+
+class AsyncViewPolicyTests(TestCase):
+    """非同步端點只在 DRF 驗證、權限與限流必然允許時直接處理，其餘交回同步端點由 DRF 套用"""
+
+    URL = '/api/calendar/is-holiday/'
+
+    def setUp(self):
+        create_days(date(2026, 1, 1), date(2026, 1, 1), holidays={date(2026, 1, 1): '中華民國開國紀念日'})
+
+    async def get(self, **extra):
+        return await self.async_client.get(self.URL, {'date': '2026-01-01'}, **extra)
+
+    async def test_anonymous_request_is_served(self):
+        response = await self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_holiday'])
+
+    async def test_permission_classes_apply(self):
+        with mock.patch.object(views.IsHolidayAPIView, 'permission_classes', [IsAuthenticated]):
+            response = await self.get()
+        self.assertEqual(response.status_code, 403)
+
+    async def test_throttle_classes_apply(self):
+        class DenyAll(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        with mock.patch.object(views.IsHolidayAPIView, 'throttle_classes', [DenyAll]):
+            response = await self.get()
+        self.assertEqual(response.status_code, 429)
+
+    async def test_invalid_credentials_are_rejected(self):
+        response = await self.get(headers={'Authorization': 'Basic bm9ib2R5Om5vcGU='})
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportStaticCleanupTests(TestCase):
+    """export_static 移除不在新 manifest 中的匯出檔案，--force 時也一樣"""
+
+    def export(self, output, **options):
+        call_command('export_static', output=output, stdout=io.StringIO(), **options)
+        with open(os.path.join(output, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def exported_files(self, output):
+        return {
+            os.path.relpath(os.path.join(root, name), output)
+            for root, _, names in os.walk(output) for name in names
+        }
+
+    def test_force_removes_files_of_previous_export(self):
+        create_days(date(2026, 1, 1), date(2026, 1, 31))
+        with tempfile.TemporaryDirectory() as output:
+            self.export(output)
+            with open(os.path.join(output, 'notes.txt'), 'w') as f:
+                f.write('不是匯出的檔案')
+            CalendarDay.objects.filter(date=date(2026, 1, 2)).update(is_holiday=True, holiday_name='臨時假日')
+
+            manifest = self.export(output, force=True)
+            expected = {'manifest.json', 'notes.txt'}
+            for hashed in manifest['files'].values():
+                expected.update((os.path.normpath(hashed), os.path.normpath(hashed) + '.gz'))
+            self.assertEqual(self.exported_files(output), expected)
+
+
+class SyntheticGeneratorTests(TestCase):
+    """合成資料的國定假日與補假和 holiday_rules 相同，只有調整放假 / 補班以亂數產生"""
+
+    def test_rule_holidays_match_holiday_rules(self):
+        rows = list(synthetic.generate_gov_rows(2020, 10, seed=1))
+        generated = {
+            (row['date'], row['name'], row['holidaycategory']) for row in rows
+            if row['holidaycategory'] in (synthetic.CATEGORY_NATIONAL, synthetic.CATEGORY_COMPENSATORY)
+        }
+        expected = {
+            (
+                occurrence.date.strftime('%Y%m%d'),
+                occurrence.name,
+                synthetic.HOLIDAY_CATEGORIES[occurrence.holiday_type],
+            )
+            for occurrence in holiday_rules.generate_holidays(2020, 2029)
+        }
+        self.assertEqual(generated, expected)
+
+        adjusted = [row for row in rows if row['holidaycategory'] == synthetic.CATEGORY_ADJUSTED]
+        makeup = [row for row in rows if row['holidaycategory'] == synthetic.CATEGORY_MAKEUP_WORKDAY]
+        self.assertEqual(len(adjusted), len(makeup))
+        self.assertEqual(rows, list(synthetic.generate_gov_rows(2020, 10, seed=1)))
+
+    def test_years_outside_lunar_table_are_rejected_upfront(self):
+        with self.assertRaises(lunar.LunarDateError):
+            synthetic.generate_gov_rows(2090, 20)
+
+
+class PreviousDateTrackingTests(TestCase):
+    """修改日期時以 from_db 記下的原本日期更新衍生資料，不另外查詢原本的日期"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_days(date(2026, 5, 1), date(2026, 5, 31), holidays={date(2026, 5, 1): '勞動節'})
+        cls.holiday = Holiday.objects.create(date=date(2026, 5, 1), name='勞動節')
+
+    def previous_date_lookups(self, queries):
+        quote = connection.ops.quote_name
+        table = quote(Holiday._meta.db_table)
+        select = f'SELECT {table}.{quote("date")} AS {quote("date")} FROM {table} '
+        return [
+            query for query in queries
+            if query['sql'].startswith(select) and f'WHERE {table}.{quote("id")} =' in query['sql']
+        ]
+
+    def test_moving_loaded_holiday_updates_both_dates_without_lookup(self):
+        holiday = Holiday.objects.get(pk=self.holiday.pk)
+        holiday.date = date(2026, 5, 4)
+        with CaptureQueriesContext(connection) as queries:
+            holiday.save()
+        self.assertEqual(self.previous_date_lookups(queries), [])
+
+        flags = dict(CalendarDay.objects.filter(
+            date__in=[date(2026, 5, 1), date(2026, 5, 4)],
+        ).values_list('date', 'is_holiday'))
+        self.assertEqual(flags, {date(2026, 5, 1): False, date(2026, 5, 4): True})
+
+        # 同一個物件再次修改時，原本的日期是上一次儲存的日期
+        holiday.date = date(2026, 5, 5)
+        holiday.save()
+        self.assertFalse(CalendarDay.objects.get(date=date(2026, 5, 4)).is_holiday)
+
+    def test_update_fields_without_date_skips_previous_date(self):
+        holiday = Holiday(pk=self.holiday.pk, date=date(2026, 5, 1), year=2026, name='勞動節（更名）')
+        with CaptureQueriesContext(connection) as queries:
+            holiday.save(update_fields=['name'])
+        self.assertEqual(self.previous_date_lookups(queries), [])
+
+    def test_instance_with_manual_pk_still_looks_up_previous_date(self):
+        holiday = Holiday(pk=self.holiday.pk, date=date(2026, 5, 6), year=2026, name='勞動節')
+        with CaptureQueriesContext(connection) as queries:
+            holiday.save()
+        self.assertEqual(len(self.previous_date_lookups(queries)), 1)
+        self.assertFalse(CalendarDay.objects.get(date=date(2026, 5, 1)).is_holiday)
+
+
+class MetricsEndpointTimingTests(TestCase):
+    """/metrics 不加上 Server-Timing，抓取本身也不計入請求指標"""
+
+    def test_metrics_is_not_timed(self):
+        self.client.get('/metrics')
+        response = self.client.get('/metrics')
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertNotIn('route="metrics"', response.content.decode())
+
+    def test_api_endpoints_are_still_timed(self):
+        response = self.client.get('/api/calendar/today/')
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+
+
+@override_settings(CALENDAR_DATASET_VERSION_TTL=0)
+class BlobCacheVersionTests(TestCase):
+    """資料集版本遞增時，受異動影響的月份移除，其他項目沿用到新版本"""
+
+    def setUp(self):
+        blob_cache.clear()
+
+    def test_advance_moves_only_unaffected_entries(self):
+        cache = BlobCache(max_bytes=1000)
+        cache.set(('calendar-days', 2026, 1, 1), 'jan', 10)
+        cache.set(('calendar-days', 2026, 2, 1), 'feb', 20)
+        cache.set(('calendar-days', 2026, 3, 0), 'mar-v0', 30)
+        cache.set(('calendar-days', 2026, 4, 1), 'apr-v1', 40)
+        cache.set(('calendar-days', 2026, 4, 2), 'apr-v2', 50)
+
+        cache.advance(1, 2, stale=lambda key: key[2] == 1)
+
+        self.assertIsNone(cache.get(('calendar-days', 2026, 1, 2)))
+        self.assertIsNone(cache.get(('calendar-days', 2026, 1, 1)))
+        self.assertEqual(cache.get(('calendar-days', 2026, 2, 2)), 'feb')
+        # 不是上一個版本的項目不處理；新版本已有的項目保留新的內容
+        self.assertEqual(cache.get(('calendar-days', 2026, 3, 0)), 'mar-v0')
+        self.assertEqual(cache.get(('calendar-days', 2026, 4, 2)), 'apr-v2')
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.size, 20 + 30 + 50)
+
+    def test_write_discards_changed_month_and_carries_over_the_rest(self):
+        create_days(date(2026, 1, 1), date(2026, 2, 28))
+        get_month_days([(2026, 1), (2026, 2)])
+        version = get_dataset_version()[0]
+
+        day = CalendarDay.objects.get(date=date(2026, 1, 5))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/calendar-days/{day.pk}/',
+                {'is_holiday': True, 'holiday_name': '臨時假日'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        new_version = get_dataset_version()[0]
+        self.assertEqual(new_version, version + 1)
+
+        self.assertIsNone(blob_cache.get(('calendar-days', 2026, 1, new_version)))
+        self.assertIsNotNone(blob_cache.get(('calendar-days', 2026, 2, new_version)))
+        # 只查詢資料集版本，二月沿用快取
+        with self.assertNumQueries(1):
+            get_month_days([(2026, 2)])
+
+        january = get_month_days([(2026, 1)])[(2026, 1)]
+        self.assertEqual([item[0] for item in january if item[1]], [
+            date(2026, 1, 3), date(2026, 1, 4), date(2026, 1, 5),
+            date(2026, 1, 10), date(2026, 1, 11), date(2026, 1, 17), date(2026, 1, 18),
+            date(2026, 1, 24), date(2026, 1, 25), date(2026, 1, 31),
+        ])
+
+
+@override_settings(CALENDAR_DATASET_VERSION_TTL=0)
+class DatasetVersionBumpTests(TestCase):
+    """日曆資料寫入的交易提交後由 maintenance 遞增資料集版本，每個交易只遞增一次"""
+
+    def setUp(self):
+        blob_cache.clear()
+        create_days(date(2024, 3, 1), date(2024, 3, 31))
+
+    def test_orm_holiday_write_changes_etag(self):
+        urls = ['/api/calendar/is-holiday/?date=2024-03-05', '/api/calendar-days/month/2024/3/']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(date=date(2024, 3, 5), year=2024, name='臨時假日', holiday_type='national')
+
+        response = self.client.get(urls[0])
+        self.assertTrue(response.json()['is_holiday'])
+        for url in urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_one_bump_per_transaction(self):
+        version = get_dataset_version()[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Holiday.objects.create(date=date(2024, 3, 5), year=2024, name='臨時假日', holiday_type='national')
+                WorkdayAdjustment.objects.create(
+                    date=date(2024, 3, 9), compensate_for=date(2024, 3, 4), description='補行上班'
+                )
+                CalendarDay.objects.filter(date=date(2024, 3, 20)).get().delete()
+        self.assertEqual(get_dataset_version()[0], version + 1)
+
+    def test_rolled_back_writes_do_not_bump(self):
+        version = get_dataset_version()[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                with transaction.atomic():
+                    Holiday.objects.create(date=date(2024, 3, 5), year=2024, name='臨時假日', holiday_type='national')
+                    transaction.set_rollback(True)
+                WorkdayAdjustment.objects.create(
+                    date=date(2024, 3, 9), compensate_for=date(2024, 3, 4), description='補行上班'
+                )
+        # savepoint 回復時一併移除的 on_commit 不影響之後的異動
+        self.assertEqual(get_dataset_version()[0], version + 1)
+        self.assertFalse(Holiday.objects.exists())
+
+
+    def test_bump_returns_the_stored_version(self):
+        versions = []
+
+        def receiver(sender, version, **kwargs):
+            versions.append(version)
+
+        dataset_version_bumped.connect(receiver)
+        self.addCleanup(dataset_version_bumped.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = bump_dataset_version()
+            second = bump_dataset_version()
+        self.assertEqual(second, first + 1)
+        self.assertEqual(versions, [first, second])
+        self.assertEqual(get_dataset_version()[0], second)
+
+    @override_settings(CALENDAR_DATASET_VERSION_TTL=60)
+    @mock.patch('calendar_api.versioning._cached', None)
+    def test_rolled_back_bump_is_not_cached(self):
+        version = get_dataset_version()[0]
+        with transaction.atomic():
+            self.assertEqual(bump_dataset_version(), version + 1)
+            transaction.set_rollback(True)
+        self.assertEqual(get_dataset_version()[0], version)
+
+@override_settings(CALENDAR_DATASET_VERSION_TTL=0)
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified 與 If-None-Match / If-Modified-Since 的 304 回應"""
+
+    URL = '/api/calendar/is-holiday/?date=2024-03-05'
+
+    def setUp(self):
+        create_days(date(2024, 3, 1), date(2024, 3, 31))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_dataset_version()
+
+    def test_matching_etag_returns_304(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        for header in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            cached = self.client.get(self.URL, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(cached.status_code, 304, header)
+            self.assertEqual(cached.content, b'')
+            self.assertEqual(cached['ETag'], etag)
+
+    def test_etag_depends_on_path_and_version(self):
+        etag = self.client.get(self.URL)['ETag']
+        self.assertNotEqual(self.client.get('/api/calendar/is-holiday/?date=2024-03-06')['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_dataset_version()
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.URL)['Last-Modified']
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.URL, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code, 200
+        )
+        # If-None-Match 優先於 If-Modified-Since
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_browsable_api_has_no_validators(self):
+        response = self.client.get(self.URL, HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_write_requests_are_not_conditional(self):
+        day_id = CalendarDay.objects.get(date=date(2024, 3, 5)).id
+        response = self.client.patch(
+            f'/api/calendar-days/{day_id}/', {'description': '測試'},
+            content_type='application/json', HTTP_IF_NONE_MATCH='*',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_view_uses_the_same_etag(self):
+        etag = (await sync_to_async(self.client.get)(self.URL))['ETag']
+        response = await self.async_client.get(self.URL, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+class MetricsSnapshotMergeTests(TestCase):
+    """/metrics 合併目前行程與 CALENDAR_METRICS_DIR 中其他行程的快照"""
+
+    @staticmethod
+    def buckets(**counts):
+        values = [0] * (len(metrics.LATENCY_BUCKETS) + 1)
+        for position, count in counts.items():
+            values[int(position.removeprefix('b'))] = count
+        return values
+
+    def write_snapshot(self, directory, name, **snapshot):
+        content = {
+            'requests': [], 'latency': [], 'db_queries': [], 'db_seconds': [],
+            'cache': [], 'index_builds': 0, 'imports': [], **snapshot,
+        }
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+
+    def test_render_merges_workers_and_current_process(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(CALENDAR_METRICS_DIR=directory), \
+                mock.patch.object(metrics, 'registry', metrics.MetricsRegistry()), \
+                mock.patch.object(blob_cache, 'hits', 0), \
+                mock.patch.object(blob_cache, 'misses', 0), \
+                mock.patch.object(index, '_builds', 0):
+            self.write_snapshot(
+                directory, 'worker-a.json',
+                requests=[['calendar-range', 'GET', '200', 5]],
+                latency=[['calendar-range', 'GET', self.buckets(b1=5), 0.01]],
+                db_queries=[['calendar-range', 10]],
+                cache=[['blob', 30, 10]],
+                index_builds=2,
+                imports=[['import_gov_calendar', {
+                    'runs': {'success': 2}, 'sum': 10.0, 'count': 2, 'last': 4.0, 'last_timestamp': 200.0,
+                }]],
+            )
+            self.write_snapshot(
+                directory, 'worker-b.json',
+                requests=[['calendar-range', 'GET', '200', 3], ['calendar-range', 'GET', '404', 1]],
+                latency=[['calendar-range', 'GET', self.buckets(b12=3, b13=1), 20.0]],
+                db_queries=[['calendar-range', 4]],
+                cache=[['blob', 10, 0]],
+                index_builds=1,
+                imports=[['import_gov_calendar', {
+                    'runs': {'success': 1, 'error': 1}, 'sum': 6.0, 'count': 2, 'last': 1.5, 'last_timestamp': 100.0,
+                }]],
+            )
+            # 寫到一半或損毀的檔案略過
+            with open(os.path.join(directory, 'broken.json'), 'w', encoding='utf-8') as f:
+                f.write('{')
+            metrics.registry.observe_request('calendar-range', 'GET', 200, 0.003, 2, 0.001)
+
+            lines = set(metrics.render_metrics().splitlines())
+
+        route = 'route="calendar-range",method="GET"'
+        self.assertIn(f'calendar_http_requests_total{{{route},status="200"}} 9', lines)
+        self.assertIn(f'calendar_http_requests_total{{{route},status="404"}} 1', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_bucket{{{route},le="0.001"}} 0', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_bucket{{{route},le="0.0025"}} 5', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_bucket{{{route},le="0.005"}} 6', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_bucket{{{route},le="10.0"}} 9', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 10', lines)
+        self.assertIn(f'calendar_http_request_duration_seconds_count{{{route}}} 10', lines)
+        self.assertIn('calendar_db_queries_total{route="calendar-range"} 16', lines)
+        self.assertIn('calendar_cache_hit_ratio{cache="blob"} 0.8', lines)
+        self.assertIn('calendar_index_builds_total 3', lines)
+        self.assertIn('calendar_import_runs_total{command="import_gov_calendar",status="success"} 3', lines)
+        self.assertIn('calendar_import_runs_total{command="import_gov_calendar",status="error"} 1', lines)
+        self.assertIn('calendar_import_duration_seconds_count{command="import_gov_calendar"} 4', lines)
+        # 最近一次執行以時間戳記較新的快照為準
+        self.assertIn('calendar_import_last_duration_seconds{command="import_gov_calendar"} 4.0', lines)
+
+
+class ImportProfilerPhaseTests(TestCase):
+    """各階段以獨佔時間計算：巢狀階段不重複計入外層，各階段加總等於總時間"""
+
+    class Clock:
+        def __init__(self):
+            self.now = 0.0
+
+        def perf_counter(self):
+            return self.now
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    def test_nested_phases_are_exclusive(self):
+        clock = self.Clock()
+        with mock.patch.object(profiling, 'time', clock):
+            with ImportProfiler(phase='parse') as profiler:
+                clock.advance(1.0)
+                with profiler.phase('read'):
+                    clock.advance(2.0)
+                    with profiler.phase('db'):
+                        clock.advance(4.0)
+                    clock.advance(0.5)
+                clock.advance(3.0)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+
+        self.assertEqual(profiler.times, {'parse': 4.0, 'read': 2.5, 'db': 4.0})
+        self.assertEqual(profiler.elapsed, 10.5)
+        self.assertEqual(sum(profiler.times.values()), profiler.elapsed)
+        self.assertEqual(profiler.statements, 1)
+
+    def test_iterate_charges_next_to_phase(self):
+        clock = self.Clock()
+
+        def lines():
+            for line in ('a', 'b', 'c'):
+                clock.advance(0.25)
+                yield line
+
+        with mock.patch.object(profiling, 'time', clock):
+            with ImportProfiler(phase='parse') as profiler:
+                for _ in profiler.count(profiler.iterate('decode', lines())):
+                    clock.advance(1.0)
+
+        self.assertEqual(profiler.times, {'parse': 3.0, 'decode': 0.75})
+        self.assertEqual(profiler.rows, 3)
+
+    def test_disabled_profiler_records_nothing(self):
+        with ImportProfiler(enabled=False) as profiler:
+            with profiler.phase('read'):
+                pass
+            rows = list(profiler.count(range(3)))
+        self.assertEqual(rows, [0, 1, 2])
+        self.assertEqual((profiler.times, profiler.rows, profiler.statements), ({}, 0, 0))
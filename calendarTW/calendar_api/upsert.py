@@ -0,0 +1,217 @@
+"""
+批次寫入 (bulk upsert) 工具
+以整批 SQL 取代逐筆 update_or_create，每個批次包在一個交易中
+bulk 操作不會觸發 post_save / post_delete，改為寫入後送出 bulk_written 訊號，
+由 maintenance 只更新受影響日期的索引、摘要與快取
+"""
+from django.db import connection, transaction
+from django.dispatch import Signal
+
+from .default_days import exception_storage_enabled, is_default_day
+from .models import CalendarDay
+
+DEFAULT_BATCH_SIZE = 1000
+
+# bulk_upsert / bulk_delete 寫入後送出，sender 為模型，keys 為受影響的 key 值，key 為欄位名稱或欄位名稱的 tuple
+bulk_written = Signal()
+
+# Holiday 同一天可以有多筆（例如國定假日與紀念日），以 (日期, 名稱) 識別，不能只以日期為 key
+HOLIDAY_KEY = ('date', 'name')
+
+# CalendarDay 以日期為 key 整筆寫入時更新的欄位
+CALENDAR_DAY_UPDATE_FIELDS = [
+    'year', 'month', 'day', 'weekday', 'is_weekend', 'is_holiday', 'is_workday', 'holiday_name', 'description',
+]
+
+# 例外日儲存模式下判斷是否為一般日所需的欄位
+CALENDAR_FLAG_FIELDS = ('is_holiday', 'is_workday', 'holiday_name', 'description')
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def key_fields(key):
+    """key 的欄位名稱 tuple；key 可為單一欄位名稱或多個欄位名稱的 tuple"""
+    return (key,) if isinstance(key, str) else tuple(key)
+
+
+def _key_getter(key):
+    fields = key_fields(key)
+    if len(fields) == 1:
+        return lambda obj: getattr(obj, fields[0])
+    return lambda obj: tuple(getattr(obj, name) for name in fields)
+
+
+def _is_unique(model, key):
+    return isinstance(key, str) and model._meta.get_field(key).unique
+
+
+def _existing_pks(model, key, keys):
+    """
+    查出既有資料的 {key 值: 主鍵}
+    沒有唯一限制的 key 可能對應多筆資料，依主鍵排序固定取最早建立的一筆
+    """
+    fields = key_fields(key)
+    rows = model.objects.filter(**{f'{fields[0]}__in': {value if len(fields) == 1 else value[0] for value in keys}})
+    existing = {}
+    if len(fields) == 1:
+        for value, pk in rows.order_by('pk').values_list(fields[0], 'pk'):
+            existing.setdefault(value, pk)
+        return existing
+    wanted = set(keys)
+    for *values, pk in rows.order_by('pk').values_list(*fields, 'pk'):
+        value = tuple(values)
+        if value in wanted:
+            existing.setdefault(value, pk)
+    return existing
+
+
+def _on_conflict_upsert(model, chunk, key, update_fields):
+    """
+    以 INSERT ... ON CONFLICT DO UPDATE 搭配 executemany 寫入一批物件
+    SQLite 與 PostgreSQL 語法相同，省去 ORM 逐欄位組 SQL 的成本
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    updates = ', '.join(
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (model._meta.get_field(name).column for name in update_fields)
+    )
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({quote(model._meta.get_field(key).column)}) DO UPDATE SET {updates}'
+    )
+    rows = [[getattr(obj, field.attname) for field in fields] for obj in chunk]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _update_by_pk(model, chunk, update_fields):
+    """
+    以 UPDATE ... WHERE pk = %s 搭配 executemany 更新一批物件
+    bulk_update 會為每個欄位組出整批的 CASE WHEN 運算式，批次越大編譯越慢
+    """
+    fields = [model._meta.get_field(name) for name in update_fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = (
+        f'UPDATE {quote(model._meta.db_table)} SET {assignments} '
+        f'WHERE {quote(model._meta.pk.column)} = %s'
+    )
+    rows = [[getattr(obj, field.attname) for field in fields] + [obj.pk] for obj in chunk]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def bulk_upsert(model, objects, update_fields, key='date', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    依 key 欄位新增或更新一批物件，回傳 (新增筆數, 更新筆數)
+
+    - key 欄位有唯一限制時由資料庫處理衝突：SQLite / PostgreSQL 使用 INSERT ... ON CONFLICT，
+      其他資料庫使用 bulk_create(update_conflicts=True)
+    - 沒有唯一限制時（例如 Holiday 的 HOLIDAY_KEY）先查出既有主鍵，再分別以主鍵更新 / bulk_create；
+      同一 key 有多筆資料時更新主鍵最小的一筆
+    - key 可為欄位名稱，或多個欄位名稱的 tuple
+    - 相同 key 的物件只保留最後一筆，與逐筆 update_or_create 的結果一致
+
+    注意：bulk 操作不會呼叫 Model.save()，衍生欄位（year、month 等）需事先設定好
+    """
+    get_key = _key_getter(key)
+    latest = {}
+    for obj in objects:
+        latest[get_key(obj)] = obj
+    objects = list(latest.values())
+
+    created_count = 0
+    updated_count = 0
+    unique = _is_unique(model, key)
+
+    for chunk in _chunks(objects, batch_size):
+        keys = [get_key(obj) for obj in chunk]
+        with transaction.atomic():
+            existing = _existing_pks(model, key, keys)
+            if unique and connection.vendor in ('sqlite', 'postgresql'):
+                _on_conflict_upsert(model, chunk, key, update_fields)
+            elif unique:
+                model.objects.bulk_create(
+                    chunk,
+                    update_conflicts=True,
+                    unique_fields=[key],
+                    update_fields=update_fields,
+                )
+            else:
+                to_update = []
+                to_create = []
+                for obj in chunk:
+                    pk = existing.get(get_key(obj))
+                    if pk is None:
+                        to_create.append(obj)
+                    else:
+                        obj.pk = pk
+                        to_update.append(obj)
+                if to_update and connection.vendor in ('sqlite', 'postgresql'):
+                    _update_by_pk(model, to_update, update_fields)
+                elif to_update:
+                    model.objects.bulk_update(to_update, update_fields)
+                if to_create:
+                    model.objects.bulk_create(to_create)
+
+        updated_count += len(existing)
+        created_count += len(chunk) - len(existing)
+
+    if objects:
+        bulk_written.send(sender=model, keys=list(latest), key=key)
+    return created_count, updated_count
+
+
+def bulk_delete(model, keys, key='date', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    依 key 欄位刪除一批資料，回傳刪除筆數
+    與 bulk_upsert 相同直接執行 SQL，不會逐筆觸發 post_delete；key 為多個欄位時每個 key 值展開為 AND 條件
+    """
+    keys = list(keys)
+    quote = connection.ops.quote_name
+    fields = key_fields(key)
+    columns = [quote(model._meta.get_field(name).column) for name in fields]
+    deleted = 0
+    for chunk in _chunks(keys, max(batch_size // len(fields), 1)):
+        if len(fields) == 1:
+            condition = f'{columns[0]} IN ({", ".join(["%s"] * len(chunk))})'
+            params = chunk
+        else:
+            match = '(' + ' AND '.join(f'{column} = %s' for column in columns) + ')'
+            condition = ' OR '.join([match] * len(chunk))
+            params = [value for values in chunk for value in values]
+        sql = f'DELETE FROM {quote(model._meta.db_table)} WHERE {condition}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            deleted += cursor.rowcount
+    if keys:
+        bulk_written.send(sender=model, keys=keys, key=key)
+    return deleted
+
+
+def save_calendar_days(calendar_days, update_fields, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    寫入一批 CalendarDay，回傳 (新增筆數, 更新筆數)
+    例外日儲存模式下只寫入例外日，一般日若已有資料則刪除（例如假日被改回一般日）；
+    update_fields 未包含全部旗標欄位時無法判斷是否為一般日，照常寫入
+    """
+    if not exception_storage_enabled() or not set(CALENDAR_FLAG_FIELDS) <= set(update_fields):
+        return bulk_upsert(CalendarDay, calendar_days, update_fields, batch_size=batch_size)
+
+    exceptions = []
+    defaults = []
+    # 與 bulk_upsert 相同，相同日期只保留最後一筆
+    latest = {calendar_day.date: calendar_day for calendar_day in calendar_days}
+    for calendar_day in latest.values():
+        if is_default_day(calendar_day):
+            defaults.append(calendar_day.date)
+        else:
+            exceptions.append(calendar_day)
+    bulk_delete(CalendarDay, defaults, batch_size=batch_size)
+    return bulk_upsert(CalendarDay, exceptions, update_fields, batch_size=batch_size)
@@ -5,9 +5,14 @@ from .views import (
     HolidayViewSet,
     WorkdayAdjustmentViewSet,
     CalendarRangeAPIView,
+    CalendarFeedAPIView,
     TodayAPIView,
     IsHolidayAPIView,
+    IsHolidayBatchAPIView,
     MonthSummaryAPIView,
+    YearSummaryAPIView,
+    AddWorkdaysAPIView,
+    CountWorkdaysAPIView,
 )
 
 # 建立 Router 並註冊 ViewSets
@@ -23,7 +28,12 @@ urlpatterns = [
     
     # 自訂 APIView 端點
     path('calendar/range/', CalendarRangeAPIView.as_view(), name='calendar-range'),
+    path('calendar/feed.ics', CalendarFeedAPIView.as_view(), name='calendar-feed'),
     path('calendar/today/', TodayAPIView.as_view(), name='calendar-today'),
     path('calendar/is-holiday/', IsHolidayAPIView.as_view(), name='is-holiday'),
+    path('calendar/is-holiday/batch/', IsHolidayBatchAPIView.as_view(), name='is-holiday-batch'),
     path('calendar/month-summary/', MonthSummaryAPIView.as_view(), name='month-summary'),
+    path('calendar/year-summary/', YearSummaryAPIView.as_view(), name='year-summary'),
+    path('calendar/add-workdays/', AddWorkdaysAPIView.as_view(), name='add-workdays'),
+    path('calendar/count-workdays/', CountWorkdaysAPIView.as_view(), name='count-workdays'),
 ]
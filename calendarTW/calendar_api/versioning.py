@@ -0,0 +1,169 @@
+"""
+資料集版本與 HTTP 條件式請求
+- 全域資料集版本：日曆資料寫入的交易提交後由 maintenance 遞增（每個交易一次）
+- ConditionalGetMixin：依版本產生 ETag / Last-Modified，符合 If-None-Match 時直接回應 304，不執行序列化
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import DatasetVersion
+
+_DATASET_VERSION_PK = 1
+
+# 資料集版本遞增（且交易已提交）後送出，參數 version 為新版本
+dataset_version_bumped = Signal()
+
+_cached = None
+_lock = threading.Lock()
+
+
+def get_dataset_version():
+    """
+    取得目前的資料集版本，回傳 (version, updated_at)
+    結果在行程內快取 CALENDAR_DATASET_VERSION_TTL 秒，避免每個請求都查詢資料庫
+    """
+    global _cached
+    cached = _cached
+    ttl = getattr(settings, 'CALENDAR_DATASET_VERSION_TTL', 2)
+    if cached is not None and time.monotonic() - cached[2] < ttl:
+        return cached[0], cached[1]
+
+    with _lock:
+        row = DatasetVersion.objects.filter(pk=_DATASET_VERSION_PK).values_list(
+            'version', 'updated_at'
+        ).first()
+        version, updated_at = row or (0, None)
+        _cached = (version, updated_at, time.monotonic())
+    return version, updated_at
+
+
+async def aget_dataset_version():
+    """get_dataset_version 的非同步版本，快取仍有效時不會存取資料庫"""
+    global _cached
+    cached = _cached
+    ttl = getattr(settings, 'CALENDAR_DATASET_VERSION_TTL', 2)
+    if cached is not None and time.monotonic() - cached[2] < ttl:
+        return cached[0], cached[1]
+
+    row = await DatasetVersion.objects.filter(pk=_DATASET_VERSION_PK).values_list(
+        'version', 'updated_at'
+    ).afirst()
+    version, updated_at = row or (0, None)
+    _cached = (version, updated_at, time.monotonic())
+    return version, updated_at
+
+
+def bump_dataset_version():
+    """
+    遞增資料集版本，回傳新版本
+    UPDATE 取得的列鎖在交易結束前不會釋放，同一交易內讀回的版本就是本次遞增的結果，不會讀到其他行程之後的遞增
+    """
+    global _cached
+    now = timezone.now()
+    rows = DatasetVersion.objects.filter(pk=_DATASET_VERSION_PK)
+    with transaction.atomic():
+        updated = rows.update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            _, created = DatasetVersion.objects.get_or_create(
+                pk=_DATASET_VERSION_PK,
+                defaults={'version': 1, 'updated_at': now},
+            )
+            if not created:
+                # 其他行程同時建立了這筆資料
+                rows.update(version=F('version') + 1, updated_at=now)
+        version = rows.values_list('version', flat=True).get()
+    # 不以尚未提交的版本填入快取，下一次讀取時再查詢資料庫
+    _cached = None
+    transaction.on_commit(lambda: dataset_version_bumped.send(sender=DatasetVersion, version=version))
+    return version
+
+
+def compute_etag(version, extra, media_type, full_path):
+    """由資料集版本與請求內容產生 ETag"""
+    key = '|'.join([str(version), extra, media_type, full_path])
+    return f'"{version}-{hashlib.md5(key.encode()).hexdigest()[:16]}"'
+
+
+def is_not_modified(meta, etag, last_modified):
+    """依 If-None-Match（優先）或 If-Modified-Since 判斷用戶端的快取是否仍有效"""
+    if_none_match = meta.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        candidates = [value.removeprefix('W/') for value in parse_etags(if_none_match)]
+        return '*' in candidates or etag in candidates
+
+    if_modified_since = parse_http_date_safe(meta.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(if_modified_since and last_modified and int(last_modified.timestamp()) <= if_modified_since)
+
+
+class NotModified(APIException):
+    """用戶端的快取仍有效"""
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    為 GET 端點加上 ETag / Last-Modified 並處理 If-None-Match / If-Modified-Since
+    ETag 由資料集版本、請求路徑與回應格式組成；只處理 conditional_formats 列出的格式
+    （可瀏覽 API 的 HTML 含 CSRF token，不適用）
+    """
+    conditional_formats = ('json',)
+
+    def get_etag_extra(self, request):
+        """回應內容除了資料集版本外還取決於其他因素時覆寫（例如今天的日期）"""
+        return ''
+
+    def get_last_modified(self, request, updated_at):
+        return updated_at
+
+    def _conditional_applies(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return (
+            request.method in ('GET', 'HEAD')
+            and renderer is not None
+            and renderer.format in self.conditional_formats
+        )
+
+    def _validators(self, request):
+        version, updated_at = get_dataset_version()
+        etag = compute_etag(
+            version,
+            self.get_etag_extra(request),
+            request.accepted_media_type,
+            request.get_full_path(),
+        )
+        return etag, self.get_last_modified(request, updated_at)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self._conditional_applies(request):
+            return
+
+        etag, last_modified = self._validators(request)
+        self._etag, self._last_modified = etag, last_modified
+        if is_not_modified(request.META, etag, last_modified):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if self._last_modified:
+                response['Last-Modified'] = http_date(self._last_modified.timestamp())
+        return response
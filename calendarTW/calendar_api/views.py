@@ -4,10 +4,37 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from datetime import datetime, timedelta
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from datetime import datetime, time, timedelta
+from django.conf import settings
 from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from .batch import BatchWriteMixin
+from .blob_cache import (
+    blob_cache_applies,
+    calendar_range_items,
+    get_month_days,
+    holidays_by_year_blob,
+    json_response,
+    with_lunar_fields,
+)
+from .compact import COMPACT_ENCODINGS, compact_range
+from .default_days import (
+    exception_storage_enabled,
+    fill_default_days,
+    get_or_default,
+    with_default_flags,
+)
+from .ics import FEED_TYPES, ICalendarRenderer, cached_feed, stream_feed
+from .index import calendar_index_enabled, get_calendar_index
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from .middleware import timing_exempt
 from .models import CalendarDay, Holiday, WorkdayAdjustment
+from .pagination import DatePagination
 from .serializers import (
     CalendarDaySerializer,
     CalendarDayListSerializer,
@@ -15,15 +42,81 @@ from .serializers import (
     HolidayListSerializer,
     WorkdayAdjustmentSerializer,
 )
+from .streaming import NDJSONRenderer, stream_calendar_days, streaming_response
+from .summaries import get_month_summaries, summary_to_dict
+from .versioning import ConditionalGetMixin
+from .workdays import WorkdayRangeError, add_workdays, count_workdays
+
+
+def _parse_date(value):
+    """解析 YYYY-MM-DD 日期字串，格式錯誤時回傳 None"""
+    try:
+        return parse_date(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wants_lunar(request):
+    """?lunar=true 時日曆資料加上農曆欄位"""
+    return request.query_params.get('lunar', '').lower() in ('1', 'true', 'yes')
+
+
+def _day_items(request, items):
+    """將 blob_cache 的已序列化資料組成回應內容，需要時加上農曆欄位"""
+    if _wants_lunar(request):
+        return with_lunar_fields(items)
+    return [item[3] for item in items]
+
+
+def _compact_response(request, start_date, end_date):
+    """
+    處理 ?compact=bitmask|rle 參數
+    回傳精簡表示的回應；未帶參數時回傳 None，交由一般流程處理
+    """
+    encoding = request.query_params.get('compact')
+    if encoding is None:
+        return None
+    if encoding not in COMPACT_ENCODINGS:
+        return Response(
+            {'error': f'compact 必須是 {" 或 ".join(COMPACT_ENCODINGS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    max_dates = getattr(settings, 'CALENDAR_BATCH_MAX_DATES', 100000)
+    if (end_date - start_date).days + 1 > max_dates:
+        return Response(
+            {'error': f'單次最多查詢 {max_dates} 個日期'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(compact_range(start_date, end_date, encoding))
+
+
+def _cacheable_month(year, month):
+    """月份快取只處理合法的年月"""
+    return 1 <= year <= 9998 and 1 <= month <= 12
+
+
+def _range_too_large(start, end):
+    """
+    例外日儲存模式下任意日期都有資料，逐日 JSON 的範圍以 CALENDAR_BATCH_MAX_DATES 為上限
+    超過時回傳錯誤回應，否則回傳 None
+    """
+    max_dates = getattr(settings, 'CALENDAR_BATCH_MAX_DATES', 100000)
+    if exception_storage_enabled() and (end - start).days + 1 > max_dates:
+        return Response(
+            {'error': f'單次最多查詢 {max_dates} 個日期'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
 
 
-class CalendarDayViewSet(viewsets.ModelViewSet):
+class CalendarDayViewSet(ConditionalGetMixin, BatchWriteMixin, viewsets.ModelViewSet):
     """
     日曆日期 ViewSet
     提供完整的 CRUD 操作
     """
     queryset = CalendarDay.objects.all()
     serializer_class = CalendarDaySerializer
+    pagination_class = DatePagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['year', 'month', 'is_weekend', 'is_holiday', 'is_workday']
     search_fields = ['holiday_name', 'description']
@@ -35,13 +128,40 @@ class CalendarDayViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             return CalendarDayListSerializer
         return CalendarDaySerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['lunar'] = _wants_lunar(self.request)
+        return context
     
     @action(detail=False, methods=['get'], url_path='by-date/(?P<date>[0-9-]+)')
     def by_date(self, request, date=None):
         """
         根據日期查詢單一日期資訊
         URL: /api/calendar-days/by-date/2026-01-01/
+        加上 ?lunar=true 時另外回傳農曆日期與節氣
         """
+        if calendar_index_enabled():
+            day = _parse_date(date)
+            if day is None:
+                return Response(
+                    {'error': '日期格式錯誤，請使用 YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            calendar_day = get_calendar_index().get(day)
+            if calendar_day is None:
+                return Response(
+                    {'error': '找不到該日期的資料'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            serializer = self.get_serializer(calendar_day)
+            return Response(serializer.data)
+
+        day = _parse_date(date)
+        if day is not None and exception_storage_enabled():
+            serializer = self.get_serializer(get_or_default(day))
+            return Response(serializer.data)
+
         try:
             calendar_day = CalendarDay.objects.get(date=date)
             serializer = self.get_serializer(calendar_day)
@@ -57,8 +177,22 @@ class CalendarDayViewSet(viewsets.ModelViewSet):
         """
         查詢指定年月的所有日期
         URL: /api/calendar-days/month/2026/1/
+        加上 ?compact=bitmask 或 ?compact=rle 時回傳位元遮罩格式，?lunar=true 時另外回傳農曆日期與節氣
         """
+        if 'compact' in request.query_params and _cacheable_month(int(year), int(month)):
+            start = datetime(int(year), int(month), 1).date()
+            end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            return _compact_response(request, start, end)
+        
+        if blob_cache_applies(request) and _cacheable_month(int(year), int(month)):
+            items = get_month_days([(int(year), int(month))])[(int(year), int(month))]
+            return json_response(_day_items(request, items))
+        
         calendar_days = CalendarDay.objects.filter(year=year, month=month)
+        if exception_storage_enabled() and _cacheable_month(int(year), int(month)):
+            start = datetime(int(year), int(month), 1).date()
+            end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            calendar_days = list(fill_default_days(calendar_days, start, end))
         serializer = self.get_serializer(calendar_days, many=True)
         return Response(serializer.data)
     
@@ -69,10 +203,29 @@ class CalendarDayViewSet(viewsets.ModelViewSet):
         URL: /api/calendar-days/holidays/
         """
         year = request.query_params.get('year', None)
+        
+        if year and year.isdigit() and blob_cache_applies(request) and _cacheable_month(int(year), 1):
+            by_month = get_month_days([(int(year), month) for month in range(1, 13)])
+            return json_response(_day_items(request, [
+                item for month in range(1, 13) for item in by_month[(int(year), month)] if item[1]
+            ]))
+        
         queryset = CalendarDay.objects.filter(is_holiday=True)
         
         if year:
             queryset = queryset.filter(year=year)
+            if year.isdigit() and exception_storage_enabled() and _cacheable_month(int(year), 1):
+                # 週末沒有儲存，補上一般日後再篩選
+                stored = CalendarDay.objects.filter(year=year)
+                queryset = [
+                    calendar_day
+                    for calendar_day in fill_default_days(
+                        stored,
+                        datetime(int(year), 1, 1).date(),
+                        datetime(int(year), 12, 31).date(),
+                    )
+                    if calendar_day.is_holiday
+                ]
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -93,13 +246,14 @@ class CalendarDayViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class HolidayViewSet(viewsets.ModelViewSet):
+class HolidayViewSet(ConditionalGetMixin, BatchWriteMixin, viewsets.ModelViewSet):
     """
     假日 ViewSet
     提供完整的 CRUD 操作
     """
     queryset = Holiday.objects.all()
     serializer_class = HolidaySerializer
+    pagination_class = DatePagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['year', 'holiday_type', 'is_lunar']
     search_fields = ['name', 'description']
@@ -118,6 +272,9 @@ class HolidayViewSet(viewsets.ModelViewSet):
         查詢指定年份的所有假日
         URL: /api/holidays/year/2026/
         """
+        if blob_cache_applies(request):
+            return HttpResponse(holidays_by_year_blob(int(year)), content_type='application/json')
+        
         holidays = Holiday.objects.filter(year=year)
         serializer = self.get_serializer(holidays, many=True)
         return Response(serializer.data)
@@ -153,13 +310,14 @@ class HolidayViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class WorkdayAdjustmentViewSet(viewsets.ModelViewSet):
+class WorkdayAdjustmentViewSet(ConditionalGetMixin, BatchWriteMixin, viewsets.ModelViewSet):
     """
     補班日 ViewSet
     提供完整的 CRUD 操作
     """
     queryset = WorkdayAdjustment.objects.all()
     serializer_class = WorkdayAdjustmentSerializer
+    pagination_class = DatePagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     ordering_fields = ['date']
     ordering = ['date']
@@ -176,11 +334,17 @@ class WorkdayAdjustmentViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CalendarRangeAPIView(APIView):
+class CalendarRangeAPIView(ConditionalGetMixin, APIView):
     """
     查詢日期範圍的 API View
     URL: /api/calendar/range/?start_date=2026-01-01&end_date=2026-01-31
+    加上 &format=ndjson 時以串流方式每行輸出一筆（適合跨多年的大範圍查詢）
+    加上 &compact=bitmask 或 &compact=rle 時回傳位元遮罩格式
+    加上 &lunar=true 時每一天另外回傳農曆日期與節氣（整段範圍一次換算）
     """
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+    conditional_formats = ('json', 'ndjson')
+
     def get(self, request):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
@@ -191,12 +355,51 @@ class CalendarRangeAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        start = _parse_date(start_date)
+        end = _parse_date(end_date)
+        if 'compact' in request.query_params:
+            if not start or not end or start > end:
+                return Response(
+                    {'error': '日期格式錯誤，請使用 YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return _compact_response(request, start, end)
+        
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            if not start or not end:
+                return Response(
+                    {'error': '日期格式錯誤，請使用 YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return streaming_response(
+                request,
+                stream_calendar_days(start, end, lunar=_wants_lunar(request)),
+                NDJSONRenderer.media_type,
+            )
+
+        if start and end:
+            error = _range_too_large(start, end)
+            if error is not None:
+                return error
+
+        if start and end and blob_cache_applies(request):
+            if start > end:
+                return json_response([])
+            items = calendar_range_items(start, end)
+            return json_response(_day_items(request, items))
+        
         try:
             calendar_days = CalendarDay.objects.filter(
                 date__gte=start_date,
                 date__lte=end_date
             )
-            serializer = CalendarDaySerializer(calendar_days, many=True)
+            if start and end and exception_storage_enabled():
+                calendar_days = list(fill_default_days(calendar_days, start, end))
+            serializer = CalendarDaySerializer(
+                calendar_days,
+                many=True,
+                context={'lunar': _wants_lunar(request)}
+            )
             return Response(serializer.data)
         except Exception as e:
             return Response(
@@ -205,17 +408,82 @@ class CalendarRangeAPIView(APIView):
             )
 
 
-class TodayAPIView(APIView):
+class CalendarFeedAPIView(ConditionalGetMixin, APIView):
+    """
+    假日與補班日的 iCalendar 訂閱來源
+    URL: /api/calendar/feed.ics?start_year=2025&end_year=2027&type=national,workday
+    type 可為 national、flexible、adjusted、workday（逗號分隔，預設全部）
+    """
+    renderer_classes = [ICalendarRenderer]
+    conditional_formats = ('ics',)
+
+    def perform_content_negotiation(self, request, force=False):
+        # 行事曆軟體送出的 Accept 標頭五花八門，一律回應 text/calendar
+        return super().perform_content_negotiation(request, force=True)
+
+    def error_response(self, request, message):
+        request.accepted_renderer = JSONRenderer()
+        request.accepted_media_type = JSONRenderer.media_type
+        return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+
+    def get(self, request):
+        try:
+            start_year = int(request.query_params.get('start_year', 1))
+            end_year = int(request.query_params.get('end_year', 9999))
+        except ValueError:
+            return self.error_response(request, 'start_year 和 end_year 必須是整數')
+
+        type_param = request.query_params.get('type')
+        types = [value.strip() for value in type_param.split(',') if value.strip()] if type_param else FEED_TYPES
+        invalid = [value for value in types if value not in FEED_TYPES]
+        if invalid or not types:
+            return self.error_response(request, f'type 必須是 {", ".join(FEED_TYPES)} 其中之一')
+
+        content_type = 'text/calendar; charset=utf-8'
+        blob = cached_feed(start_year, end_year, types)
+        if blob is not None:
+            response = HttpResponse(blob, content_type=content_type)
+        else:
+            response = streaming_response(request, stream_feed(start_year, end_year, types), content_type)
+        response['Content-Disposition'] = 'inline; filename="calendar.ics"'
+        return response
+
+
+class TodayAPIView(ConditionalGetMixin, APIView):
     """
     查詢今天的日期資訊
     URL: /api/calendar/today/
     """
+    def get_etag_extra(self, request):
+        """回應內容隨日期改變"""
+        return datetime.now().date().isoformat()
+    
+    def get_last_modified(self, request, updated_at):
+        midnight = timezone.make_aware(datetime.combine(datetime.now().date(), time.min))
+        if updated_at is None:
+            return midnight
+        return max(updated_at, midnight)
+    
     def get(self, request):
         today = datetime.now().date()
         
+        if calendar_index_enabled():
+            calendar_day = get_calendar_index().get(today)
+            if calendar_day is None:
+                return Response(
+                    {'error': '今天的日期資料尚未建立'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            serializer = CalendarDaySerializer(calendar_day, context={'lunar': _wants_lunar(request)})
+            return Response(serializer.data)
+
+        if exception_storage_enabled():
+            serializer = CalendarDaySerializer(get_or_default(today), context={'lunar': _wants_lunar(request)})
+            return Response(serializer.data)
+
         try:
             calendar_day = CalendarDay.objects.get(date=today)
-            serializer = CalendarDaySerializer(calendar_day)
+            serializer = CalendarDaySerializer(calendar_day, context={'lunar': _wants_lunar(request)})
             return Response(serializer.data)
         except CalendarDay.DoesNotExist:
             return Response(
@@ -224,7 +492,7 @@ class TodayAPIView(APIView):
             )
 
 
-class IsHolidayAPIView(APIView):
+class IsHolidayAPIView(ConditionalGetMixin, APIView):
     """
     檢查指定日期是否為假日
     URL: /api/calendar/is-holiday/?date=2026-01-01
@@ -238,6 +506,39 @@ class IsHolidayAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if calendar_index_enabled():
+            day = _parse_date(date_str)
+            if day is None:
+                return Response(
+                    {'error': '日期格式錯誤，請使用 YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            classification = get_calendar_index().classify(day)
+            if classification is None:
+                return Response(
+                    {'error': '找不到該日期的資料'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            is_holiday, is_workday, is_weekend, holiday_name = classification
+            return Response({
+                'date': day,
+                'is_holiday': is_holiday,
+                'is_workday': is_workday,
+                'is_weekend': is_weekend,
+                'holiday_name': holiday_name,
+            })
+
+        day = _parse_date(date_str)
+        if day is not None and exception_storage_enabled():
+            calendar_day = get_or_default(day)
+            return Response({
+                'date': calendar_day.date,
+                'is_holiday': calendar_day.is_holiday,
+                'is_workday': calendar_day.is_workday,
+                'is_weekend': calendar_day.is_weekend,
+                'holiday_name': calendar_day.holiday_name,
+            })
+
         try:
             calendar_day = CalendarDay.objects.get(date=date_str)
             return Response({
@@ -254,7 +555,108 @@ class IsHolidayAPIView(APIView):
             )
 
 
-class MonthSummaryAPIView(APIView):
+class IsHolidayBatchAPIView(APIView):
+    """
+    批次檢查多個日期是否為假日
+    URL: POST /api/calendar/is-holiday/batch/
+    Body: {"dates": ["2026-01-01", ...], "ranges": [{"start_date": "2026-02-01", "end_date": "2026-02-28"}]}
+    回應以欄位為單位的陣列 (columnar)，每個欄位的第 n 個值對應 dates 的第 n 個日期；
+    沒有資料的日期其欄位值為 null
+    """
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': '請求內容必須為 JSON 物件'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        raw_dates = request.data.get('dates', [])
+        raw_ranges = request.data.get('ranges', [])
+        
+        if not isinstance(raw_dates, list) or not isinstance(raw_ranges, list):
+            return Response(
+                {'error': 'dates 和 ranges 必須為陣列'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not raw_dates and not raw_ranges:
+            return Response(
+                {'error': '請提供 dates 或 ranges 參數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_dates = getattr(settings, 'CALENDAR_BATCH_MAX_DATES', 100000)
+        if len(raw_dates) > max_dates:
+            return Response(
+                {'error': f'單次最多查詢 {max_dates} 個日期'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        days = []
+        for value in raw_dates:
+            day = _parse_date(value)
+            if day is None:
+                return Response(
+                    {'error': f'日期格式錯誤: {value}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            days.append(day)
+        
+        for date_range in raw_ranges:
+            if not isinstance(date_range, dict):
+                return Response(
+                    {'error': 'ranges 的每個元素需包含 start_date 和 end_date'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            start_date = _parse_date(date_range.get('start_date'))
+            end_date = _parse_date(date_range.get('end_date'))
+            if start_date is None or end_date is None or start_date > end_date:
+                return Response(
+                    {'error': f'日期範圍錯誤: {date_range}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(days) + (end_date - start_date).days + 1 > max_dates:
+                return Response(
+                    {'error': f'單次最多查詢 {max_dates} 個日期'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            current = start_date
+            while current <= end_date:
+                days.append(current)
+                current += timedelta(days=1)
+        
+        if calendar_index_enabled():
+            classify = get_calendar_index().classify
+        else:
+            # 以一次範圍查詢取回所有需要的日期
+            rows = CalendarDay.objects.filter(
+                date__gte=min(days),
+                date__lte=max(days),
+            ).values_list('date', 'is_holiday', 'is_workday', 'is_weekend', 'holiday_name')
+            classified = {row[0]: row[1:] for row in rows}
+            classify = classified.get
+            if exception_storage_enabled():
+                classify = with_default_flags(classify)
+        
+        is_holiday = []
+        is_workday = []
+        is_weekend = []
+        holiday_name = []
+        for day in days:
+            classification = classify(day) or (None, None, None, None)
+            is_holiday.append(classification[0])
+            is_workday.append(classification[1])
+            is_weekend.append(classification[2])
+            holiday_name.append(classification[3])
+        
+        return Response({
+            'count': len(days),
+            'dates': [day.isoformat() for day in days],
+            'is_holiday': is_holiday,
+            'is_workday': is_workday,
+            'is_weekend': is_weekend,
+            'holiday_name': holiday_name,
+        })
+
+class MonthSummaryAPIView(ConditionalGetMixin, APIView):
     """
     查詢指定月份的統計摘要
     URL: /api/calendar/month-summary/?year=2026&month=1
@@ -270,27 +672,136 @@ class MonthSummaryAPIView(APIView):
             )
         
         try:
-            calendar_days = CalendarDay.objects.filter(year=year, month=month)
-            
-            total_days = calendar_days.count()
-            weekends = calendar_days.filter(is_weekend=True).count()
-            holidays = calendar_days.filter(is_holiday=True).count()
-            workdays = calendar_days.filter(is_workday=True).count()
-            
-            # 實際工作日 = 總天數 - 週末 - 假日 + 補班日
-            actual_workdays = total_days - weekends - holidays + workdays
-            
+            year = int(year)
+            month = int(month)
+            summary = get_month_summaries(year, [month])[month]
+            return Response(summary_to_dict(summary))
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class YearSummaryAPIView(ConditionalGetMixin, APIView):
+    """
+    查詢指定年份 12 個月的統計摘要
+    URL: /api/calendar/year-summary/?year=2026
+    """
+    def get(self, request):
+        year = request.query_params.get('year')
+        
+        if not year:
+            return Response(
+                {'error': '請提供 year 參數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            year = int(year)
+            summaries = get_month_summaries(year, range(1, 13))
+            months = [summary_to_dict(summaries[month]) for month in range(1, 13)]
             return Response({
-                'year': int(year),
-                'month': int(month),
-                'total_days': total_days,
-                'weekends': weekends,
-                'holidays': holidays,
-                'workday_adjustments': workdays,
-                'actual_workdays': actual_workdays,
+                'year': year,
+                'total_days': sum(month['total_days'] for month in months),
+                'actual_workdays': sum(month['actual_workdays'] for month in months),
+                'months': months,
             })
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class AddWorkdaysAPIView(ConditionalGetMixin, APIView):
+    """
+    推算指定日期之後（或之前）第 N 個上班日
+    URL: /api/calendar/add-workdays/?date=2026-01-01&days=5
+    """
+    def get(self, request):
+        date_str = request.query_params.get('date')
+        days_str = request.query_params.get('days')
+        
+        if not date_str or days_str is None:
+            return Response(
+                {'error': '請提供 date 和 days 參數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        day = _parse_date(date_str)
+        try:
+            days = int(days_str)
+        except ValueError:
+            days = None
+        if day is None or days is None:
+            return Response(
+                {'error': 'date 需為 YYYY-MM-DD 格式，days 需為整數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            result = add_workdays(day, days)
+        except WorkdayRangeError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            'date': day,
+            'days': days,
+            'result': result,
+        })
+
+
+class CountWorkdaysAPIView(ConditionalGetMixin, APIView):
+    """
+    計算日期範圍內（含頭尾）的上班日數
+    URL: /api/calendar/count-workdays/?start_date=2026-01-01&end_date=2026-01-31
+    """
+    def get(self, request):
+        start_str = request.query_params.get('start_date')
+        end_str = request.query_params.get('end_date')
+        
+        if not start_str or not end_str:
+            return Response(
+                {'error': '請提供 start_date 和 end_date 參數'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        start_date = _parse_date(start_str)
+        end_date = _parse_date(end_str)
+        if start_date is None or end_date is None:
+            return Response(
+                {'error': '日期格式錯誤，請使用 YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date > end_date:
+            return Response(
+                {'error': 'start_date 不能晚於 end_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            workdays = count_workdays(start_date, end_date)
+        except WorkdayRangeError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'workdays': workdays,
+        })
+
+
+@timing_exempt
+def metrics_view(request):
+    """
+    Prometheus 抓取端點 (/metrics)
+    合併所有 worker 行程與匯入指令的指標，輸出 text exposition format
+    """
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
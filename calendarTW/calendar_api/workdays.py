@@ -0,0 +1,75 @@
+"""
+上班日計算
+依台灣的補班與調整放假規則，計算兩日期間的上班日數、往後（前）推算 N 個上班日
+使用 CalendarIndex 的上班日累計陣列，不論區間長短皆為 O(1) 或 O(log n)
+
+管理指令或其他程式可直接呼叫：
+    from calendar_api.workdays import add_workdays, count_workdays
+    count_workdays(date(2026, 1, 1), date(2026, 1, 31))
+"""
+from bisect import bisect_left
+from datetime import timedelta
+
+from .index import get_calendar_index
+
+
+class WorkdayRangeError(ValueError):
+    """日期或計算結果超出日曆資料範圍"""
+
+
+def _offset(index, day):
+    """回傳日期在索引中的位置，超出範圍時拋出 WorkdayRangeError"""
+    if index.start is None:
+        raise WorkdayRangeError('資料庫沒有日曆資料')
+    offset = (day - index.start).days
+    if offset < 0 or offset >= len(index):
+        raise WorkdayRangeError(f'{day} 超出日曆資料範圍')
+    return offset
+
+
+def is_workday(day, index=None):
+    """判斷指定日期是否需要上班"""
+    if index is None:
+        index = get_calendar_index()
+    return index.is_working_day(_offset(index, day))
+
+
+def count_workdays(start_date, end_date, index=None):
+    """
+    計算 start_date 到 end_date（含頭尾）之間的上班日數
+    start_date 晚於 end_date 時回傳 0
+    """
+    if index is None:
+        index = get_calendar_index()
+    if start_date > end_date:
+        return 0
+    counts = index.workday_counts
+    return counts[_offset(index, end_date) + 1] - counts[_offset(index, start_date)]
+
+
+def add_workdays(start_date, days, index=None):
+    """
+    回傳 start_date 之後第 days 個上班日（不含 start_date 本身）
+    days 為負數時往前推算，為 0 時回傳 start_date
+    """
+    if index is None:
+        index = get_calendar_index()
+    offset = _offset(index, start_date)
+    if days == 0:
+        return start_date
+
+    counts = index.workday_counts
+    if days > 0:
+        # 找出第一個累計數達到目標的位置
+        target = counts[offset + 1] + days
+        position = bisect_left(counts, target)
+        if position >= len(counts):
+            raise WorkdayRangeError('計算結果超出日曆資料範圍')
+        result = position - 1
+    else:
+        # 找出累計數為 target 且當天為上班日的最後一個位置
+        target = counts[offset] + days
+        if target < 0:
+            raise WorkdayRangeError('計算結果超出日曆資料範圍')
+        result = bisect_left(counts, target + 1) - 1
+    return index.start + timedelta(days=result)